@@ -0,0 +1,102 @@
+"""Débit de l'API HTTP (/api/state et /health) en requêtes par seconde.
+
+Lance l'API d'un BombGameServer dans le processus (une salle remplie de
+joueurs factices) puis la sollicite avec plusieurs clients concurrents,
+d'abord avec une connexion neuve par requête (comportement HTTP/1.0),
+puis en réutilisant la connexion (keep-alive HTTP/1.1).
+
+    python bench/bench_api.py [--clients 8] [--requests 500] [--players 100]
+    python bench/bench_api.py --target 192.168.200.23:8080   # API déjà lancée
+"""
+import argparse
+import contextlib
+import http.client
+import io
+import os
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, 'vm1'), os.path.join(ROOT, 'vm1', 'server')]
+
+from common.scheduler import TimerScheduler
+from helpers import NullConnection, free_port
+from server import BombGameServer
+
+def start_local_api(players):
+    os.environ['API_PORT'] = str(free_port())
+    server = BombGameServer()
+    # Planificateur non démarré : aucune explosion pendant la mesure
+    server.scheduler = TimerScheduler()
+    server.log = lambda message: None
+    with contextlib.redirect_stdout(io.StringIO()):
+        # Méthodes de jeu appelées directement : ce thread tient lieu de thread de jeu
+        for i in range(players):
+            room = server.rooms.assign('bench')
+            room.add_player(NullConnection(), None, {'player_id': f'p{i}', 'player_name': f'P{i}'})
+        threading.Thread(target=server.start_api_server, daemon=True).start()
+        time.sleep(0.2)
+    return '127.0.0.1', server.api_port
+
+def client(host, port, path, count, keep_alive, errors):
+    conn = None
+    for _ in range(count):
+        try:
+            if conn is None:
+                conn = http.client.HTTPConnection(host, port, timeout=10)
+            conn.request('GET', path)
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(e)
+            conn.close()
+            conn = None
+            continue
+        if not keep_alive or response.will_close:
+            conn.close()
+            conn = None
+    if conn is not None:
+        conn.close()
+
+def measure(host, port, path, clients, requests, keep_alive):
+    errors = []
+    threads = [
+        threading.Thread(target=client, args=(host, port, path, requests, keep_alive, errors))
+        for _ in range(clients)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return clients * requests / elapsed, len(errors)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=500, help='requêtes par client')
+    parser.add_argument('--players', type=int, default=100)
+    parser.add_argument('--target', help='hôte:port d\'une API déjà lancée')
+    args = parser.parse_args()
+
+    if args.target:
+        host, port = args.target.rsplit(':', 1)
+        port = int(port)
+    else:
+        host, port = start_local_api(args.players)
+
+    print(f"{'endpoint':>12} {'connexion/requête (req/s)':>26} {'keep-alive (req/s)':>19}")
+    for path in ('/api/state', '/health'):
+        fresh, fresh_errors = measure(host, port, path, args.clients, args.requests, False)
+        reused, reused_errors = measure(host, port, path, args.clients, args.requests, True)
+        line = f"{path:>12} {fresh:>26.0f} {reused:>19.0f}"
+        if fresh_errors or reused_errors:
+            line += f"  (erreurs : {fresh_errors} / {reused_errors})"
+        print(line)
+
+if __name__ == '__main__':
+    main()
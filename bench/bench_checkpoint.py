@@ -0,0 +1,80 @@
+"""Coût d'un instantané des parties en fonction du nombre de joueurs.
+
+Remplit un serveur de salles (--room-size joueurs chacune, sessions
+ouvertes), puis mesure pour chaque taille :
+
+- le relevé sur le thread de jeu (seule partie sur le chemin critique) ;
+- l'encodage binaire et l'écriture atomique (fsync + rename), faits
+  par le thread des instantanés ;
+- la taille du fichier et le temps de reprise au démarrage.
+
+    python bench/bench_checkpoint.py [--sizes 100,1000,10000,50000] [--room-size 50]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, 'vm1'), os.path.join(ROOT, 'vm1', 'server')]
+
+import checkpoint
+from common.scheduler import TimerScheduler
+from helpers import NullConnection
+from server import BombGameServer
+
+def make_server():
+    server = BombGameServer()
+    # Planificateur non démarré : aucun timer ne se déclenche pendant la mesure
+    server.scheduler = TimerScheduler()
+    server.log = lambda message: None
+    server.add_event = lambda *args, **kwargs: None
+    return server
+
+def fill(server, players, room_size):
+    for index in range(players):
+        room_id = f'room-{index // room_size + 1}'
+        room = server.rooms.assign(room_id)
+        room.add_player(NullConnection(), None,
+                        {'player_id': f'p{index}', 'player_name': f'Player_{index}', 'session': None})
+
+def timed(function, repeat):
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations), result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='100,1000,10000,50000')
+    parser.add_argument('--room-size', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'joueurs':>8} {'salles':>7} {'relevé':>10} {'encodage':>10} {'écriture':>10} "
+          f"{'taille':>10} {'reprise':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'checkpoint.bin')
+        for players in map(int, args.sizes.split(',')):
+            server = make_server()
+            fill(server, players, args.room_size)
+
+            capture, rooms = timed(lambda: [room.checkpoint() for room in server.rooms.all()], args.repeat)
+            encode, data = timed(lambda: checkpoint.encode(time.time(), rooms), args.repeat)
+            write, _ = timed(lambda: checkpoint.write_atomic(path, data), args.repeat)
+
+            def restore():
+                target = make_server()
+                return checkpoint.Checkpointer(target, path).restore()
+
+            reload, restored = timed(restore, args.repeat)
+            assert restored == len(rooms)
+            print(f"{players:>8} {len(rooms):>7} {capture * 1000:>8.2f}ms {encode * 1000:>8.2f}ms "
+                  f"{write * 1000:>8.2f}ms {len(data) / 1024:>8.1f}Ko {reload * 1000:>8.2f}ms")
+
+if __name__ == '__main__':
+    main()
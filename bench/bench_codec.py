@@ -0,0 +1,74 @@
+"""Coût et taille des messages : lignes JSON contre encodage binaire.
+
+Pour chaque taille de salle, encode et décode un GAME_STATE, un
+RECEIVE_BOMB (32 cibles) et le STATE_DELTA qui remplace le GAME_STATE
+à chaque passage, dans les deux protocoles, et donne le temps
+par message et le nombre d'octets. Le décodage binaire inclut la
+traduction des numéros en noms faite par ClientCodec.
+
+    python bench/bench_codec.py [--repeat 2000]
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'vm1'))
+
+from common import codec
+from common.protocol import encode_json, decode_json
+
+def timed(function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return (time.perf_counter() - start) / repeat, result
+
+def messages(count):
+    players = [(number, f'p{number}', f'Player_{number:05d}', number % 3 != 0) for number in range(count)]
+    targets = players[:32]
+    game_state = {
+        'type': 'GAME_STATE',
+        'players': [{'name': name, 'alive': alive} for _, _, name, alive in players],
+        'current_holder': players[0][2],
+        'timer': 4.2
+    }
+    receive_bomb = {
+        'type': 'RECEIVE_BOMB',
+        'timer': 4.2,
+        'from': players[1][2],
+        'available_targets': [player_id for _, player_id, _, _ in targets]
+    }
+    state_delta = {'type': 'STATE_DELTA', 'seq': 42, 'kind': 'holder', 'timer': 4.2, 'player': players[0][2]}
+    binary = {
+        'GAME_STATE': lambda: codec.encode_game_state(0, [(n, alive) for n, _, _, alive in players], 0, 4.2),
+        'RECEIVE_BOMB': lambda: codec.encode_receive_bomb(4.2, [n for n, _, _, _ in targets], 1),
+        'STATE_DELTA': lambda: codec.encode_delta(42, 'holder', 0, 4.2)
+    }
+    client = codec.ClientCodec()
+    client.load_welcome({'players': [[n, player_id, name] for n, player_id, name, _ in players]})
+    return {'GAME_STATE': game_state, 'RECEIVE_BOMB': receive_bomb, 'STATE_DELTA': state_delta}, binary, client
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=2000)
+    parser.add_argument('--sizes', default='10,100,1000,10000')
+    args = parser.parse_args()
+
+    print(f"{'message':>13} {'joueurs':>8} | {'JSON enc/déc (µs)':>18} {'octets':>8} | "
+          f"{'binaire enc/déc (µs)':>21} {'octets':>7}")
+    for count in (int(size) for size in args.sizes.split(',')):
+        repeat = max(20, args.repeat * 10 // max(10, count))
+        json_messages, binary_encoders, client = messages(count)
+        for kind, message in json_messages.items():
+            json_enc, line = timed(lambda: encode_json(message), repeat)
+            json_dec, _ = timed(lambda: decode_json(line[:-1]), repeat)
+            bin_enc, frame = timed(binary_encoders[kind], repeat)
+            payload = frame[4:]  # Sans le préfixe de longueur, comme après FrameDecoder
+            bin_dec, _ = timed(lambda: client.decode(payload), repeat)
+            print(f"{kind:>13} {count:>8} | {json_enc * 1e6:>8.1f} / {json_dec * 1e6:>7.1f} {len(line):>8} | "
+                  f"{bin_enc * 1e6:>10.1f} / {bin_dec * 1e6:>8.1f} {len(frame):>7}")
+
+if __name__ == '__main__':
+    main()
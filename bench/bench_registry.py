@@ -0,0 +1,91 @@
+"""Coût d'un passage de bombe en fonction du nombre de joueurs.
+
+Compare l'ancienne approche (parcours linéaire des joueurs, liste des
+cibles reconstruite, list.remove) au PlayerRegistry, puis mesure
+GameRoom.pass_bomb complet. La diffusion de l'état (STATE_DELTA), qui est par
+nature proportionnelle au nombre de joueurs, est désactivée pour isoler
+le coût de la logique de jeu.
+
+    python bench/bench_registry.py [--passes 20000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, 'vm1'), os.path.join(ROOT, 'vm1', 'server')]
+
+from common.scheduler import TimerScheduler
+from helpers import NullConnection
+from registry import PlayerRecord, PlayerRegistry
+from server import BombGameServer
+
+def legacy_handoff(players, target_id):
+    """Ancien chemin : recherche linéaire + liste de cibles complète"""
+    for sock, info in players.items():
+        if info['id'] == target_id and info['alive']:
+            target = sock
+            break
+    return [info['id'] for sock, info in players.items() if sock != target and info['alive']]
+
+def bench_legacy(count, passes):
+    players = {NullConnection(): {'id': f'p{i}', 'alive': True} for i in range(count)}
+    ids = [info['id'] for info in players.values()]
+    start = time.perf_counter()
+    for _ in range(passes):
+        legacy_handoff(players, random.choice(ids))
+    return (time.perf_counter() - start) / passes
+
+def bench_registry(count, passes, max_targets):
+    registry = PlayerRegistry()
+    for i in range(count):
+        registry.add(PlayerRecord(NullConnection(), f'p{i}', f'P{i}', None))
+    ids = list(registry.by_id)
+    start = time.perf_counter()
+    for _ in range(passes):
+        target = registry.find(random.choice(ids))
+        # Même tirage que GameRoom.pass_bomb
+        registry.sample_alive(target, max_targets)
+    return (time.perf_counter() - start) / passes
+
+def bench_room(count, passes):
+    server = BombGameServer()
+    # Planificateur non démarré : l'explosion ne se déclenche pas pendant la mesure
+    server.scheduler = TimerScheduler()
+    server.log = lambda message: None
+    room = server.rooms.assign('bench')
+    room.broadcast_delta = lambda kind, record=None: None
+
+    # Méthodes de jeu appelées directement : ce thread tient lieu de thread de jeu
+    for i in range(count):
+        server.rooms.assign('bench')
+        room.add_player(NullConnection(), None, {'player_id': f'p{i}', 'player_name': f'P{i}'})
+
+    ids = list(room.registry.by_id)
+    start = time.perf_counter()
+    for _ in range(passes):
+        target = random.choice(ids)
+        if target == room.current_holder.id:
+            continue
+        room.pass_bomb(room.current_holder.conn, target)
+    return (time.perf_counter() - start) / passes
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--passes', type=int, default=20000)
+    parser.add_argument('--sizes', default='10,100,1000,10000')
+    args = parser.parse_args()
+
+    os.environ.setdefault('MIN_TIMER', '3600')
+    os.environ.setdefault('MAX_TIMER', '3600')
+    print(f"{'joueurs':>8} {'ancien (µs)':>12} {'registry (µs)':>14} {'pass_bomb (µs)':>15}")
+    for count in (int(size) for size in args.sizes.split(',')):
+        legacy = bench_legacy(count, max(50, args.passes // max(1, count // 100)))
+        indexed = bench_registry(count, args.passes, 32)
+        room = bench_room(count, args.passes)
+        print(f"{count:>8} {legacy * 1e6:>12.2f} {indexed * 1e6:>14.2f} {room * 1e6:>15.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""Deux nœuds serveur partageant l'annuaire des salles (CLUSTER_BACKEND=sqlite).
+
+Lance deux serveurs sur des ports différents avec le même fichier
+d'annuaire, puis vérifie :
+
+1. qu'un joueur qui demande sur le nœud 2 une salle hébergée par le
+   nœud 1 est redirigé (REDIRECT) et y joue ;
+2. que /api/rooms de chaque nœud liste les salles des deux nœuds ;
+3. que /api/state?room=<salle distante> relaie l'état depuis l'autre nœud
+   (nom de salle avec espace : échappé dans l'URL relayée).
+
+Code de sortie 1 si une vérification échoue.
+
+    python bench/cluster_check.py
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import urllib.parse
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+from helpers import QuietPlayer, free_port, wait_for
+
+class Node:
+    def __init__(self, node_id, database):
+        self.node_id = node_id
+        self.port = free_port()
+        self.api_port = free_port()
+        env = dict(os.environ, NODE_ID=node_id, NODE_HOST='127.0.0.1',
+                   SERVER_PORT=str(self.port), API_PORT=str(self.api_port),
+                   CLUSTER_BACKEND='sqlite', CLUSTER_DB=database, CLUSTER_HEARTBEAT='0.2',
+                   MIN_TIMER='3600', MAX_TIMER='3600')
+        self.process = subprocess.Popen(
+            [sys.executable, '-u', os.path.join(ROOT, 'vm1', 'server', 'server.py')],
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def api(self, path):
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{self.api_port}{path}", timeout=2) as response:
+                return json.load(response)
+        except OSError:
+            return None
+
+    def stop(self):
+        self.process.kill()
+        self.process.wait()
+
+def join(node, name, room):
+    player = QuietPlayer(name, reaction_time=1.0)
+    player.server_host = '127.0.0.1'
+    player.server_port = node.port
+    player.room = room
+    threading.Thread(target=player.run, daemon=True).start()
+    return player
+
+def room_players(node, room):
+    state = node.api(f'/api/state?room={urllib.parse.quote(room)}')
+    return sorted(player['name'] for player in state['players']) if state else []
+
+def main():
+    failures = []
+
+    def check(label, ok):
+        print(f"{'ok   ' if ok else 'ÉCHEC'} {label}")
+        if not ok:
+            failures.append(label)
+
+    with tempfile.TemporaryDirectory() as directory:
+        database = os.path.join(directory, 'cluster.db')
+        first, second = Node('n1', database), Node('n2', database)
+        try:
+            check("les deux nœuds se voient",
+                  wait_for(lambda: all((node.api('/api/rooms') or {}).get('nodes') == ['n1', 'n2']
+                                       for node in (first, second))))
+
+            players = [join(first, 'Alice', 'arena')]
+            wait_for(lambda: room_players(first, 'arena') == ['Alice'])
+            # Même salle demandée au nœud 2 : redirection vers le nœud 1
+            players.append(join(second, 'Bob', 'arena'))
+            check("JOIN redirigé vers le nœud propriétaire",
+                  wait_for(lambda: room_players(first, 'arena') == ['Alice', 'Bob'])
+                  and players[1].server_port == first.port)
+
+            players += [join(second, 'Carol', 'side room'), join(second, 'Dave', 'side room')]
+            check("salles des deux nœuds listées partout", wait_for(lambda: all(
+                sorted((room['room'], room['node']) for room in (node.api('/api/rooms') or {}).get('rooms', []))
+                == [('arena', 'n1'), ('side room', 'n2')] for node in (first, second))))
+            check("état d'une salle distante relayé",
+                  room_players(first, 'side room') == ['Carol', 'Dave']
+                  and room_players(second, 'arena') == ['Alice', 'Bob'])
+        finally:
+            first.stop()
+            second.stop()
+
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""Limite des numéros de joueur en binaire (codec.MAX_NUMBER).
+
+Le bit de poids fort d'un numéro porte l'état vivant/mort : une salle où
+il y a des joueurs binaires ne dépasse pas MAX_NUMBER + 1 joueurs.
+Remplit une salle jusqu'au dernier numéro, puis vérifie :
+
+1. qu'un joueur binaire reçoit le numéro MAX_NUMBER et que le GAME_STATE
+   binaire se relit sans mélanger vivants et morts ;
+2. que le JOIN suivant est refusé (REJECT "full"), binaire ou JSON ;
+3. qu'une salle sans joueur binaire grandit au-delà en JSON, mais
+   refuse alors un JOIN binaire.
+
+Code de sortie 1 si une vérification échoue.
+
+    python bench/codec_limit_check.py
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, 'vm1'), os.path.join(ROOT, 'vm1', 'server')]
+
+from common import codec
+from common.protocol import FrameDecoder, decode_json
+from common.scheduler import TimerScheduler
+from helpers import NullConnection
+from registry import PlayerRecord
+from server import BombGameServer
+
+class RecordingConnection:
+    """Connexion qui garde les octets reçus"""
+    encoding = 'json'
+    deltas = False
+
+    def __init__(self):
+        self.data = bytearray()
+        self.aborted = False
+
+    def sendall(self, data):
+        self.data += data
+
+    def abort(self):
+        self.aborted = True
+
+    def messages(self):
+        """Lignes JSON reçues, puis trames binaires une fois le WELCOME passé"""
+        # WELCOME et GAME_STATE d'une salle aussi grande dépassent MAX_FRAME_SIZE :
+        # seule la numérotation est vérifiée ici
+        decoder = FrameDecoder(max_frame=len(self.data))
+        decoder.feed(self.data)
+        for frame in decoder.frames():
+            if decoder.framing == 'length':
+                yield frame
+                continue
+            message = decode_json(frame)
+            if message['type'] == 'WELCOME':
+                decoder.framing = 'length'
+            yield message
+
+def make_server():
+    server = BombGameServer()
+    # Planificateur non démarré : aucun timer ne se déclenche pendant la vérification
+    server.scheduler = TimerScheduler()
+    server.log = lambda message: None
+    server.add_event = lambda *args, **kwargs: None
+    server.min_players = codec.MAX_NUMBER + 2  # Pas de partie : seul le remplissage compte
+    return server
+
+def fill(room, players):
+    # Directement dans le registre : add_player diffuserait chaque arrivée à toute la salle
+    for index in range(players):
+        room.registry.add(PlayerRecord(NullConnection(), f'p{index}', f'Player_{index}', None))
+
+def join(room, name, encoding='json'):
+    conn = RecordingConnection()
+    message = {'type': 'JOIN', 'player_id': name, 'player_name': name}
+    if encoding == 'binary':
+        message['encoding'] = 'binary'
+    room.server.rooms.settle = lambda room: None
+    room.add_player(conn, None, message)
+    return conn
+
+def rejected(conn):
+    return conn.aborted and any(isinstance(message, dict) and message.get('reason') == 'full'
+                                for message in conn.messages())
+
+def main():
+    failures = []
+
+    def check(label, ok):
+        print(f"{'ok   ' if ok else 'ÉCHEC'} {label}")
+        if not ok:
+            failures.append(label)
+
+    server = make_server()
+
+    # 1. Dernier numéro attribué à un joueur binaire
+    room = server.rooms.assign('full')
+    fill(room, codec.MAX_NUMBER)
+    room.registry.mark_dead(room.registry.by_number[0])
+    last = join(room, 'last', 'binary')
+    messages = list(last.messages())
+    welcome = next((message for message in messages if isinstance(message, dict)
+                    and message['type'] == 'WELCOME'), None)
+    check(f"joueur binaire numéro {codec.MAX_NUMBER}",
+          not last.aborted and welcome is not None and welcome['number'] == codec.MAX_NUMBER)
+
+    client = codec.ClientCodec()
+    client.load_welcome(welcome)
+    room.send_keyframe(last)
+    state = client.decode(list(last.messages())[-1])
+    alive = {player['name']: player['alive'] for player in state['players']}
+    check("GAME_STATE binaire relu (vivants et morts)",
+          len(alive) == codec.MAX_NUMBER + 1 and alive['last'] and not alive['Player_0']
+          and sum(alive.values()) == codec.MAX_NUMBER)
+
+    # 2. Plus de numéro binaire : la salle est pleine
+    check("JOIN binaire suivant refusé", rejected(join(room, 'binary-after', 'binary')))
+    check("JOIN JSON suivant refusé (joueur binaire présent)", rejected(join(room, 'json-after')))
+    check(f"salle toujours à {codec.MAX_NUMBER + 1} joueurs", len(room.registry) == codec.MAX_NUMBER + 1)
+
+    # 3. Salle sans joueur binaire : JSON au-delà, binaire refusé
+    room = server.rooms.assign('json')
+    fill(room, codec.MAX_NUMBER + 1)
+    beyond = join(room, 'json-beyond')
+    check(f"JOIN JSON numéro {codec.MAX_NUMBER + 1} accepté",
+          not beyond.aborted and room.registry.get(beyond).number == codec.MAX_NUMBER + 1)
+    check("JOIN binaire refusé au-delà de MAX_NUMBER", rejected(join(room, 'binary-beyond', 'binary')))
+
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
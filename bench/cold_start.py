@@ -0,0 +1,121 @@
+"""Démarrage à froid des joueurs : délai jusqu'au JOIN et mémoire par bot.
+
+Un faux serveur (socket d'écoute local) note l'instant où chaque JOIN
+arrive. Pour chaque nombre de bots, deux déploiements sont comparés :
+
+- processes : un interpréteur par bot (un conteneur par joueur) ;
+- shared : un seul processus avec BOTS=N (threads de lecture, un thread
+  de timers commun).
+
+Le rapport donne le délai entre le lancement et le premier / dernier
+JOIN reçu, et la mémoire résidente (VmRSS, Linux) totale et par bot une
+fois tous les bots connectés.
+
+    python bench/cold_start.py [--bots 1,10,100] [--repeat 3]
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PLAYER = os.path.join(ROOT, 'vm1', 'player', 'player.py')
+
+class JoinRecorder:
+    """Accepte les joueurs et note l'arrivée de chaque JOIN (la connexion reste ouverte)"""
+
+    def __init__(self):
+        self.listener = socket.create_server(('127.0.0.1', 0), backlog=1024)
+        self.port = self.listener.getsockname()[1]
+        self.lock = threading.Lock()
+        self.joins = []
+        self.connections = []
+        threading.Thread(target=self.accept, daemon=True).start()
+
+    def accept(self):
+        while True:
+            conn, _ = self.listener.accept()
+            self.connections.append(conn)
+            threading.Thread(target=self.read_join, args=(conn,), daemon=True).start()
+
+    def read_join(self, conn):
+        data = b''
+        while b'\n' not in data:
+            chunk = conn.recv(4096)
+            if not chunk:
+                return
+            data += chunk
+        with self.lock:
+            self.joins.append(time.perf_counter())
+
+    def wait(self, count, timeout=60):
+        deadline = time.monotonic() + timeout
+        while len(self.joins) < count and time.monotonic() < deadline:
+            time.sleep(0.005)
+        return len(self.joins) >= count
+
+    def reset(self):
+        for conn in self.connections:
+            conn.close()
+        self.connections = []
+        self.joins = []
+
+def rss(pid):
+    """Mémoire résidente d'un processus (Ko)"""
+    with open(f'/proc/{pid}/status') as status:
+        for line in status:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    return 0
+
+def launch(recorder, bots, shared):
+    env = dict(os.environ, SERVER_HOST='127.0.0.1', SERVER_PORT=str(recorder.port),
+               PLAYER_NAME='Cold', REACTION_TIME='1')
+    command = [sys.executable, '-u', PLAYER]
+    if shared:
+        return [subprocess.Popen(command, env=dict(env, BOTS=str(bots)),
+                                 stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)]
+    return [subprocess.Popen(command, env=dict(env, PLAYER_NAME=f'Cold_{index}'),
+                             stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            for index in range(bots)]
+
+def measure(recorder, bots, shared):
+    recorder.reset()
+    start = time.perf_counter()
+    processes = launch(recorder, bots, shared)
+    try:
+        if not recorder.wait(bots):
+            raise RuntimeError(f"{len(recorder.joins)}/{bots} JOIN reçus")
+        first, last = min(recorder.joins) - start, max(recorder.joins) - start
+        time.sleep(0.2)  # Threads de lecture installés dans recv()
+        memory = sum(rss(process.pid) for process in processes)
+    finally:
+        for process in processes:
+            process.kill()
+        for process in processes:
+            process.wait()
+    return first, last, memory
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--bots', default='1,10,100')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    recorder = JoinRecorder()
+    print(f"{'bots':>5} {'déploiement':>12} {'1er JOIN':>10} {'dernier':>10} {'RSS total':>11} {'RSS/bot':>10}")
+    for bots in map(int, args.bots.split(',')):
+        for shared in (False, True):
+            if bots == 1 and shared:
+                continue
+            runs = [measure(recorder, bots, shared) for _ in range(args.repeat)]
+            first, last, memory = (statistics.median(values) for values in zip(*runs))
+            print(f"{bots:>5} {'shared' if shared else 'processes':>12} {first * 1000:>8.0f}ms "
+                  f"{last * 1000:>8.0f}ms {memory / 1024:>9.1f}Mo {memory / bots / 1024:>8.2f}Mo")
+
+if __name__ == '__main__':
+    main()
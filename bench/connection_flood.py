@@ -0,0 +1,169 @@
+"""Contrôle d'admission sous une avalanche de connexions hostiles.
+
+Lance un serveur aux limites réduites avec quelques vrais joueurs, puis :
+
+1. --idle sockets muets et --slowloris qui envoient leur JOIN un octet
+   à la fois : coupés après JOIN_TIMEOUT ;
+2. des connexions au-delà de MAX_CONNECTIONS : REJECT "full" immédiat ;
+3. un JOIN avec l'identifiant d'un joueur en jeu : REJECT "duplicate" ;
+4. un client qui inonde le serveur de RESYNC : coupé ("flood") ;
+5. des JOIN incomplets (sans player_id) : refusés sans créer de salle.
+
+Vérifie les compteurs de /health, que les connexions hostiles sont
+libérées et que les vrais joueurs continuent de jouer. Code de sortie 1
+si une vérification échoue.
+
+    python bench/connection_flood.py [--idle 200] [--slowloris 50] [--players 4]
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+from helpers import QuietPlayer, free_port, wait_for
+
+JOIN_TIMEOUT = 1.5
+IDLE_TIMEOUT = 2.0
+
+def join_line(player_id):
+    return (json.dumps({'type': 'JOIN', 'player_id': player_id, 'player_name': player_id}) + '\n').encode()
+
+def first_line(sock, timeout=3):
+    """Premier message du serveur, ou None si la connexion est fermée sans réponse"""
+    sock.settimeout(timeout)
+    data = b''
+    try:
+        while b'\n' not in data:
+            chunk = sock.recv(4096)
+            if not chunk:
+                break
+            data += chunk
+    except OSError:
+        pass
+    return json.loads(data.split(b'\n')[0]) if b'\n' in data else None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--players', type=int, default=4)
+    parser.add_argument('--idle', type=int, default=200)
+    parser.add_argument('--slowloris', type=int, default=50)
+    parser.add_argument('--mode', default='threaded', choices=('threaded', 'asyncio'))
+    args = parser.parse_args()
+
+    hostile = args.idle + args.slowloris
+    port, api_port = free_port(), free_port()
+    env = dict(os.environ, SERVER_PORT=str(port), API_PORT=str(api_port), SERVER_MODE=args.mode,
+               MAX_CONNECTIONS=str(args.players + hostile), JOIN_TIMEOUT=str(JOIN_TIMEOUT),
+               IDLE_TIMEOUT=str(IDLE_TIMEOUT), MESSAGE_RATE='20', MESSAGE_BURST='40',
+               MIN_TIMER='2', MAX_TIMER='4')
+    server = subprocess.Popen([sys.executable, '-u', os.path.join(ROOT, 'vm1', 'server', 'server.py')],
+                              env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    failures = []
+
+    def check(label, ok):
+        print(f"{'ok   ' if ok else 'ÉCHEC'} {label}")
+        if not ok:
+            failures.append(label)
+
+    def health():
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{api_port}/health', timeout=2) as response:
+                return json.load(response)['admission']
+        except OSError:
+            return None
+
+    def rooms():
+        with urllib.request.urlopen(f'http://127.0.0.1:{api_port}/api/rooms', timeout=2) as response:
+            return sorted(room['room'] for room in json.load(response)['rooms'])
+
+    def passes():
+        with urllib.request.urlopen(f'http://127.0.0.1:{api_port}/api/events?since=0', timeout=2) as response:
+            return sum(event['type'] == 'bomb_passed' for event in json.load(response)['events'])
+
+    try:
+        wait_for(lambda: health() is not None)
+        os.environ['KEEPALIVE'] = str(IDLE_TIMEOUT / 4)
+        players = [QuietPlayer(f'Real_{index}', reaction_time=0.2) for index in range(args.players)]
+        for player in players:
+            player.server_port = port
+            threading.Thread(target=player.run, daemon=True).start()
+        check("vrais joueurs connectés", wait_for(lambda: (health() or {}).get('open') == args.players))
+
+        # 1. Connexions muettes et JOIN au compte-gouttes, jusqu'à remplir le serveur
+        start = time.monotonic()
+        idle = [socket.create_connection(('127.0.0.1', port)) for _ in range(args.idle)]
+        slow = [socket.create_connection(('127.0.0.1', port)) for _ in range(args.slowloris)]
+        check("serveur plein", wait_for(lambda: health()['open'] == args.players + hostile))
+
+        # 2. Au-delà de la limite : refus immédiat avec délai conseillé
+        extra = socket.create_connection(('127.0.0.1', port))
+        reply = first_line(extra)
+        check(f"REJECT full au-delà de la limite ({reply})",
+              reply is not None and reply['reason'] == 'full' and reply.get('retry', 0) > 0)
+        extra.close()
+
+        line = join_line('slowloris')
+        for offset in range(len(line) - 1):
+            for sock in slow:
+                try:
+                    sock.send(line[offset:offset + 1])
+                except OSError:
+                    pass
+            if time.monotonic() - start > JOIN_TIMEOUT * 3:
+                break
+            time.sleep(0.05)
+        check("connexions sans JOIN coupées",
+              wait_for(lambda: health()['open'] == args.players, timeout=JOIN_TIMEOUT * 4))
+        check("évictions join_timeout comptées", health()['evicted'].get('join_timeout') == hostile)
+        for sock in idle + slow:
+            sock.close()
+
+        # 3. Identifiant déjà en jeu
+        duplicate = socket.create_connection(('127.0.0.1', port))
+        duplicate.sendall(join_line(players[0].player_id))
+        reply = first_line(duplicate)
+        check(f"REJECT duplicate ({reply})", reply is not None and reply['reason'] == 'duplicate')
+        duplicate.close()
+
+        # 4. Inondation de messages après un JOIN valide
+        flood = socket.create_connection(('127.0.0.1', port))
+        flood.sendall(join_line('flooder'))
+        try:
+            for _ in range(10000):
+                flood.sendall(b'{"type": "RESYNC"}\n')
+        except OSError:
+            pass
+        check("client inondant coupé", wait_for(lambda: health()['evicted'].get('flood') == 1))
+        flood.close()
+
+        # 5. JOIN incomplets vers des salles nommées
+        before_rooms = rooms()
+        for index in range(5):
+            junk = socket.create_connection(('127.0.0.1', port))
+            junk.sendall((json.dumps({'type': 'JOIN', 'room': f'junk-{index}'}) + '\n').encode())
+            first_line(junk)
+            junk.close()
+        check("JOIN incomplets sans salle créée", rooms() == before_rooms)
+
+        # Les vrais joueurs (PING toutes les KEEPALIVE s) passent IDLE_TIMEOUT et jouent toujours
+        before = passes()
+        time.sleep(IDLE_TIMEOUT * 2)
+        stats = health()
+        check("vrais joueurs toujours connectés", stats['open'] == args.players and 'idle' not in stats['evicted'])
+        check("la partie continue", passes() > before)
+        print(json.dumps(stats))
+    finally:
+        server.kill()
+        server.wait()
+
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,34 @@
+"""Outils partagés par les bancs d'essai et les vérifications de bench/."""
+import os
+import socket
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'vm1', 'player'))
+
+from player import BombPlayer
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def wait_for(condition, timeout=10, step=0.1):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(step)
+    return False
+
+class NullConnection:
+    """Connexion de joueur qui ignore tout ce qu'on lui envoie"""
+    encoding = 'json'
+    deltas = False
+
+    def sendall(self, data):
+        pass
+
+class QuietPlayer(BombPlayer):
+    def log(self, message):
+        pass
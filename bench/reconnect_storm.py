@@ -0,0 +1,191 @@
+"""Reprise de session et tempête de reconnexions après un redémarrage.
+
+Lance un serveur (sous-processus) et --bots BombPlayer dans ce
+processus, puis :
+
+1. coupe toutes les connexions des joueurs (coupure réseau) : chacun
+   doit reprendre sa place avec son jeton de session, sans perdre son
+   état (vivant ou mort) ;
+2. arrête le serveur, le relance après --downtime secondes et mesure la
+   charge de reconnexion : tentatives par seconde (pic), connexions
+   acceptées par seconde et temps jusqu'au retour de tous les joueurs.
+
+--backoff fixed reproduit l'ancien comportement (délai fixe, sans
+jitter) pour comparaison. Avec --checkpoint, le serveur écrit des
+instantanés et les reprend au redémarrage : les joueurs doivent alors
+retrouver leur place (même jeton, même état) après l'arrêt.
+
+    python bench/reconnect_storm.py [--bots 200] [--downtime 3] [--backoff jitter|fixed] [--checkpoint]
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'vm1', 'player'))
+
+from helpers import free_port, wait_for
+from player import BombPlayer
+
+class Recorder:
+    """Instants des tentatives et des connexions réussies de tous les bots"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.attempts = []
+        self.connected = []
+
+    def record(self, series):
+        with self.lock:
+            series.append(time.monotonic())
+
+class StormBot(BombPlayer):
+    def __init__(self, name, recorder, backoff):
+        super().__init__(name, reaction_time=0.5)
+        self.recorder = recorder
+        self.backoff = backoff
+        self.max_retries = 1000
+
+    def log(self, message):
+        pass
+
+    def open_connection(self):
+        self.recorder.record(self.recorder.attempts)
+        sock = super().open_connection()
+        self.recorder.record(self.recorder.connected)
+        return sock
+
+    def reconnect_delay(self, attempt):
+        if self.backoff == 'fixed':
+            return self.reconnect_base
+        return super().reconnect_delay(attempt)
+
+    def cut(self):
+        """Couper la connexion comme le ferait le réseau"""
+        try:
+            self.socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+class Server:
+    def __init__(self, env):
+        self.env = env
+        self.process = None
+
+    def start(self):
+        self.process = subprocess.Popen(
+            [sys.executable, '-u', os.path.join(ROOT, 'vm1', 'server', 'server.py')],
+            env=self.env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def stop(self):
+        self.process.kill()
+        self.process.wait()
+
+    def api(self, path):
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{self.env['API_PORT']}{path}", timeout=2) as response:
+                return json.load(response)
+        except OSError:
+            return None
+
+    def players(self):
+        state = self.api('/api/state?room=storm')
+        if state is None:
+            return []
+        return [player for player in state['players'] if player['connected']]
+
+def rate_profile(instants, start, window=0.1):
+    """(pic par seconde sur une fenêtre glissante, total) après start"""
+    instants = sorted(t for t in instants if t >= start)
+    peak, low = 0, 0
+    for high in range(len(instants)):
+        while instants[high] - instants[low] > window:
+            low += 1
+        peak = max(peak, high - low + 1)
+    return peak / window, len(instants)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--bots', type=int, default=200)
+    parser.add_argument('--downtime', type=float, default=3)
+    parser.add_argument('--backoff', choices=('jitter', 'fixed'), default='jitter')
+    parser.add_argument('--base', type=float, default=0.5, help='délai de base de reconnexion (s)')
+    parser.add_argument('--checkpoint', action='store_true', help='reprise de l\'état après le redémarrage')
+    args = parser.parse_args()
+
+    env = dict(os.environ,
+               SERVER_PORT=str(free_port()), API_PORT=str(free_port()),
+               SESSION_GRACE='30', MIN_PLAYERS='2',
+               # Partie très lente : aucun joueur ne meurt pendant la mesure
+               MIN_TIMER='3600', MAX_TIMER='3600')
+    directory = tempfile.TemporaryDirectory()
+    if args.checkpoint:
+        env.update(CHECKPOINT=os.path.join(directory.name, 'checkpoint.bin'), CHECKPOINT_INTERVAL='0.2')
+    os.environ.update(SERVER_HOST='127.0.0.1', SERVER_PORT=env['SERVER_PORT'],
+                      RECONNECT_BASE=str(args.base), STATE_DELTAS='1')
+    server = Server(env)
+    server.start()
+
+    recorder = Recorder()
+    bots = [StormBot(f'Storm_{index}', recorder, args.backoff) for index in range(args.bots)]
+    for bot in bots:
+        original = bot.join_message
+        bot.join_message = lambda original=original: dict(original(), room='storm')
+        threading.Thread(target=bot.run, daemon=True).start()
+
+    if not wait_for(lambda: len(server.players()) == args.bots, 30, step=0.05):
+        print(f"Échec : {len(server.players())}/{args.bots} joueurs connectés")
+        server.stop()
+        sys.exit(1)
+    tokens = {bot.player_name: bot.session for bot in bots}
+    states_before = {player['name']: player['alive'] for player in server.players()}
+    print(f"{args.bots} joueurs connectés (backoff {args.backoff}, base {args.base}s)")
+
+    # 1. Coupure réseau : reprise de session
+    start = time.monotonic()
+    for bot in bots:
+        bot.cut()
+    back = wait_for(lambda: len(server.players()) == args.bots
+                    and all(bot.session == tokens[bot.player_name] for bot in bots), 30, step=0.05)
+    state = server.api('/api/state?room=storm')
+    kept = back and {p['name']: p['alive'] for p in state['players']} == states_before
+    print(f"Coupure : retour de tous en {time.monotonic() - start:.2f}s, "
+          f"même jeton et même état : {'oui' if kept else 'NON'}")
+
+    # 2. Redémarrage du serveur : les sessions sont perdues (sauf reprise d'un
+    # instantané), tout le monde revient
+    tokens = {bot.player_name: bot.session for bot in bots}
+    time.sleep(0.5)  # Dernier relevé écrit après la reprise de l'étape 1
+    server.stop()
+    stopped = time.monotonic()
+    time.sleep(args.downtime)
+    server.start()
+    restarted = time.monotonic()
+    recovered = wait_for(lambda: len(server.players()) == args.bots, 120, step=0.05)
+    elapsed = time.monotonic() - restarted
+    attempt_peak, attempts = rate_profile(recorder.attempts, stopped)
+    accept_peak, accepted = rate_profile(recorder.connected, restarted)
+    print(f"Redémarrage ({args.downtime:.0f}s d'arrêt) : "
+          f"{'tous revenus' if recovered else 'retour incomplet'} {elapsed:.2f}s après la relance")
+    print(f"  tentatives : {attempts} au total, pic {attempt_peak:.0f}/s")
+    print(f"  connexions acceptées : {accepted}, pic {accept_peak:.0f}/s")
+    if args.checkpoint:
+        state = server.api('/api/state?room=storm')
+        restored = recovered and all(bot.session == tokens[bot.player_name] for bot in bots) \
+            and {p['name']: p['alive'] for p in state['players']} == states_before
+        print(f"  reprise de l'instantané, même jeton et même état : {'oui' if restored else 'NON'}")
+        recovered = restored
+
+    server.stop()
+    directory.cleanup()
+    sys.exit(0 if kept and recovered else 1)
+
+if __name__ == '__main__':
+    main()
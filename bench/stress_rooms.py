@@ -0,0 +1,190 @@
+"""Test de charge concurrente : aucun blocage du thread de jeu.
+
+Lance un serveur (mode threaded) dans le processus, puis des clients
+qui rejoignent, passent la bombe dès qu'ils la reçoivent et repartent,
+en boucle, dans des salles explicites et par matchmaking. Pendant ce
+temps une sonde mesure le délai de réponse du thread de jeu
+(scheduler.call_soon) et de l'API (/health). À la fin, toutes les
+salles doivent avoir été fermées.
+
+Code de sortie 1 si un délai dépasse --max-stall ou si une salle reste
+ouverte sans joueur.
+
+    python bench/stress_rooms.py [--clients 64] [--duration 10] [--max-stall 0.5]
+"""
+import argparse
+import contextlib
+import http.client
+import json
+import os
+import random
+import socket
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, 'vm1'), os.path.join(ROOT, 'vm1', 'server')]
+
+from common.protocol import FrameDecoder, encode_json, decode_json
+from helpers import free_port
+
+class Counters:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.joins = 0
+        self.passes = 0
+        self.errors = 0
+
+    def add(self, name):
+        with self.lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+def play_session(port, index, deadline, counters):
+    """Une visite : JOIN, quelques passages, puis départ (ou coupure brutale)"""
+    sock = socket.create_connection(('127.0.0.1', port), timeout=5)
+    sock.settimeout(0.2)
+    decoder = FrameDecoder()
+    join = {'type': 'JOIN', 'player_id': f's{index}-{random.randrange(10 ** 6)}', 'player_name': f'S{index}'}
+    if random.random() < 0.5:
+        join['room'] = f'stress-{random.randrange(4)}'
+    if random.random() < 0.5:
+        join['deltas'] = True
+    try:
+        sock.sendall(encode_json(join))
+        counters.add('joins')
+        leave_at = min(deadline, time.monotonic() + random.uniform(0.05, 1.5))
+        while time.monotonic() < leave_at:
+            try:
+                data = sock.recv(65536)
+            except socket.timeout:
+                continue
+            if not data:
+                break
+            decoder.feed(data)
+            for frame in decoder.frames():
+                message = decode_json(frame)
+                if message['type'] == 'RECEIVE_BOMB' and message['available_targets']:
+                    target = random.choice(message['available_targets'])
+                    sock.sendall(encode_json({'type': 'PASS_BOMB', 'to': target}))
+                    counters.add('passes')
+        if random.random() < 0.2:
+            # Départ brutal : RST au lieu de FIN
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, b'\x01\x00\x00\x00\x00\x00\x00\x00')
+    finally:
+        sock.close()
+
+def client(port, index, deadline, counters):
+    while time.monotonic() < deadline:
+        try:
+            play_session(port, index, deadline, counters)
+        except OSError:
+            counters.add('errors')
+
+class Probe:
+    """Délai de réponse du thread de jeu et de l'API, mesuré en continu"""
+
+    def __init__(self, server, period):
+        self.server = server
+        self.period = period
+        self.writer = []
+        self.api = []
+        self.running = True
+
+    def probe_writer(self):
+        while self.running:
+            done = threading.Event()
+            start = time.monotonic()
+            self.server.scheduler.call_soon(done.set)
+            # Pas de délai d'attente : un thread de jeu bloqué se voit dans la mesure
+            done.wait()
+            self.writer.append(time.monotonic() - start)
+            time.sleep(self.period)
+
+    def probe_api(self):
+        while self.running:
+            start = time.monotonic()
+            try:
+                conn = http.client.HTTPConnection('127.0.0.1', self.server.api_port, timeout=10)
+                conn.request('GET', '/health')
+                json.loads(conn.getresponse().read())
+                conn.close()
+            except OSError:
+                pass
+            self.api.append(time.monotonic() - start)
+            time.sleep(self.period)
+
+def summary(values):
+    values = sorted(values)
+    if not values:
+        return 'aucune mesure', 0
+    p99 = values[min(len(values) - 1, int(0.99 * len(values)))]
+    return f"p50 {values[len(values) // 2] * 1000:.2f} ms | p99 {p99 * 1000:.2f} ms | max {values[-1] * 1000:.2f} ms", values[-1]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=64)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--max-stall', type=float, default=0.5, help='délai maximal toléré (s)')
+    args = parser.parse_args()
+
+    os.environ.update({
+        'SERVER_PORT': str(free_port()),
+        'API_PORT': str(free_port()),
+        'SERVER_MODE': 'threaded',
+        'MIN_TIMER': '1',
+        'MAX_TIMER': '2',
+        'ROOM_CAPACITY': '8'
+    })
+    from server import BombGameServer
+    server = BombGameServer()
+    server.restart_delay = 0.2
+    server.log = lambda message: None
+    probe = Probe(server, 0.02)
+    counters = Counters()
+    # Le serveur affiche chaque connexion : sortie ignorée pendant le test
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        threading.Thread(target=server.start, daemon=True).start()
+        while server.scheduler is None:
+            time.sleep(0.05)
+        time.sleep(0.2)
+
+        probes = [threading.Thread(target=probe.probe_writer, daemon=True),
+                  threading.Thread(target=probe.probe_api, daemon=True)]
+        for thread in probes:
+            thread.start()
+
+        deadline = time.monotonic() + args.duration
+        clients = [threading.Thread(target=client, args=(server.port, index, deadline, counters), daemon=True)
+                   for index in range(args.clients)]
+        for thread in clients:
+            thread.start()
+        for thread in clients:
+            thread.join()
+
+        # Laisser le thread de jeu traiter les derniers départs
+        time.sleep(0.5)
+        probe.running = False
+        for thread in probes:
+            thread.join()
+
+    writer, writer_max = summary(probe.writer)
+    api, api_max = summary(probe.api)
+    leftover = [room.get_summary() for room in server.rooms.all()]
+    print(f"{args.clients} clients, {args.duration:.0f}s : {counters.joins} JOIN, "
+          f"{counters.passes} passages, {counters.errors} erreurs de connexion")
+    print(f"Thread de jeu : {writer}")
+    print(f"API /health   : {api}")
+    print(f"Salles restantes : {leftover}")
+
+    failed = False
+    if max(writer_max, api_max) > args.max_stall:
+        print(f"ÉCHEC : blocage de plus de {args.max_stall * 1000:.0f} ms")
+        failed = True
+    if leftover:
+        print("ÉCHEC : salle(s) non fermée(s) après le départ de tous les joueurs")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
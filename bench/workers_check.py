@@ -0,0 +1,108 @@
+"""Plusieurs workers sur un même port (WORKERS=2, SO_REUSEPORT).
+
+Le noyau répartit les connexions entre les workers sans tenir compte des
+salles. Lance un serveur à deux workers, puis vérifie :
+
+1. que 6 joueurs qui demandent la salle "arena" se retrouvent tous dans
+   la même partie, quel que soit le worker qui a accepté leur connexion ;
+2. que MIN_PLAYERS joueurs sans salle (matchmaking) lancent une partie ;
+3. que l'API du worker 0 (API_PORT, la seule exposée) liste les salles
+   des deux workers et relaie l'état de celles de l'autre (la salle
+   "w1-side" appartient au worker 1 par son préfixe) ;
+4. que /metrics agrège les deux workers (label worker, en-têtes uniques).
+
+Code de sortie 1 si une vérification échoue.
+
+    python bench/workers_check.py [--mode threaded|asyncio]
+"""
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+from helpers import QuietPlayer, free_port, wait_for
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--mode', default='threaded', choices=('threaded', 'asyncio'))
+    args = parser.parse_args()
+
+    port, api_port = free_port(), free_port()
+    env = dict(os.environ, SERVER_PORT=str(port), API_PORT=str(api_port), SERVER_MODE=args.mode,
+               WORKERS='2', ROOM_CAPACITY='4', MIN_PLAYERS='2', CLUSTER_HEARTBEAT='0.2',
+               MIN_TIMER='3600', MAX_TIMER='3600')
+    server = subprocess.Popen([sys.executable, '-u', os.path.join(ROOT, 'vm1', 'server', 'server.py')],
+                              env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                              start_new_session=True)
+    failures = []
+
+    def check(label, ok):
+        print(f"{'ok   ' if ok else 'ÉCHEC'} {label}")
+        if not ok:
+            failures.append(label)
+
+    def api(path):
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{api_port}{path}', timeout=2) as response:
+                return response.read()
+        except OSError:
+            return None
+
+    def rooms():
+        return json.loads(api('/api/rooms') or b'{}').get('rooms', [])
+
+    def join(name, room=None):
+        player = QuietPlayer(name, reaction_time=1.0)
+        player.server_host = '127.0.0.1'
+        player.server_port = port
+        player.room = room
+        threading.Thread(target=player.run, daemon=True).start()
+        return player
+
+    try:
+        check("les deux workers se voient",
+              wait_for(lambda: json.loads(api('/api/rooms') or b'{}').get('nodes') == ['w0', 'w1']))
+
+        # 1. Une salle nommée, des connexions acceptées par l'un ou l'autre worker
+        for index in range(6):
+            join(f'Arena_{index}', 'arena')
+        check("6 joueurs dans une seule salle arena", wait_for(lambda: [
+            (room['room'], room['players']) for room in rooms() if room['room'] == 'arena'] == [('arena', 6)]))
+
+        # 2. Matchmaking : MIN_PLAYERS joueurs suffisent pour lancer une partie
+        for index in range(2):
+            join(f'Match_{index}')
+        check("partie lancée par le matchmaking", wait_for(lambda: any(
+            room['room'] != 'arena' and room['players'] == 2 and room['game_started'] for room in rooms())))
+
+        # 3. L'API exposée voit et relaie les salles de l'autre worker
+        for index in range(3):
+            join(f'Side_{index}', 'w1-side')
+        check("salles des deux workers listées", wait_for(lambda: ('w1-side', 'w1') in [
+            (room['room'], room['node']) for room in rooms()] and {room['node'] for room in rooms()} == {'w0', 'w1'}))
+        state = json.loads(api('/api/state?room=w1-side') or b'{}')
+        check("état d'une salle de l'autre worker relayé",
+              state.get('worker') == 1 and len(state.get('players', ())) == 3)
+        state = json.loads(api('/api/state') or b'{}')
+        check("état par défaut : la salle la plus peuplée", state.get('room') == 'arena')
+
+        # 4. Métriques des deux workers sur le port exposé
+        metrics = (api('/metrics') or b'').decode()
+        check("métriques des deux workers",
+              'bomb_players{worker="0"}' in metrics and 'bomb_players{worker="1"}' in metrics
+              and metrics.count('# TYPE bomb_players ') == 1)
+    finally:
+        # Workers et annuaire compris
+        os.killpg(server.pid, signal.SIGKILL)
+        server.wait()
+
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,210 @@
+"""Encodage binaire compact, négocié au JOIN ("encoding": "binary").
+
+Le JOIN reste une ligne JSON. Le serveur répond par une ligne JSON
+WELCOME qui donne au joueur son numéro et la table des joueurs de la
+salle (numéro, identifiant, nom), puis les deux côtés passent aux trames
+préfixées par leur longueur (voir FrameDecoder(framing='length')).
+
+Dans une trame, les joueurs sont désignés par leur numéro dans la salle
+(entier sur 2 octets) au lieu de leur nom : un GAME_STATE coûte 2 octets
+par joueur, le bit de poids fort portant l'état vivant/mort (d'où une
+limite de 32768 joueurs, numérotés jusqu'à MAX_NUMBER, par salle où il
+y a des joueurs binaires : au-delà, le serveur refuse le JOIN avec
+REJECT "full").
+ClientCodec retraduit les numéros pour produire les mêmes dictionnaires
+que le protocole JSON : le code de jeu du joueur ne change pas.
+"""
+import struct
+
+from common.protocol import FrameError, encode_length_prefixed
+
+GAME_STATE = 1
+RECEIVE_BOMB = 2
+EXPLODE = 3
+WINNER = 4
+PASS_BOMB = 5
+PLAYER_JOINED = 6
+PLAYER_LEFT = 7
+STATE_DELTA = 8
+RESYNC = 9
+PING = 10
+
+# Nature d'un STATE_DELTA
+DELTA_KINDS = {'holder': 1, 'died': 2, 'joined': 3, 'left': 4}
+DELTA_NAMES = {code: kind for kind, code in DELTA_KINDS.items()}
+
+NO_PLAYER = 0xFFFF
+ALIVE_BIT = 0x8000
+MAX_NUMBER = ALIVE_BIT - 1
+
+_STATE_HEADER = struct.Struct('!BIHfH')   # type, séquence, porteur, timer, nombre de joueurs
+_BOMB_HEADER = struct.Struct('!BfHH')     # type, timer, émetteur, nombre de cibles
+_EXPLODE_HEADER = struct.Struct('!BHH')   # type, victime, nombre de survivants
+_PLAYER = struct.Struct('!BH')            # type, numéro
+_DELTA = struct.Struct('!BIBHf')          # type, séquence, nature, joueur, timer
+
+def _numbers(numbers):
+    return struct.pack(f'!{len(numbers)}H', *numbers)
+
+def _unpack_numbers(payload, offset, count):
+    try:
+        return struct.unpack_from(f'!{count}H', payload, offset)
+    except struct.error as e:
+        raise FrameError(f"Trame binaire tronquée: {e}") from e
+
+def _text(value):
+    # Tronqué à 255 octets sans couper un caractère multi-octets
+    data = value.encode('utf-8')[:255].decode('utf-8', 'ignore').encode('utf-8')
+    return bytes((len(data),)) + data
+
+# Encodeurs côté serveur (les appelants fournissent directement les numéros)
+
+def encode_game_state(seq, players, holder, timer):
+    """players : [(numéro, vivant)], holder : numéro ou None"""
+    return encode_length_prefixed(
+        _STATE_HEADER.pack(GAME_STATE, seq, NO_PLAYER if holder is None else holder, timer, len(players))
+        + _numbers([number | ALIVE_BIT if alive else number for number, alive in players])
+    )
+
+def encode_receive_bomb(timer, targets, sender=None):
+    return encode_length_prefixed(
+        _BOMB_HEADER.pack(RECEIVE_BOMB, timer, NO_PLAYER if sender is None else sender, len(targets))
+        + _numbers(targets)
+    )
+
+def encode_explode(victim, survivors):
+    return encode_length_prefixed(
+        _EXPLODE_HEADER.pack(EXPLODE, victim, len(survivors)) + _numbers(survivors)
+    )
+
+def encode_winner(winner):
+    return encode_length_prefixed(_PLAYER.pack(WINNER, winner))
+
+def encode_player_joined(number, player_id, name):
+    return encode_length_prefixed(_PLAYER.pack(PLAYER_JOINED, number) + _text(player_id) + _text(name))
+
+def encode_player_left(number):
+    return encode_length_prefixed(_PLAYER.pack(PLAYER_LEFT, number))
+
+def encode_delta(seq, kind, player, timer):
+    """player : numéro ou None (porteur retiré)"""
+    return encode_length_prefixed(
+        _DELTA.pack(STATE_DELTA, seq, DELTA_KINDS[kind], NO_PLAYER if player is None else player, timer)
+    )
+
+def decode_receive_bomb(frame):
+    """(timer, numéro de l'émetteur ou None, numéros des cibles) d'une trame RECEIVE_BOMB"""
+    _, timer, sender, count = _BOMB_HEADER.unpack_from(frame)
+    return timer, None if sender == NO_PLAYER else sender, _unpack_numbers(frame, _BOMB_HEADER.size, count)
+
+def decode_client(frame):
+    """Trame envoyée par un joueur : (type, numéro de la cible ou None)"""
+    if len(frame) == 1 and frame[0] in (RESYNC, PING):
+        return frame[0], None
+    try:
+        msg_type, number = _PLAYER.unpack(frame)
+    except struct.error as e:
+        raise FrameError(f"Trame binaire invalide: {e}") from e
+    if msg_type != PASS_BOMB:
+        raise FrameError(f"Type de trame inattendu: {msg_type}")
+    return msg_type, number
+
+class ClientCodec:
+    """Côté joueur : table des numéros de la salle et traduction vers les messages JSON"""
+
+    def __init__(self):
+        self.players = {}  # {numéro: (player_id, nom)}
+        self.numbers = {}  # {player_id: numéro}
+
+    def load_welcome(self, welcome):
+        self.players.clear()
+        self.numbers.clear()
+        for number, player_id, name in welcome['players']:
+            self.add(number, player_id, name)
+
+    def add(self, number, player_id, name):
+        previous = self.players.get(number)
+        if previous is not None and self.numbers.get(previous[0]) == number:
+            del self.numbers[previous[0]]
+        self.players[number] = (player_id, name)
+        self.numbers[player_id] = number
+
+    def remove(self, number):
+        previous = self.players.pop(number, None)
+        if previous is not None and self.numbers.get(previous[0]) == number:
+            del self.numbers[previous[0]]
+
+    def name(self, number):
+        return self.players.get(number, (None, f'#{number}'))[1]
+
+    def encode(self, message):
+        """PASS_BOMB, RESYNC et PING partent en binaire ; None si la cible est inconnue"""
+        if message['type'] in ('RESYNC', 'PING'):
+            return encode_length_prefixed(bytes((RESYNC if message['type'] == 'RESYNC' else PING,)))
+        if message['type'] != 'PASS_BOMB':
+            return None
+        number = self.numbers.get(message['to'])
+        if number is None:
+            return None
+        return encode_length_prefixed(_PLAYER.pack(PASS_BOMB, number))
+
+    def decode(self, frame):
+        """Retourner le message au format JSON, ou None pour une trame de service"""
+        if not frame:
+            raise FrameError("Trame binaire vide")
+        msg_type = frame[0]
+        try:
+            if msg_type == GAME_STATE:
+                _, seq, holder, timer, count = _STATE_HEADER.unpack_from(frame)
+                entries = _unpack_numbers(frame, _STATE_HEADER.size, count)
+                return {
+                    'type': 'GAME_STATE',
+                    'seq': seq,
+                    'players': [{'name': self.name(entry & MAX_NUMBER), 'alive': bool(entry & ALIVE_BIT)}
+                                for entry in entries],
+                    'current_holder': None if holder == NO_PLAYER else self.name(holder),
+                    'timer': round(timer, 1)
+                }
+            if msg_type == STATE_DELTA:
+                _, seq, kind, player, timer = _DELTA.unpack(frame)
+                delta = {'type': 'STATE_DELTA', 'seq': seq, 'kind': DELTA_NAMES[kind], 'timer': round(timer, 1)}
+                if player != NO_PLAYER:
+                    delta['player'] = self.name(player)
+                return delta
+            if msg_type == RECEIVE_BOMB:
+                timer, sender, targets = decode_receive_bomb(frame)
+                message = {
+                    'type': 'RECEIVE_BOMB',
+                    'timer': timer,
+                    'available_targets': [self.players[n][0] for n in targets if n in self.players]
+                }
+                if sender is not None:
+                    message['from'] = self.name(sender)
+                return message
+            if msg_type == EXPLODE:
+                _, victim, count = _EXPLODE_HEADER.unpack_from(frame)
+                survivors = _unpack_numbers(frame, _EXPLODE_HEADER.size, count)
+                return {
+                    'type': 'EXPLODE',
+                    'victim': self.name(victim),
+                    'survivors': [self.name(n) for n in survivors]
+                }
+            if msg_type == WINNER:
+                _, winner = _PLAYER.unpack(frame)
+                return {'type': 'WINNER', 'winner': self.name(winner)}
+            if msg_type == PLAYER_JOINED:
+                _, number = _PLAYER.unpack_from(frame)
+                offset = _PLAYER.size
+                size = frame[offset]
+                player_id = frame[offset + 1:offset + 1 + size].decode('utf-8')
+                offset += 1 + size
+                name = frame[offset + 1:offset + 1 + frame[offset]].decode('utf-8')
+                self.add(number, player_id, name)
+                return None
+            if msg_type == PLAYER_LEFT:
+                _, number = _PLAYER.unpack(frame)
+                self.remove(number)
+                return None
+        except (struct.error, IndexError, KeyError, UnicodeDecodeError) as e:
+            raise FrameError(f"Trame binaire invalide: {e}") from e
+        raise FrameError(f"Type de trame inconnu: {msg_type}")
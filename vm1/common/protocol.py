@@ -0,0 +1,109 @@
+"""Protocole réseau partagé entre le serveur et les joueurs.
+
+Les messages sont des objets JSON séparés par un saut de ligne. Le
+décodeur accepte aussi un découpage par préfixe de longueur (4 octets,
+big-endian) pour les encodages binaires.
+"""
+import json
+import struct
+
+MAX_FRAME_SIZE = 64 * 1024
+
+_LENGTH = struct.Struct('!I')
+
+class FrameError(ValueError):
+    """Flux invalide : trame trop grande ou message illisible"""
+
+class FrameDecoder:
+    """Découpe incrémentale d'un flux TCP en trames.
+
+    Les octets reçus sont accumulés dans un bytearray ; la recherche du
+    séparateur reprend là où elle s'était arrêtée, donc chaque octet
+    n'est parcouru qu'une fois même si une trame arrive en plusieurs
+    morceaux. Le découpage se fait sur les octets bruts : un caractère
+    UTF-8 multi-octets coupé entre deux recv() est simplement complété
+    au recv() suivant avant d'être décodé.
+    """
+
+    def __init__(self, framing='newline', max_frame=MAX_FRAME_SIZE):
+        self.framing = framing  # 'newline' ou 'length'
+        self.max_frame = max_frame
+        self.buffer = bytearray()
+        self.start = 0  # Début de la prochaine trame
+        self.scan = 0   # Octets déjà parcourus à la recherche de '\n'
+
+    def feed(self, data):
+        """Ajouter des octets reçus au tampon"""
+        if self.start:
+            # Compacter une seule fois par lecture (pas à chaque trame)
+            del self.buffer[:self.start]
+            self.scan -= self.start
+            self.start = 0
+        self.buffer += data
+
+    def next_frame(self):
+        """Retourner la prochaine trame complète (bytes) ou None"""
+        if self.framing == 'length':
+            return self._next_length_frame()
+
+        while True:
+            pos = self.buffer.find(b'\n', self.scan)
+            if pos < 0:
+                self.scan = len(self.buffer)
+                if self.scan - self.start > self.max_frame:
+                    raise FrameError(f"Trame de plus de {self.max_frame} octets")
+                return None
+
+            frame = bytes(self.buffer[self.start:pos])
+            self.start = self.scan = pos + 1
+            if len(frame) > self.max_frame:
+                raise FrameError(f"Trame de plus de {self.max_frame} octets")
+            if frame.strip():
+                return frame
+
+    def _next_length_frame(self):
+        if len(self.buffer) - self.start < _LENGTH.size:
+            return None
+
+        (size,) = _LENGTH.unpack_from(self.buffer, self.start)
+        if size > self.max_frame:
+            raise FrameError(f"Trame de {size} octets (max {self.max_frame})")
+
+        end = self.start + _LENGTH.size + size
+        if len(self.buffer) < end:
+            return None
+
+        frame = bytes(self.buffer[self.start + _LENGTH.size:end])
+        self.start = self.scan = end
+        return frame
+
+    def remaining(self):
+        """Octets reçus qui n'appartiennent à aucune trame déjà rendue"""
+        return bytes(self.buffer[self.start:])
+
+    def frames(self):
+        """Itérer sur les trames disponibles.
+
+        Le générateur relit self.framing à chaque trame : l'appelant peut
+        changer de découpage entre deux trames (négociation au JOIN).
+        """
+        while True:
+            frame = self.next_frame()
+            if frame is None:
+                return
+            yield frame
+
+def encode_json(message):
+    """Sérialiser un message en une ligne JSON"""
+    return (json.dumps(message) + '\n').encode('utf-8')
+
+def decode_json(frame):
+    """Décoder une trame JSON (bytes) en message"""
+    try:
+        return json.loads(frame.decode('utf-8'))
+    except (UnicodeDecodeError, ValueError) as e:
+        raise FrameError(f"Message illisible: {e}") from e
+
+def encode_length_prefixed(payload):
+    """Préfixer une charge utile par sa longueur"""
+    return _LENGTH.pack(len(payload)) + payload
@@ -0,0 +1,235 @@
+"""Planification d'actions à échéance sur horloge monotone.
+
+TimerScheduler garde les échéances dans un tas et un seul thread dort
+jusqu'à la plus proche : aucun réveil quand rien n'est planifié, et le
+nombre de timers simultanés n'influe pas sur le nombre de threads.
+LoopScheduler offre la même interface au-dessus d'une boucle asyncio,
+et VirtualScheduler au-dessus d'une horloge virtuelle (simulation).
+
+call_soon() fait du planificateur une file de commandes : le serveur y
+envoie tout ce qui modifie l'état du jeu, qui n'est donc jamais écrit
+que par un seul thread (celui des timers, ou la boucle asyncio).
+"""
+import collections
+import heapq
+import itertools
+import threading
+import time
+
+class DriftStats:
+    """Retard mesuré entre l'échéance prévue et le déclenchement réel"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+        self.histogram = None  # Histogramme optionnel qui reçoit aussi chaque mesure
+
+    def record(self, drift):
+        self.count += 1
+        self.total += drift
+        self.last = drift
+        if drift > self.max:
+            self.max = drift
+        if self.histogram is not None:
+            self.histogram.observe(drift)
+
+    def as_dict(self):
+        return {
+            'fired': self.count,
+            'mean_ms': round(self.total / self.count * 1000, 3) if self.count else 0,
+            'max_ms': round(self.max * 1000, 3),
+            'last_ms': round(self.last * 1000, 3)
+        }
+
+class TimerHandle:
+    __slots__ = ('deadline', 'callback', 'args', 'cancelled')
+
+    def __init__(self, deadline, callback, args):
+        self.deadline = deadline
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+class TimerScheduler:
+    """Tas d'échéances servi par un thread unique (réveil par Condition)"""
+
+    def __init__(self, name='scheduler'):
+        self.name = name
+        self.heap = []
+        self.cond = threading.Condition()
+        self.counter = itertools.count()
+        self.ready = collections.deque()  # Commandes à exécuter dès que possible
+        self.drift = DriftStats()
+        self.queue_delay = DriftStats()  # Attente des commandes dans la file
+        self.run_time = None  # Histogramme optionnel de la durée de chaque action
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name=self.name, daemon=True)
+        self.thread.start()
+        return self
+
+    def time(self):
+        return time.monotonic()
+
+    def call_later(self, delay, callback, *args):
+        return self.call_at(time.monotonic() + delay, callback, *args)
+
+    def call_soon(self, callback, *args):
+        """Exécuter callback sur le thread du planificateur, dans l'ordre d'arrivée"""
+        handle = TimerHandle(time.monotonic(), callback, args)
+        with self.cond:
+            self.ready.append(handle)
+            if len(self.ready) == 1:
+                self.cond.notify()
+        return handle
+
+    def call_at(self, deadline, callback, *args):
+        handle = TimerHandle(deadline, callback, args)
+        with self.cond:
+            heapq.heappush(self.heap, (deadline, next(self.counter), handle))
+            # Réveiller le thread seulement si l'échéance la plus proche change
+            if self.heap[0][2] is handle:
+                self.cond.notify()
+        return handle
+
+    def run(self):
+        while True:
+            handle, stats = self._next_due()
+            start = time.monotonic()
+            stats.record(start - handle.deadline)
+            try:
+                handle.callback(*handle.args)
+            except Exception as e:
+                print(f"Erreur timer {handle.callback.__name__}: {e}")
+            if self.run_time is not None:
+                self.run_time.observe(time.monotonic() - start)
+
+    def _next_due(self):
+        """Prochain timer échu, sinon prochaine commande ; attend s'il n'y a rien"""
+        with self.cond:
+            while True:
+                while self.heap and self.heap[0][2].cancelled:
+                    heapq.heappop(self.heap)
+                delay = self.heap[0][0] - time.monotonic() if self.heap else None
+                # Les timers échus passent avant les commandes : une rafale de
+                # messages ne retarde pas une explosion
+                if delay is not None and delay <= 0:
+                    return heapq.heappop(self.heap)[2], self.drift
+                if self.ready:
+                    return self.ready.popleft(), self.queue_delay
+                self.cond.wait(delay)
+
+class LoopScheduler:
+    """Même interface que TimerScheduler, déléguée à une boucle asyncio.
+
+    loop.time() repose sur time.monotonic() : les échéances sont
+    directement comparables à celles de TimerScheduler.
+    """
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.loop_thread = threading.get_ident()  # Créé depuis la boucle
+        self.drift = DriftStats()
+        self.queue_delay = DriftStats()
+        self.run_time = None
+
+    def time(self):
+        return self.loop.time()
+
+    def call_later(self, delay, callback, *args):
+        return self.call_at(self.loop.time() + delay, callback, *args)
+
+    def call_soon(self, callback, *args):
+        if threading.get_ident() == self.loop_thread:
+            return self.loop.call_soon(self._run_soon, self.loop.time(), callback, args)
+        return self.loop.call_soon_threadsafe(self._run_soon, self.loop.time(), callback, args)
+
+    def call_at(self, deadline, callback, *args):
+        return self.loop.call_at(deadline, self._fire, deadline, callback, args)
+
+    def _run_soon(self, queued, callback, args):
+        self._run(self.queue_delay, queued, callback, args)
+
+    def _fire(self, deadline, callback, args):
+        self._run(self.drift, deadline, callback, args)
+
+    def _run(self, stats, due, callback, args):
+        start = self.loop.time()
+        stats.record(start - due)
+        if self.run_time is None:
+            callback(*args)
+            return
+        try:
+            callback(*args)
+        finally:
+            self.run_time.observe(self.loop.time() - start)
+
+class VirtualScheduler:
+    """Même interface sur une horloge virtuelle, sans thread ni attente.
+
+    run() exécute les actions dans l'ordre du TimerScheduler (timers échus
+    d'abord, puis commandes) et saute directement à l'échéance suivante :
+    des heures de jeu s'exécutent en quelques secondes, et deux exécutions
+    avec les mêmes entrées donnent exactement la même suite d'actions.
+    """
+
+    def __init__(self, start=0.0):
+        self.now = start
+        self.heap = []
+        self.counter = itertools.count()
+        self.ready = collections.deque()
+        self.drift = DriftStats()
+        self.queue_delay = DriftStats()
+        self.run_time = None
+
+    def start(self):
+        return self
+
+    def time(self):
+        return self.now
+
+    def call_later(self, delay, callback, *args):
+        return self.call_at(self.now + delay, callback, *args)
+
+    def call_soon(self, callback, *args):
+        handle = TimerHandle(self.now, callback, args)
+        self.ready.append(handle)
+        return handle
+
+    def call_at(self, deadline, callback, *args):
+        handle = TimerHandle(deadline, callback, args)
+        heapq.heappush(self.heap, (deadline, next(self.counter), handle))
+        return handle
+
+    def run(self, until=None, limit=None):
+        """Exécuter jusqu'à l'instant virtuel until (tout, si None) ou jusqu'à limit actions.
+
+        Retourne le nombre d'actions exécutées.
+        """
+        heap, ready = self.heap, self.ready
+        actions = 0
+        while limit is None or actions < limit:
+            while heap and heap[0][2].cancelled:
+                heapq.heappop(heap)
+            if heap and heap[0][0] <= self.now:
+                handle = heapq.heappop(heap)[2]
+            elif ready:
+                handle = ready.popleft()
+            elif heap and (until is None or heap[0][0] <= until):
+                # Rien à faire d'ici la prochaine échéance : l'horloge y saute
+                self.now = heap[0][0]
+                continue
+            else:
+                if until is not None and until > self.now:
+                    self.now = until
+                break
+            if not handle.cancelled:
+                handle.callback(*handle.args)
+                actions += 1
+        return actions
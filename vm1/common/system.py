@@ -0,0 +1,14 @@
+"""Réglages du processus partagés par le serveur et le générateur de charge."""
+
+def raise_nofile_limit():
+    """Relever la limite de descripteurs pour accepter des milliers de connexions"""
+    try:
+        import resource
+    except ImportError:
+        return  # Windows
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+        except (ValueError, OSError):
+            pass
@@ -0,0 +1,276 @@
+"""Générateur de charge : des milliers de BombPlayer virtuels dans un processus.
+
+Chaque bot est un BombPlayer (même JOIN, même choix de cible, même
+temps de réaction) dont les entrées/sorties passent par une boucle
+asyncio commune : pas de thread par joueur ni par bombe. Les connexions
+sont ouvertes progressivement (--rate par seconde) et le rapport donne
+la latence de connexion (JOIN jusqu'au premier GAME_STATE), la latence
+aller-retour d'un passage (PASS_BOMB envoyé jusqu'au RECEIVE_BOMB reçu
+par la cible) et le débit de messages reçus.
+
+    python player/loadgen.py --players 2000 --rate 200 --duration 60
+    python player/loadgen.py --players 10000 --processes 4 --reaction 0.2
+
+Avec --processes, les bots sont répartis entre plusieurs processus ; un
+passage vers un bot d'un autre processus n'est pas chronométré.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.protocol import FrameDecoder, FrameError
+from common.system import raise_nofile_limit
+from player import BombPlayer
+
+class VirtualPlayer(BombPlayer):
+    """BombPlayer dont le socket et les timers appartiennent à la boucle du générateur.
+
+    Pas de self.socket ici : la connexion est self.transport.
+    """
+
+    def __init__(self, harness, player_name, reaction_time):
+        super().__init__(player_name, reaction_time)
+        self.resume = False  # Pas de reconnexion : inutile de réserver la place
+        self.harness = harness
+        self.transport = None
+        self.joined_at = None
+
+    def log(self, message):
+        pass
+
+    def schedule_pass(self, delay, token):
+        return self.harness.loop.call_later(delay, self._execute_pass_bomb, token)
+
+    def schedule_keepalive(self):
+        if self.keepalive > 0:
+            self.harness.loop.call_later(self.keepalive, self._send_keepalive, self.transport)
+
+    def _send_keepalive(self, transport):
+        # Connexion remplacée entre-temps (REDIRECT) : la nouvelle a son propre PING
+        if transport is self.transport and self.send_message({'type': 'PING'}):
+            self.schedule_keepalive()
+
+    def send_message(self, message):
+        if self.transport is None or self.transport.is_closing():
+            return False
+        data = self.encode_message(message)
+        if data is None:
+            return False
+        if message['type'] == 'PASS_BOMB':
+            self.harness.pass_sent(self.player_name, message['to'])
+        self.transport.write(data)
+        return True
+
+    def handle_message(self, message):
+        self.harness.on_message(self, message)
+        if message['type'] == 'REDIRECT':
+            # Salle sur un autre nœud : nouvelle connexion depuis la boucle du générateur
+            self.server_host = message['host']
+            self.server_port = message['port']
+            self.transport.close()
+            self.harness.loop.create_task(self.harness.open(self))
+            return
+        super().handle_message(message)
+
+class BotProtocol(asyncio.Protocol):
+    def __init__(self, player):
+        self.player = player
+
+    def connection_made(self, transport):
+        self.player.transport = transport
+
+    def data_received(self, data):
+        try:
+            self.player.feed(data)
+        except FrameError:
+            # Trame trop grande : le flux n'est plus exploitable
+            self.player.harness.errors += 1
+            self.player.transport.close()
+
+    def connection_lost(self, exc):
+        self.player.harness.disconnected += 1
+
+class LoadHarness:
+    """Un lot de bots sur une boucle asyncio et leurs mesures"""
+
+    def __init__(self, host, port, players, rate, duration, reaction, encoding, prefix, interval):
+        self.host = host
+        self.port = port
+        self.players = players
+        self.rate = rate
+        self.duration = duration
+        self.reaction = reaction
+        self.encoding = encoding
+        self.prefix = prefix
+        self.interval = interval
+        self.loop = None
+        self.connect_latencies = []
+        self.handoff_latencies = []
+        self.pending_passes = {}  # {(player_id cible, nom de l'émetteur): instant de l'envoi}
+        self.connected = 0
+        self.disconnected = 0
+        self.errors = 0
+        self.messages = 0
+        self.handoffs = 0
+
+    def pass_sent(self, sender_name, target_id):
+        self.pending_passes[(target_id, sender_name)] = time.perf_counter()
+
+    def on_message(self, player, message):
+        self.messages += 1
+        if message['type'] == 'REJECT':
+            # Refusé par le contrôle d'admission : ni connexion ni latence
+            self.errors += 1
+            player.joined_at = None
+            return
+        if message['type'] == 'REDIRECT':
+            # La latence de connexion est mesurée sur le nœud désigné
+            return
+        if player.joined_at is not None:
+            # Premier message reçu après le JOIN : le serveur a accepté le joueur
+            self.connect_latencies.append(time.perf_counter() - player.joined_at)
+            player.joined_at = None
+        if message['type'] == 'RECEIVE_BOMB' and 'from' in message:
+            self.handoffs += 1
+            sent = self.pending_passes.pop((player.player_id, message['from']), None)
+            if sent is not None:
+                self.handoff_latencies.append(time.perf_counter() - sent)
+
+    async def connect(self, index):
+        player = VirtualPlayer(self, f'{self.prefix}-{index}', self.reaction)
+        player.encoding = self.encoding
+        player.server_host = self.host
+        player.server_port = self.port
+        await self.open(player)
+
+    async def open(self, player):
+        """Connecter un bot à son serveur (ou au nœud d'un REDIRECT) et envoyer son JOIN"""
+        player.decoder = FrameDecoder()
+        try:
+            await self.loop.create_connection(lambda: BotProtocol(player), player.server_host, player.server_port)
+        except OSError:
+            self.errors += 1
+            return
+        self.connected += 1
+        player.joined_at = time.perf_counter()
+        player.send_message(player.join_message())
+        player.schedule_keepalive()
+
+    async def run(self):
+        self.loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        reporter = self.loop.create_task(self.report_progress(start))
+
+        # Montée en charge : --rate connexions par seconde
+        tasks = []
+        for index in range(self.players):
+            tasks.append(self.loop.create_task(self.connect(index)))
+            await asyncio.sleep(1 / self.rate)
+        await asyncio.gather(*tasks)
+
+        remaining = self.duration - (time.perf_counter() - start)
+        if remaining > 0:
+            await asyncio.sleep(remaining)
+        reporter.cancel()
+        return self.result(time.perf_counter() - start)
+
+    async def report_progress(self, start):
+        if not self.interval:
+            return
+        last_messages, last_handoffs = 0, 0
+        while True:
+            await asyncio.sleep(self.interval)
+            elapsed = time.perf_counter() - start
+            print(f"[{self.prefix} {elapsed:6.1f}s] connectés {self.connected - self.disconnected}"
+                  f" | {(self.messages - last_messages) / self.interval:.0f} msg/s"
+                  f" | {(self.handoffs - last_handoffs) / self.interval:.1f} passages/s"
+                  f" | erreurs {self.errors}", flush=True)
+            last_messages, last_handoffs = self.messages, self.handoffs
+
+    def result(self, elapsed):
+        return {
+            'elapsed': elapsed,
+            'connected': self.connected,
+            'disconnected': self.disconnected,
+            'errors': self.errors,
+            'messages': self.messages,
+            'handoffs': self.handoffs,
+            'connect_latencies': self.connect_latencies,
+            'handoff_latencies': self.handoff_latencies
+        }
+
+def run_shard(options):
+    raise_nofile_limit()
+    harness = LoadHarness(**options)
+    return asyncio.run(harness.run())
+
+def percentiles(values):
+    if not values:
+        return 'aucune mesure'
+    values = sorted(values)
+    def at(q):
+        return values[min(len(values) - 1, int(q * len(values)))] * 1000
+    return (f"p50 {at(0.50):.1f} ms | p90 {at(0.90):.1f} ms | "
+            f"p99 {at(0.99):.1f} ms | max {values[-1] * 1000:.1f} ms ({len(values)} mesures)")
+
+def merge(results):
+    merged = {key: 0 for key in ('connected', 'disconnected', 'errors', 'messages', 'handoffs')}
+    merged['elapsed'] = max(result['elapsed'] for result in results)
+    merged['connect_latencies'] = []
+    merged['handoff_latencies'] = []
+    for result in results:
+        for key in ('connected', 'disconnected', 'errors', 'messages', 'handoffs'):
+            merged[key] += result[key]
+        merged['connect_latencies'] += result['connect_latencies']
+        merged['handoff_latencies'] += result['handoff_latencies']
+    return merged
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default=os.getenv('SERVER_HOST', 'localhost'))
+    parser.add_argument('--port', type=int, default=int(os.getenv('SERVER_PORT', 5000)))
+    parser.add_argument('--players', type=int, default=1000)
+    parser.add_argument('--rate', type=float, default=100, help='connexions ouvertes par seconde')
+    parser.add_argument('--duration', type=float, default=30, help='durée totale du test (s)')
+    parser.add_argument('--reaction', type=float, help='temps de réaction fixe (défaut : comme BombPlayer)')
+    parser.add_argument('--encoding', choices=('json', 'binary'), default=os.getenv('WIRE_ENCODING', 'json'))
+    parser.add_argument('--processes', type=int, default=1)
+    parser.add_argument('--prefix', default='bot', help='préfixe des noms de bots (plusieurs générateurs)')
+    parser.add_argument('--interval', type=float, default=5, help='période du rapport intermédiaire (0 : aucun)')
+    args = parser.parse_args()
+
+    processes = max(1, args.processes)
+    shards = [
+        {
+            'host': args.host,
+            'port': args.port,
+            'players': args.players // processes + (1 if shard < args.players % processes else 0),
+            'rate': args.rate / processes,
+            'duration': args.duration,
+            'reaction': args.reaction,
+            'encoding': args.encoding,
+            'prefix': f'{args.prefix}{shard}' if processes > 1 else args.prefix,
+            'interval': args.interval
+        }
+        for shard in range(processes)
+    ]
+
+    if processes == 1:
+        result = run_shard(shards[0])
+    else:
+        with multiprocessing.Pool(processes) as pool:
+            result = merge(pool.map(run_shard, shards))
+
+    elapsed = result['elapsed']
+    print(f"\n=== {args.players} bots, {elapsed:.1f}s ===")
+    print(f"Connexions : {result['connected']} ouvertes, {result['disconnected']} perdues, {result['errors']} erreurs")
+    print(f"Latence de connexion : {percentiles(result['connect_latencies'])}")
+    print(f"Aller-retour d'un passage : {percentiles(result['handoff_latencies'])}")
+    print(f"Débit : {result['messages'] / elapsed:.0f} messages reçus/s, {result['handoffs'] / elapsed:.1f} passages/s")
+
+if __name__ == '__main__':
+    main()
@@ -1,85 +1,187 @@
 import socket
-import json
 import threading
 import time
 import random
 import os
 import sys
 
+# common/ est copié à côté du script dans l'image, et se trouve dans vm1/ dans le dépôt
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.protocol import FrameDecoder, FrameError, encode_json, decode_json
+from common.scheduler import TimerScheduler
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+def shared_scheduler():
+    """Thread de timers unique pour tous les joueurs du processus"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = TimerScheduler('player-timer').start()
+        return _scheduler
+
 class BombPlayer:
-    def __init__(self):
-        self.player_name = os.getenv('PLAYER_NAME', f'Player_{random.randint(1000, 9999)}')
+    def __init__(self, player_name=None, reaction_time=None):
+        self.player_name = player_name or os.getenv('PLAYER_NAME', f'Player_{random.randint(1000, 9999)}')
         self.player_id = self.player_name.lower().replace(' ', '_')
         self.server_host = os.getenv('SERVER_HOST', 'localhost')
         self.server_port = int(os.getenv('SERVER_PORT', 5000))
         # Temps de réaction simulé
-        self.reaction_time = float(os.getenv('REACTION_TIME', random.uniform(1, 4)))
+        if reaction_time is None:
+            reaction_time = float(os.getenv('REACTION_TIME', random.uniform(1, 4)))
+        self.reaction_time = reaction_time
+        # 'json' (lignes JSON) ou 'binary' (encodage compact négocié au JOIN)
+        self.encoding = os.getenv('WIRE_ENCODING', 'json')
+        # Demander les STATE_DELTA plutôt que l'état complet à chaque changement
+        self.state_deltas = os.getenv('STATE_DELTAS', '1') == '1'
+        # Reprise de session : le jeton reçu au JOIN permet de retrouver sa place
+        self.resume = os.getenv('SESSION_RESUME', '1') == '1'
+        self.session = None
+        # Salle demandée (sinon matchmaking) ; fixée par le serveur au premier JOIN
+        self.room = os.getenv('ROOM') or None
+        self.redirected = False
+        # Reconnexion : backoff exponentiel avec jitter (secondes)
+        self.reconnect_base = float(os.getenv('RECONNECT_BASE', 0.5))
+        self.reconnect_max = float(os.getenv('RECONNECT_MAX', 30))
+        self.max_retries = int(os.getenv('RECONNECT_ATTEMPTS', 10))
+        # Délai imposé par un REJECT, ajouté au prochain backoff
+        self.retry_after = 0
+        # PING périodique (secondes) : le serveur coupe les connexions muettes
+        self.keepalive = float(os.getenv('KEEPALIVE', 30))
         
         self.socket = None
+        self.decoder = FrameDecoder()
+        self.codec = None  # ClientCodec, chargé si le serveur accepte l'encodage binaire
         self.has_bomb = False
         self.available_targets = []
+        # Passage planifié et numéro de la bombe qu'il concerne : une bombe
+        # reçue ou perdue entre-temps rend le passage obsolète
+        self.pending_pass = None
+        self.bomb_token = 0
+        
+        # État de la partie tenu à jour par les GAME_STATE et STATE_DELTA
+        self.players = {}  # {nom: vivant}
+        self.current_holder = None
+        self.timer = 0
+        self.state_seq = None
+        self.resync_pending = False
         
         # Verrou pour éviter que deux threads écrivent dans le socket en même temps
         self.lock = threading.Lock() 
 
-    def connect(self):
-        max_retries = 10
-        retry_delay = 3
-        
-        for attempt in range(max_retries):
+    def connect(self, reconnecting=False):
+        for attempt in range(self.max_retries):
+            if reconnecting or attempt > 0:
+                # Même après une coupure, attendre avant le premier essai : les
+                # joueurs coupés en même temps ne reviennent pas tous ensemble
+                delay = self.reconnect_delay(attempt) + self.retry_after
+                self.retry_after = 0
+                self.log(f"Nouvelle tentative dans {delay:.1f}s...")
+                time.sleep(delay)
             try:
-                print(f"Tentative de connexion ({attempt + 1}/{max_retries})...")
-                self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                self.socket.connect((self.server_host, self.server_port))
+                self.log(f"Tentative de connexion ({attempt + 1}/{self.max_retries})...")
+                self.socket = self.open_connection()
+                self.decoder = FrameDecoder()
                 
-                join_message = {
-                    'type': 'JOIN',
-                    'player_id': self.player_id,
-                    'player_name': self.player_name
-                }
-                self.send_message(join_message)
+                self.send_message(self.join_message())
+                self.schedule_keepalive()
                 
-                print(f"Connecté au serveur en tant que {self.player_name}")
+                self.log(f"Connecté au serveur en tant que {self.player_name}")
                 return True
                 
             except Exception as e:
-                print(f"Échec de connexion: {e}")
-                if attempt < max_retries - 1:
-                    time.sleep(retry_delay)
-                else:
-                    print("Impossible de se connecter au serveur")
-                    return False
+                self.log(f"Échec de connexion: {e}")
+                if self.socket:
+                    self.socket.close()
+        self.log("Impossible de se connecter au serveur")
+        return False
+    
+    def open_connection(self):
+        return socket.create_connection((self.server_host, self.server_port))
+    
+    def reconnect_delay(self, attempt):
+        """Backoff exponentiel plafonné, jitter complet (tirage entre 0 et le plafond)"""
+        return random.uniform(0, min(self.reconnect_max, self.reconnect_base * 2 ** attempt))
+    
+    def join_message(self):
+        message = {
+            'type': 'JOIN',
+            'player_id': self.player_id,
+            'player_name': self.player_name
+        }
+        if self.encoding == 'binary':
+            message['encoding'] = 'binary'
+        if self.state_deltas:
+            message['deltas'] = True
+        if self.room:
+            message['room'] = self.room
+        if self.resume:
+            # None au premier JOIN : demande un jeton ; ensuite, reprise de la place
+            message['session'] = self.session
+        return message
     
     def run(self):
         if not self.connect():
             return
         
-        try:
-            buffer = ""
-            while True:
-                # Lecture bloquante standard
-                data = self.socket.recv(4096).decode('utf-8')
-                if not data:
-                    print("Connexion perdue avec le serveur")
-                    break
-                
-                buffer += data
-                
-                while '\n' in buffer:
-                    line, buffer = buffer.split('\n', 1)
-                    if line.strip():
-                        try:
-                            message = json.loads(line)
-                            self.handle_message(message)
-                        except json.JSONDecodeError as e:
-                            print(f"Erreur JSON: {e}")
-                
-        except Exception as e:
-            print(f"Erreur critique: {e}")
-        finally:
-            if self.socket:
+        while True:
+            try:
+                while True:
+                    # Lecture bloquante standard
+                    data = self.socket.recv(4096)
+                    if not data:
+                        self.log("Connexion perdue avec le serveur")
+                        break
+                    
+                    self.feed(data)
+                    
+            except Exception as e:
+                self.log(f"Erreur critique: {e}")
+            finally:
                 self.socket.close()
-            print(f"{self.player_name} a quitté la partie")
+            
+            # Bombe perdue avec la connexion ; le serveur la renverra à la reprise
+            self.drop_bomb()
+            # Après un REDIRECT, le nœud désigné attend le joueur : pas de délai
+            reconnecting = not self.redirected
+            self.redirected = False
+            if not self.connect(reconnecting=reconnecting):
+                break
+        self.log(f"{self.player_name} a quitté la partie")
+    
+    def feed(self, data):
+        """Découper les octets reçus en messages et les traiter"""
+        self.decoder.feed(data)
+        for frame in self.decoder.frames():
+            try:
+                message = self.decode_frame(frame)
+            except FrameError as e:
+                self.log(f"Erreur de trame: {e}")
+                continue
+            if message is not None:
+                self.handle_message(message)
+    
+    def decode_frame(self, frame):
+        if self.decoder.framing == 'length':
+            return self.codec.decode(frame)
+        
+        message = decode_json(frame)
+        if message['type'] == 'WELCOME' and message.get('encoding') == 'binary':
+            # Le serveur accepte l'encodage binaire : la suite arrive en trames préfixées
+            if self.codec is None:
+                from common.codec import ClientCodec
+                self.codec = ClientCodec()
+            self.codec.load_welcome(message)
+            self.decoder.framing = 'length'
+            return None
+        return message
+    
+    def encode_message(self, message):
+        """Octets à envoyer, ou None si le message n'a pas d'équivalent binaire"""
+        if self.decoder.framing == 'length':
+            return self.codec.encode(message)
+        return encode_json(message)
     
     def handle_message(self, message):
         msg_type = message['type']
@@ -87,61 +189,111 @@ class BombPlayer:
         if msg_type == 'RECEIVE_BOMB':
             self.receive_bomb(message)
         
+        elif msg_type == 'SESSION':
+            if message['token'] != self.session and self.session is not None:
+                self.log("Session expirée : nouvelle place dans la partie")
+            self.session = message['token']
+            # En cas de reprise, revenir dans la même salle (et donc sur le même nœud)
+            self.room = message.get('room', self.room)
+        
+        elif msg_type == 'REDIRECT':
+            # Salle hébergée par un autre nœud du cluster
+            self.log(f"Salle {message['room']} sur {message['host']}:{message['port']}, reconnexion...")
+            self.server_host = message['host']
+            self.server_port = message['port']
+            self.redirected = True
+            self.socket.shutdown(socket.SHUT_RDWR)
+        
+        elif msg_type == 'REJECT':
+            # Serveur plein ou identifiant déjà en jeu : le serveur ferme la connexion
+            self.log(f"Connexion refusée ({message['reason']})")
+            self.retry_after = message.get('retry', 0)
+        
         elif msg_type == 'GAME_STATE':
             self.display_game_state(message)
         
+        elif msg_type == 'STATE_DELTA':
+            self.apply_delta(message)
+        
         elif msg_type == 'EXPLODE':
             victim = message['victim']
+            # La bombe en cours n'existe plus : annuler un passage planifié
+            self.drop_bomb()
             if victim == self.player_name:
-                print(f"\nBOOOM ! Vous avez explosé !\n")
-                self.has_bomb = False # Important : on n'a plus la bombe
+                self.log(f"\nBOOOM ! Vous avez explosé !\n")
             else:
-                print(f"\n{victim} a explosé !")
+                self.log(f"\n{victim} a explosé !")
                 survivors = message['survivors']
-                print(f"Survivants: {', '.join(survivors)}\n")
+                self.log(f"Survivants: {', '.join(survivors)}\n")
         
         elif msg_type == 'WINNER':
+            self.drop_bomb()
             winner = message['winner']
             if winner == self.player_name:
-                print(f"\nVICTOIRE ! Vous avez gagné !\n")
+                self.log(f"\nVICTOIRE ! Vous avez gagné !\n")
             else:
-                print(f"\n{winner} a gagné la partie\n")
+                self.log(f"\n{winner} a gagné la partie\n")
     
     def receive_bomb(self, message):
+        self.cancel_pass()
+        self.bomb_token += 1
         self.has_bomb = True
         timer = message['timer']
         self.available_targets = message.get('available_targets', [])
         
         from_player = message.get('from', 'le serveur')
-        print(f"\nVous avez reçu la BOMBE de {from_player} !")
-        print(f"Timer: {timer:.1f}s")
+        self.log(f"\nVous avez reçu la BOMBE de {from_player} !")
+        self.log(f"Timer: {timer:.1f}s")
         
         # Calcul du temps de "réflexion"
         wait_time = min(self.reaction_time, timer * 0.7)
-        print(f"Réflexion pendant {wait_time:.1f}s...")
+        self.log(f"Réflexion pendant {wait_time:.1f}s...")
         
-        # IMPORTANT: Utilisation d'un Timer pour ne pas bloquer la boucle de lecture
-        t = threading.Timer(wait_time, self._execute_pass_bomb)
-        t.start()
+        self.pending_pass = self.schedule_pass(wait_time, self.bomb_token)
+    
+    def schedule_pass(self, delay, token):
+        """Planifier le passage sans bloquer la lecture ; retourne un objet annulable"""
+        return shared_scheduler().call_later(delay, self._execute_pass_bomb, token)
+    
+    def schedule_keepalive(self):
+        if self.keepalive > 0:
+            shared_scheduler().call_later(self.keepalive, self._send_keepalive, self.socket)
+    
+    def _send_keepalive(self, sock):
+        # Connexion remplacée entre-temps : la nouvelle a son propre PING
+        if sock is self.socket and self.send_message({'type': 'PING'}):
+            self.schedule_keepalive()
+    
+    def cancel_pass(self):
+        if self.pending_pass is not None:
+            self.pending_pass.cancel()
+            self.pending_pass = None
+    
+    def drop_bomb(self):
+        """La bombe n'est plus à nous (explosion, fin de partie, autre porteur)"""
+        self.cancel_pass()
+        self.bomb_token += 1
+        self.has_bomb = False
         
-    def _execute_pass_bomb(self):
-        """Cette fonction est appelée par le thread Timer après le délai"""
-        # Vérification critique : a-t-on toujours la bombe ?
-        if not self.has_bomb:
+    def _execute_pass_bomb(self, token):
+        """Appelée par le thread des timers après le délai de réflexion"""
+        # Passage obsolète : la bombe a explosé ou une autre est arrivée entre-temps
+        if not self.has_bomb or token != self.bomb_token:
             return
+        self.pending_pass = None
 
         if self.available_targets:
             target = random.choice(self.available_targets)
             self.pass_bomb(target)
         else:
-            print("Aucune cible disponible pour passer la bombe !")
+            self.log("Aucune cible disponible pour passer la bombe !")
 
     def pass_bomb(self, target_id):
         # Double sécurité
         if not self.has_bomb:
             return
         
-        print(f"Passage de la bombe à {target_id}...")
+        self.log(f"Passage de la bombe à {target_id}...")
         
         message = {
             'type': 'PASS_BOMB',
@@ -153,29 +305,74 @@ class BombPlayer:
             self.has_bomb = False
     
     def display_game_state(self, state):
-        players = state['players']
-        current_holder = state.get('current_holder')
-        timer = state.get('timer', 0)
+        # État complet (keyframe) : remplace l'état local
+        self.players = {player['name']: player['alive'] for player in state['players']}
+        self.current_holder = state.get('current_holder')
+        if self.has_bomb and self.current_holder != self.player_name:
+            self.drop_bomb()
+        self.timer = state.get('timer', 0)
+        self.state_seq = state.get('seq')
+        self.resync_pending = False
         
         # On peut décommenter pour voir l'état en temps réel
-        # print(f"DEBUG: État reçu. Porteur: {current_holder}")
+        # print(f"DEBUG: État reçu. Porteur: {self.current_holder}")
+    
+    def apply_delta(self, delta):
+        if self.state_seq is None or delta['seq'] != self.state_seq + 1:
+            # Delta manquant : redemander un état complet (une seule fois)
+            if not self.resync_pending:
+                self.resync_pending = True
+                self.send_message({'type': 'RESYNC'})
+            return
+        
+        self.state_seq = delta['seq']
+        self.timer = delta['timer']
+        kind = delta['kind']
+        player = delta.get('player')
+        if kind == 'holder':
+            self.current_holder = player
+            if self.has_bomb and player != self.player_name:
+                self.drop_bomb()
+        elif kind == 'died':
+            self.players[player] = False
+        elif kind == 'joined':
+            self.players[player] = True
+        elif kind == 'left':
+            self.players.pop(player, None)
+    
+    def log(self, message):
+        # Point unique d'affichage : le générateur de charge le rend silencieux
+        print(message)
     
     def send_message(self, message):
         """Envoie un message de manière thread-safe"""
         try:
-            data = (json.dumps(message) + '\n').encode('utf-8')
+            data = self.encode_message(message)
+            if data is None:
+                return False
             # Le verrou assure que le thread principal et le thread Timer
             # ne mélangent pas leurs données dans le socket
             with self.lock:
                 self.socket.sendall(data)
             return True
         except Exception as e:
-            print(f"Erreur d'envoi: {e}")
+            self.log(f"Erreur d'envoi: {e}")
             return False
 
 if __name__ == '__main__':
     try:
-        player = BombPlayer()
-        player.run()
+        # BOTS=N : plusieurs joueurs dans le même conteneur (un thread de lecture
+        # chacun, un seul thread de timers pour tous)
+        bots = int(os.getenv('BOTS', 1))
+        if bots == 1:
+            BombPlayer().run()
+        else:
+            base = os.getenv('PLAYER_NAME', f'Player_{random.randint(1000, 9999)}')
+            threads = [threading.Thread(target=BombPlayer(f'{base}_{index}').run, daemon=True)
+                       for index in range(bots)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
     except KeyboardInterrupt:
         print("\nArrêt manuel du joueur.")
\ No newline at end of file
@@ -0,0 +1,142 @@
+"""Contrôle d'admission sur le port de jeu.
+
+Borne ce que des clients lents, muets ou trop bavards peuvent coûter :
+
+- MAX_CONNECTIONS : au-delà, la connexion reçoit un REJECT ("full", avec
+  un délai conseillé) et est fermée aussitôt, sans thread ni décodeur ;
+- JOIN_TIMEOUT : délai pour envoyer le JOIN après l'ouverture ;
+- IDLE_TIMEOUT : silence maximal d'un joueur connecté (les joueurs
+  envoient un PING toutes les KEEPALIVE secondes) ; libère aussi les
+  sockets à moitié ouverts. 0 désactive ;
+- MESSAGE_RATE / MESSAGE_BURST : seau à jetons par connexion. Les
+  messages en excès sont ignorés ; un client qui continue au-delà d'une
+  deuxième rafale est déconnecté.
+
+Un thread unique vérifie les délais, seulement tant qu'une connexion est
+ouverte : sans connexion, il attend la suivante sans se réveiller. Refus
+et expulsions sont comptés par motif (/health et /metrics).
+"""
+import collections
+import threading
+import time
+
+class Evicted(Exception):
+    """Connexion coupée par le contrôle d'admission"""
+
+class Ticket:
+    """État d'admission d'une connexion"""
+    __slots__ = ('opened', 'last_read', 'joined', 'tokens', 'evicted')
+
+    def __init__(self, now, burst):
+        self.opened = now
+        self.last_read = now
+        self.joined = False
+        self.tokens = burst
+        self.evicted = False
+
+class Admission:
+    def __init__(self, max_connections=0, join_timeout=10.0, idle_timeout=0.0, rate=0.0, burst=0, retry=5.0):
+        self.max_connections = max_connections  # 0 : pas de limite
+        self.retry = retry  # Délai conseillé aux clients refusés (serveur plein)
+        self.join_timeout = join_timeout
+        self.idle_timeout = idle_timeout
+        self.rate = rate  # Messages par seconde et par connexion (0 : pas de limite)
+        self.burst = max(burst, 1)
+        self.tickets = {}  # {connexion: Ticket}
+        self.lock = threading.Lock()
+        self.armed = threading.Condition(self.lock)  # Signalée à la première connexion
+        self.rejected = collections.Counter()  # {motif: connexions refusées}
+        self.evicted = collections.Counter()   # {motif: connexions coupées}
+        self.dropped = 0  # Messages ignorés (débit dépassé)
+        self.thread = None
+
+    def start(self):
+        timeouts = [timeout for timeout in (self.join_timeout, self.idle_timeout) if timeout > 0]
+        if self.thread is None and timeouts:
+            # Vérification plusieurs fois par délai, au plus une fois par seconde
+            interval = max(0.05, min([1.0] + [timeout / 4 for timeout in timeouts]))
+            self.thread = threading.Thread(target=self.run, args=(interval,), name='admission', daemon=True)
+            self.thread.start()
+        return self
+
+    def admit(self, conn):
+        """Enregistrer une nouvelle connexion ; False si le serveur est plein"""
+        with self.lock:
+            if self.max_connections and len(self.tickets) >= self.max_connections:
+                return False
+            self.tickets[conn] = Ticket(time.monotonic(), self.burst)
+            if len(self.tickets) == 1:
+                self.armed.notify()
+            return True
+
+    def release(self, conn):
+        with self.lock:
+            self.tickets.pop(conn, None)
+
+    def joined(self, conn):
+        ticket = self.tickets.get(conn)
+        if ticket is not None:
+            ticket.joined = True
+
+    def reject(self, reason):
+        with self.lock:
+            self.rejected[reason] += 1
+
+    def allow(self, conn):
+        """Une trame reçue : False si elle doit être ignorée, Evicted si le client inonde.
+
+        Les trames d'une connexion refusée ou déjà coupée sont ignorées.
+        """
+        ticket = self.tickets.get(conn)
+        if ticket is None or ticket.evicted:
+            return False
+        now = time.monotonic()
+        if self.rate:
+            ticket.tokens = min(self.burst, ticket.tokens + (now - ticket.last_read) * self.rate) - 1
+            if ticket.tokens < 0:
+                if ticket.tokens < -self.burst:
+                    self.evict(conn, ticket, 'flood')
+                    raise Evicted("trop de messages")
+                self.dropped += 1
+                ticket.last_read = now
+                return False
+        ticket.last_read = now
+        return True
+
+    def run(self, interval):
+        while True:
+            with self.armed:
+                while not self.tickets:
+                    self.armed.wait()
+            time.sleep(interval)
+            self.sweep()
+
+    def sweep(self):
+        """Couper les connexions sans JOIN à temps, ou silencieuses trop longtemps"""
+        now = time.monotonic()
+        with self.lock:
+            tickets = list(self.tickets.items())
+        for conn, ticket in tickets:
+            if ticket.evicted:
+                continue
+            if not ticket.joined:
+                if self.join_timeout and now - ticket.opened > self.join_timeout:
+                    self.evict(conn, ticket, 'join_timeout')
+            elif self.idle_timeout and now - ticket.last_read > self.idle_timeout:
+                self.evict(conn, ticket, 'idle')
+
+    def evict(self, conn, ticket, reason):
+        ticket.evicted = True
+        with self.lock:
+            self.evicted[reason] += 1
+        conn.abort()
+
+    def as_dict(self):
+        with self.lock:
+            return {
+                'open': len(self.tickets),
+                'max': self.max_connections,
+                'rejected': dict(self.rejected),
+                'evicted': dict(self.evicted),
+                'dropped_messages': self.dropped
+            }
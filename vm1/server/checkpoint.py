@@ -0,0 +1,210 @@
+"""Instantanés des parties en cours et reprise au redémarrage.
+
+Toutes les CHECKPOINT_INTERVAL secondes, le thread de jeu relève l'état
+de chaque salle (GameRoom.checkpoint : des tuples, sans encodage). Un
+thread dédié encode le dernier relevé en binaire compact et l'écrit
+dans un fichier temporaire, remplacé atomiquement après fsync : un arrêt
+brutal pendant l'écriture laisse l'instantané précédent intact.
+
+Au démarrage (CHECKPOINT_RESTORE=1), les salles sont recréées avant
+toute connexion, joueurs détachés : chacun revient avec son jeton de
+session (voir GameRoom.resume_player). L'horloge monotone ne survivant
+pas au redémarrage, la bombe repart avec le temps qui lui restait au
+moment du relevé.
+
+    python server/checkpoint.py /data/checkpoint.bin   # contenu d'un instantané
+"""
+import json
+import os
+import struct
+import sys
+import threading
+import time
+
+MAGIC = b'BOMBCKP1'
+NO_PLAYER = 0xFFFF
+# Numéros de joueur sur 2 octets (0xFFFF : pas de porteur)
+MAX_PLAYERS = NO_PLAYER
+
+_HEADER = struct.Struct('!8sdI')   # magique, date du relevé, nombre de salles
+_ROOM = struct.Struct('!?IIfHI')   # partie commencée, manche, séquence, temps restant, porteur, nombre de joueurs
+_PLAYER = struct.Struct('!H?')     # numéro, vivant
+_LENGTH = struct.Struct('!H')
+
+def _text(value):
+    data = (value or '').encode('utf-8')
+    return _LENGTH.pack(len(data)) + data
+
+def encode(taken, rooms):
+    """Instantané binaire de relevés GameRoom.checkpoint()"""
+    parts = [_HEADER.pack(MAGIC, taken, len(rooms))]
+    for room_id, started, bomb_round, seq, remaining, holder, players in rooms:
+        parts.append(_text(room_id))
+        parts.append(_ROOM.pack(started, bomb_round, seq, remaining,
+                                NO_PLAYER if holder < 0 else holder, len(players)))
+        for number, alive, player_id, name, session in players:
+            parts.append(_PLAYER.pack(number, alive))
+            parts.append(_text(player_id))
+            parts.append(_text(name))
+            parts.append(_text(session))
+    return b''.join(parts)
+
+def decode(data):
+    """(date du relevé, relevés) ; ValueError si l'instantané est illisible"""
+    offset = 0
+
+    def unpack(layout):
+        nonlocal offset
+        values = layout.unpack_from(data, offset)
+        offset += layout.size
+        return values
+
+    def text():
+        nonlocal offset
+        length, = unpack(_LENGTH)
+        if offset + length > len(data):
+            raise ValueError("Instantané tronqué")
+        value = data[offset:offset + length].decode('utf-8')
+        offset += length
+        return value
+
+    try:
+        magic, taken, count = unpack(_HEADER)
+        if magic != MAGIC:
+            raise ValueError("Ce fichier n'est pas un instantané")
+        rooms = []
+        for _ in range(count):
+            room_id = text()
+            started, bomb_round, seq, remaining, holder, size = unpack(_ROOM)
+            players = []
+            for _ in range(size):
+                number, alive = unpack(_PLAYER)
+                players.append((number, alive, text(), text(), text() or None))
+            rooms.append((room_id, started, bomb_round, seq, remaining,
+                          -1 if holder == NO_PLAYER else holder, players))
+    except (struct.error, UnicodeDecodeError) as e:
+        raise ValueError(f"Instantané illisible: {e}") from e
+    return taken, rooms
+
+def write_atomic(path, data):
+    temporary = f'{path}.tmp'
+    with open(temporary, 'wb') as snapshot:
+        snapshot.write(data)
+        snapshot.flush()
+        os.fsync(snapshot.fileno())
+    os.replace(temporary, path)
+
+def read(path):
+    with open(path, 'rb') as snapshot:
+        return decode(snapshot.read())
+
+class Checkpointer:
+    """Relevés périodiques des salles d'un serveur, écrits hors du thread de jeu"""
+
+    def __init__(self, server, path, interval=1.0):
+        self.server = server
+        self.path = path
+        self.interval = interval
+        self.condition = threading.Condition()
+        self.pending = None  # Dernier relevé pas encore écrit (les plus anciens sont sautés)
+        self.skipped = set()  # Salles trop grandes pour l'instantané, déjà signalées
+        self.thread = None
+        self.written = 0
+        self.size = 0
+        self.capture_time = 0.0
+        self.write_time = 0.0
+
+    def start(self, restore=False):
+        """Lancer l'écriture ; restore : reprendre d'abord le dernier instantané"""
+        if self.thread is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            scheduler = self.server.scheduler
+            if restore:
+                # Premier élément de la file du thread de jeu : avant tout JOIN
+                scheduler.call_soon(self.restore)
+            scheduler.call_later(self.interval, self.capture)
+            self.thread = threading.Thread(target=self.run, name='checkpoint', daemon=True)
+            self.thread.start()
+        return self
+
+    def capture(self):
+        """Relever toutes les salles (thread de jeu), puis replanifier le relevé suivant"""
+        start = time.perf_counter()
+        rooms = []
+        for room in self.server.rooms.all():
+            if len(room.registry) > MAX_PLAYERS:
+                if room.room_id not in self.skipped:
+                    self.skipped.add(room.room_id)
+                    self.server.log(f"Instantané sans la salle {room.room_id} : "
+                                    f"{len(room.registry)} joueurs (max {MAX_PLAYERS})")
+                continue
+            rooms.append(room.checkpoint())
+        self.capture_time = time.perf_counter() - start
+        with self.condition:
+            self.pending = (time.time(), rooms)
+            self.condition.notify()
+        self.server.scheduler.call_later(self.interval, self.capture)
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.pending is None:
+                    self.condition.wait()
+                taken, rooms = self.pending
+                self.pending = None
+            try:
+                self.write(taken, rooms)
+            except (OSError, struct.error, ValueError) as e:
+                # Le thread continue : le relevé suivant sera peut-être encodable
+                print(f"Erreur instantané {self.path}: {e}")
+
+    def write(self, taken, rooms):
+        start = time.perf_counter()
+        data = encode(taken, rooms)
+        write_atomic(self.path, data)
+        self.write_time = time.perf_counter() - start
+        self.size = len(data)
+        self.written += 1
+
+    def restore(self):
+        """Recréer les salles du dernier instantané (thread de jeu)"""
+        try:
+            taken, rooms = read(self.path)
+        except FileNotFoundError:
+            return 0
+        except (OSError, ValueError) as e:
+            print(f"Instantané {self.path} ignoré: {e}")
+            return 0
+        restored = players = 0
+        for room_id, *snapshot in rooms:
+            if snapshot[-1]:
+                self.server.rooms.restore(room_id, snapshot)
+                restored += 1
+                players += len(snapshot[-1])
+        message = f"Reprise de {restored} salle(s), {players} joueurs (instantané de {time.time() - taken:.0f}s)"
+        self.server.log(message)
+        self.server.add_event('info', message)
+        return restored
+
+    def as_dict(self):
+        return {
+            'written': self.written,
+            'bytes': self.size,
+            'capture_ms': round(self.capture_time * 1000, 3),
+            'write_ms': round(self.write_time * 1000, 3)
+        }
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        print("Usage: python checkpoint.py <instantané>")
+        sys.exit(1)
+    taken, rooms = read(sys.argv[1])
+    print(json.dumps({
+        'taken': taken,
+        'rooms': [{'room': room_id, 'game_started': started, 'timer': round(remaining, 1),
+                   'players': [{'name': name, 'alive': alive, 'has_bomb': number == holder}
+                               for number, alive, _, name, _ in players]}
+                  for room_id, started, _, _, remaining, holder, players in rooms]
+    }, indent=2, ensure_ascii=False))
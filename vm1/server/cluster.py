@@ -0,0 +1,237 @@
+"""Plusieurs nœuds serveur qui se partagent les salles.
+
+Chaque nœud publie périodiquement (CLUSTER_HEARTBEAT) son adresse et le
+résumé de ses salles dans un backend partagé qui sert d'annuaire :
+
+- une salle nommée appartient au premier nœud qui la réserve (claim) ;
+  un JOIN reçu par un autre nœud est renvoyé vers lui (REDIRECT) ;
+- /api/state et /api/rooms agrègent les salles de tous les nœuds, l'état
+  détaillé d'une salle distante étant relayé depuis l'API de son nœud ;
+- un nœud silencieux depuis CLUSTER_TTL secondes est considéré comme
+  mort : ses salles disparaissent de l'annuaire et peuvent être reprises.
+
+Backends (CLUSTER_BACKEND) :
+- memory : dans le processus (défaut, un seul nœud, comme avant : pas
+  de thread de signe de vie) ;
+- sqlite : fichier partagé (CLUSTER_DB) par des nœuds sur un même hôte
+  ou volume. Le routage d'un JOIN y prend un verrou d'écriture (jusqu'à
+  5 s d'attente) : ce backend impose SERVER_MODE=threaded, où seul le
+  thread du joueur attend. Un backend réseau (Redis...) n'a qu'à fournir les mêmes
+  méthodes que MemoryBackend.
+
+Les workers d'un même port (WORKERS > 1) forment aussi un cluster, dont
+l'annuaire est un MemoryBackend partagé (voir workers.py).
+"""
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import urllib.parse
+import urllib.request
+
+class MemoryBackend:
+    """Annuaire dans le processus (un seul nœud, ou plusieurs dans un même test)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.nodes = {}  # {node_id: (infos, dernier signe de vie)}
+        self.rooms = {}  # {room_id: [node_id, résumé ou None, mise à jour]}
+
+    def heartbeat(self, info, summaries, ttl):
+        """Publier les salles d'un nœud ; oublie ses salles fermées depuis plus de ttl"""
+        now = time.time()
+        node_id = info['node']
+        with self.lock:
+            self.nodes[node_id] = (info, now)
+            published = {summary['room'] for summary in summaries}
+            for room_id, row in list(self.rooms.items()):
+                if row[0] == node_id and room_id not in published:
+                    row[1] = None
+                    if row[2] < now - ttl:
+                        del self.rooms[room_id]
+            for summary in summaries:
+                self.rooms[summary['room']] = [node_id, summary, now]
+
+    def claim(self, room_id, node_id, ttl):
+        """Réserver une salle ; retourne le nœud propriétaire (éventuellement un autre)"""
+        now = time.time()
+        with self.lock:
+            row = self.rooms.get(room_id)
+            if row is not None and row[0] != node_id and self._alive(row[0], now, ttl):
+                return row[0]
+            self.rooms[room_id] = [node_id, row[1] if row and row[0] == node_id else None, now]
+            return node_id
+
+    def _alive(self, node_id, now, ttl):
+        node = self.nodes.get(node_id)
+        return node is not None and node[1] >= now - ttl
+
+    def live_nodes(self, ttl):
+        now = time.time()
+        with self.lock:
+            return {node_id: info for node_id, (info, seen) in self.nodes.items() if seen >= now - ttl}
+
+    def room_summaries(self, ttl):
+        now = time.time()
+        with self.lock:
+            return [dict(summary, node=node_id) for node_id, summary, _ in self.rooms.values()
+                    if summary is not None and self._alive(node_id, now, ttl)]
+
+class SQLiteBackend:
+    """Annuaire dans un fichier SQLite partagé (mode WAL, une transaction par opération)"""
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.db = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock:
+            self.db.execute('PRAGMA journal_mode=WAL')
+            self.db.execute('CREATE TABLE IF NOT EXISTS nodes (node_id TEXT PRIMARY KEY, info TEXT, seen REAL)')
+            self.db.execute('CREATE TABLE IF NOT EXISTS rooms '
+                            '(room_id TEXT PRIMARY KEY, node_id TEXT, summary TEXT, updated REAL)')
+
+    def heartbeat(self, info, summaries, ttl):
+        now = time.time()
+        node_id = info['node']
+        with self.lock:
+            self.db.execute('BEGIN IMMEDIATE')
+            try:
+                self.db.execute('INSERT OR REPLACE INTO nodes VALUES (?, ?, ?)', (node_id, json.dumps(info), now))
+                self.db.execute('UPDATE rooms SET summary = NULL WHERE node_id = ?', (node_id,))
+                self.db.executemany('INSERT OR REPLACE INTO rooms VALUES (?, ?, ?, ?)',
+                                    [(summary['room'], node_id, json.dumps(summary), now) for summary in summaries])
+                self.db.execute('DELETE FROM rooms WHERE node_id = ? AND summary IS NULL AND updated < ?',
+                                (node_id, now - ttl))
+                self.db.execute('COMMIT')
+            except sqlite3.Error:
+                self.db.execute('ROLLBACK')
+                raise
+
+    def claim(self, room_id, node_id, ttl):
+        now = time.time()
+        with self.lock:
+            self.db.execute('BEGIN IMMEDIATE')
+            try:
+                row = self.db.execute(
+                    'SELECT rooms.node_id FROM rooms JOIN nodes USING (node_id) '
+                    'WHERE room_id = ? AND rooms.node_id != ? AND nodes.seen >= ?',
+                    (room_id, node_id, now - ttl)).fetchone()
+                if row is None:
+                    self.db.execute(
+                        'INSERT INTO rooms VALUES (?, ?, NULL, ?) ON CONFLICT(room_id) DO UPDATE '
+                        'SET node_id = excluded.node_id, updated = excluded.updated, '
+                        'summary = CASE WHEN rooms.node_id = excluded.node_id THEN rooms.summary END',
+                        (room_id, node_id, now))
+                self.db.execute('COMMIT')
+            except sqlite3.Error:
+                self.db.execute('ROLLBACK')
+                raise
+        return row[0] if row is not None else node_id
+
+    def live_nodes(self, ttl):
+        with self.lock:
+            rows = self.db.execute('SELECT node_id, info FROM nodes WHERE seen >= ?',
+                                   (time.time() - ttl,)).fetchall()
+        return {node_id: json.loads(info) for node_id, info in rows}
+
+    def room_summaries(self, ttl):
+        with self.lock:
+            rows = self.db.execute(
+                'SELECT rooms.node_id, summary FROM rooms JOIN nodes USING (node_id) '
+                'WHERE summary IS NOT NULL AND nodes.seen >= ?', (time.time() - ttl,)).fetchall()
+        return [dict(json.loads(summary), node=node_id) for node_id, summary in rows]
+
+def open_backend(name, path=None):
+    if name == 'memory':
+        return MemoryBackend()
+    if name == 'sqlite':
+        return SQLiteBackend(path or 'cluster.db')
+    raise ValueError(f"CLUSTER_BACKEND inconnu: {name}")
+
+class ClusterNode:
+    """Ce serveur vu par l'annuaire : publication, routage des JOIN et vue agrégée"""
+
+    def __init__(self, server, backend, node_id, host, heartbeat=1.0, ttl=5.0):
+        self.server = server
+        self.backend = backend
+        self.node_id = node_id
+        self.info = {'node': node_id, 'host': host, 'port': server.port, 'api_port': server.api_port,
+                     'worker': server.worker_id}
+        self.heartbeat = heartbeat
+        self.ttl = ttl
+        self.peers = {}   # {node_id: infos} des autres nœuds vivants
+        self.remote = {}  # {room_id: résumé} des salles des autres nœuds
+        self.thread = None
+
+    def start(self):
+        if self.thread is None:
+            self.publish()
+            if self.shared:
+                self.thread = threading.Thread(target=self.run, name='cluster', daemon=True)
+                self.thread.start()
+        return self
+
+    @property
+    def shared(self):
+        """Annuaire vu par d'autres nœuds : seul cas où le signe de vie périodique sert.
+
+        Un MemoryBackend du processus n'a que ce nœud ; le mandataire de
+        l'annuaire des workers (voir workers.py) n'en est pas un.
+        """
+        return not isinstance(self.backend, MemoryBackend)
+
+    def run(self):
+        while True:
+            time.sleep(self.heartbeat)
+            try:
+                self.publish()
+            except (OSError, sqlite3.Error) as e:
+                print(f"Erreur annuaire: {e}")
+
+    def publish(self):
+        summaries = [room.get_summary() for room in self.server.rooms.all()]
+        self.backend.heartbeat(self.info, summaries, self.ttl)
+        peers = {node_id: info for node_id, info in self.backend.live_nodes(self.ttl).items()
+                 if node_id != self.node_id}
+        remote = {summary['room']: summary for summary in self.backend.room_summaries(self.ttl)
+                  if summary['node'] != self.node_id}
+        self.peers = peers
+        if remote != self.remote:
+            self.remote = remote
+            self.server.mark_dirty()
+
+    def route(self, room_id):
+        """Nœud où doit aller un JOIN : None si la salle est (ou sera) ici"""
+        if room_id is None or self.server.rooms.get(room_id) is not None:
+            return None
+        owner = self.backend.claim(room_id, self.node_id, self.ttl)
+        if owner == self.node_id:
+            return None
+        return self.peers.get(owner) or self.backend.live_nodes(self.ttl).get(owner)
+
+    def remote_owner(self, room_id):
+        summary = self.remote.get(room_id)
+        return self.peers.get(summary['node']) if summary is not None else None
+
+    def remote_rooms(self):
+        return list(self.remote.values())
+
+    def fetch_state(self, owner, room_id):
+        """(etag, corps) de l'état d'une salle distante, relayé depuis l'API de son nœud"""
+        # Nom de salle choisi par les clients : espaces et caractères de contrôle échappés
+        url = f"http://{owner['host']}:{owner['api_port']}/api/state?room={urllib.parse.quote(room_id, safe='')}"
+        with urllib.request.urlopen(url, timeout=2) as response:
+            return response.headers.get('ETag', ''), response.read()
+
+    def fetch_metrics(self, peer):
+        """/metrics d'un autre nœud, sans agrégation de son côté"""
+        url = f"http://{peer['host']}:{peer['api_port']}/metrics?local=1"
+        with urllib.request.urlopen(url, timeout=2) as response:
+            return response.read()
+
+def default_node_id():
+    return os.getenv('NODE_ID') or socket.gethostname()
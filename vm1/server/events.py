@@ -0,0 +1,189 @@
+"""Historique des événements de jeu.
+
+EventLog garde les derniers événements dans un tampon circulaire de
+taille fixe ; chaque événement reçoit un identifiant croissant, qui sert
+de curseur à /api/events?since=<id> pour ne lire que la suite.
+Journal les ajoute en option à un fichier append-only (une ligne JSON
+par événement), écrit par lots par un thread dédié avec un seul fsync
+par lot, et tourne les fichiers au-delà d'une taille donnée. Au
+redémarrage, le tampon et la numérotation reprennent depuis le journal.
+
+    python server/events.py /data/events.jsonl   # statistiques de parties
+"""
+import collections
+import itertools
+import json
+import os
+import queue
+import sys
+import threading
+import time
+
+class EventLog:
+    """Derniers événements, numérotés à partir de 1, dans un tampon circulaire"""
+
+    def __init__(self, capacity, journal=None):
+        self.ring = collections.deque(maxlen=capacity)
+        self.last_id = 0
+        self.lock = threading.Lock()
+        self.journal = journal
+        if journal is not None:
+            for event in journal.recover(capacity):
+                self.ring.append(event)
+                self.last_id = event['id']
+
+    def append(self, event):
+        """Numéroter et conserver un événement (O(1), le plus ancien est écrasé)"""
+        with self.lock:
+            self.last_id += 1
+            event['id'] = self.last_id
+            self.ring.append(event)
+        if self.journal is not None:
+            self.journal.write(event)
+        return event
+
+    def recent(self, count):
+        """Les count derniers événements, du plus récent au plus ancien"""
+        with self.lock:
+            return list(itertools.islice(reversed(self.ring), count))
+
+    def since(self, cursor, limit):
+        """Événements d'identifiant > cursor, du plus ancien au plus récent.
+
+        Retourne (événements, perdus) où perdus compte les événements sortis
+        du tampon avant d'avoir été lus. Le coût est proportionnel au nombre
+        d'événements postérieurs au curseur, pas à la taille du tampon.
+        """
+        with self.lock:
+            first = self.last_id - len(self.ring) + 1
+            start = max(cursor + 1, first)
+            missed = max(0, start - cursor - 1)
+            tail = list(itertools.islice(reversed(self.ring), max(0, self.last_id - start + 1)))
+        tail.reverse()
+        return tail[:limit], missed
+
+class Journal:
+    """Fichier append-only des événements, écrit hors du thread de jeu"""
+
+    def __init__(self, path, max_bytes=16 * 1024 * 1024, backups=5, sync_interval=1.0):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        # Au plus sync_interval secondes d'événements perdus en cas de panne
+        self.sync_interval = sync_interval
+        self.queue = queue.SimpleQueue()
+        self.file = None
+        self.thread = None
+
+    def start(self):
+        if self.thread is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.file = open(self.path, 'ab')
+            self.thread = threading.Thread(target=self.run, name='event-journal', daemon=True)
+            self.thread.start()
+        return self
+
+    def write(self, event):
+        # Ne bloque jamais : le thread du journal sérialise et écrit
+        self.queue.put(event)
+
+    def run(self):
+        while True:
+            batch = [self.queue.get()]
+            # Regrouper ce qui arrive pendant sync_interval : un fsync par lot
+            deadline = time.monotonic() + self.sync_interval
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self.write_batch(batch)
+            except (OSError, TypeError, ValueError) as e:
+                print(f"Erreur journal {self.path}: {e}")
+
+    def write_batch(self, batch):
+        self.file.write(b''.join(json.dumps(event).encode() + b'\n' for event in batch))
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        if self.file.tell() >= self.max_bytes:
+            self.rotate()
+
+    def rotate(self):
+        """events.jsonl -> events.jsonl.1 -> ... -> events.jsonl.<backups> (supprimé)"""
+        self.file.close()
+        for index in range(self.backups, 0, -1):
+            source = f'{self.path}.{index - 1}' if index > 1 else self.path
+            if os.path.exists(source):
+                os.replace(source, f'{self.path}.{index}')
+        self.file = open(self.path, 'ab')
+
+    def files(self):
+        return journal_files(self.path)
+
+    def recover(self, capacity):
+        """Derniers événements des deux fichiers les plus récents (reprise au démarrage)"""
+        events = collections.deque(maxlen=capacity)
+        for path in self.files()[-2:]:
+            events.extend(read_events(path))
+        return events
+
+def journal_files(path):
+    """Fichiers d'un journal, du plus ancien au plus récent"""
+    rotated = []
+    index = 1
+    while os.path.exists(f'{path}.{index}'):
+        rotated.append(f'{path}.{index}')
+        index += 1
+    rotated.reverse()
+    return rotated + ([path] if os.path.exists(path) else [])
+
+def read_events(path):
+    with open(path, 'rb') as journal:
+        for line in journal:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # Dernière ligne tronquée par un arrêt brutal
+                continue
+
+def replay(path):
+    """Tous les événements d'un journal, rotations comprises, dans l'ordre"""
+    for name in journal_files(path):
+        yield from read_events(name)
+
+def summarize(events):
+    """Statistiques post-partie : parties, passages, explosions et victoires par joueur"""
+    counts = collections.Counter()
+    explosions = collections.Counter()
+    wins = collections.Counter()
+    rooms = set()
+    first = last = None
+    for event in events:
+        counts[event['type']] += 1
+        rooms.add(event.get('room'))
+        first = first if first is not None else event['timestamp']
+        last = event['timestamp']
+        if event['type'] == 'explosion':
+            explosions[event.get('victim')] += 1
+        elif event['type'] == 'winner':
+            wins[event.get('winner')] += 1
+    return {
+        'events': sum(counts.values()),
+        'duration': (last - first) if first is not None else 0,
+        'rooms': len(rooms - {None}),
+        'types': dict(counts),
+        'explosions': dict(explosions.most_common(10)),
+        'wins': dict(wins.most_common(10))
+    }
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        print("Usage: python events.py <journal>")
+        sys.exit(1)
+    print(json.dumps(summarize(replay(sys.argv[1])), indent=2, ensure_ascii=False))
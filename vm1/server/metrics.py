@@ -0,0 +1,200 @@
+"""Métriques au format texte Prometheus (GET /metrics).
+
+Compteurs et histogrammes à seaux fixes, sans dépendance externe.
+L'enregistrement se fait presque entièrement sur le thread de jeu
+(écrivain unique, voir GameRoom) : pas de verrou, une addition par
+mesure. Les jauges sont calculées à la lecture par une fonction.
+METRICS=0 désactive tout (server.metrics vaut alors None).
+"""
+import bisect
+
+# Seaux des durées (secondes) : de 50 µs à 5 s
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                   0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Types de message comptés sous leur nom ; les autres (choisis par le client) sous "other"
+MESSAGE_TYPES = frozenset(('JOIN', 'PASS_BOMB', 'RESYNC'))
+
+def _escape(value):
+    # Format texte Prometheus : \\, \" et \n dans les valeurs de labels
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return '{' + pairs + '}'
+
+def _with_label(line, label):
+    # Ajouter un label à une ligne de mesure : 'nom{a="b"} 1' ou 'nom 1'
+    end = min(index for index in (line.find('{'), line.find(' ')) if index >= 0)
+    if line[end] == '{':
+        return f'{line[:end]}{{{label},{line[end + 1:]}'
+    return f'{line[:end]}{{{label}}}{line[end:]}'
+
+def merge_metrics(bodies):
+    """Fusionner les /metrics de plusieurs workers : en-têtes une fois, mesures de tous"""
+    families = {}  # {nom: [HELP, TYPE, mesures...]}, dans l'ordre d'apparition
+    for body in bodies:
+        family = None
+        for line in body.decode().splitlines():
+            if line.startswith('# HELP '):
+                family = families.setdefault(line.split(' ', 3)[2], [line])
+            elif line.startswith('# TYPE '):
+                if len(family) == 1:
+                    family.append(line)
+            elif family is not None:
+                family.append(line)
+    lines = [line for family in families.values() for line in family]
+    return ('\n'.join(lines) + '\n').encode()
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.values = {}  # {valeurs des labels: total}
+
+    def inc(self, *labels, amount=1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        for labels, value in sorted(self.values.items()):
+            lines.append(f'{self.name}{_labels(self.labelnames, labels)} {_number(value)}')
+        return lines
+
+class Gauge:
+    """Valeur lue à la demande : function() retourne un nombre ou {labels: nombre}.
+
+    kind='counter' pour exposer un compteur tenu ailleurs (ex. SendStats).
+    """
+
+    def __init__(self, name, help, function, labelnames=(), kind='gauge'):
+        self.name = name
+        self.help = help
+        self.function = function
+        self.labelnames = labelnames
+        self.kind = kind
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        value = self.function()
+        values = value if isinstance(value, dict) else {(): value}
+        for labels, value in sorted(values.items()):
+            lines.append(f'{self.name}{_labels(self.labelnames, labels)} {_number(value)}')
+        return lines
+
+class Histogram:
+    def __init__(self, name, help, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Dernier seau : +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            cumulative += count
+            bound = '+Inf' if bound == float('inf') else repr(bound)
+            lines.append(f'{self.name}_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f'{self.name}_sum {self.sum!r}')
+        lines.append(f'{self.name}_count {self.count}')
+        return lines
+
+class ServerMetrics:
+    """Métriques d'un BombGameServer"""
+
+    def __init__(self, server):
+        self.server = server
+        self.metrics = []
+        # Plusieurs workers : chaque mesure porte le numéro de son worker (voir merge_metrics)
+        self.label = f'worker="{server.worker_id}"' if server.workers > 1 else None
+        # Enregistrées par le serveur et les salles
+        self.connections = self.add(Counter(
+            'bomb_connections_total', 'Connexions de joueurs acceptées'))
+        self.messages = self.add(Counter(
+            'bomb_messages_received_total', 'Messages reçus des joueurs, par type', ('type',)))
+        self.events = self.add(Counter(
+            'bomb_events_total', 'Événements de jeu, par type', ('type',)))
+        self.frames_sent = self.add(Counter(
+            'bomb_frames_sent_total', 'Trames envoyées aux joueurs par les diffusions'))
+        self.handoff = self.add(Histogram(
+            'bomb_pass_handoff_seconds', 'Réception du PASS_BOMB jusqu\'au RECEIVE_BOMB remis à la cible'))
+        self.broadcast = self.add(Histogram(
+            'bomb_broadcast_seconds', 'Durée d\'une diffusion à toute la salle'))
+        # Alimentés par le planificateur (voir instrument_scheduler)
+        self.timer_drift = self.add(Histogram(
+            'bomb_timer_drift_seconds', 'Retard des explosions et timers sur leur échéance'))
+        self.command_wait = self.add(Histogram(
+            'bomb_command_wait_seconds', 'Attente d\'une commande dans la file du thread de jeu'))
+        self.command_run = self.add(Histogram(
+            'bomb_command_run_seconds', 'Durée d\'exécution d\'une commande ou d\'un timer sur le thread de jeu'))
+        # Jauges lues à la demande
+        self.add(Gauge('bomb_players', 'Joueurs connectés', self.count_players))
+        self.add(Gauge('bomb_rooms', 'Salles ouvertes', lambda: len(server.rooms.all())))
+        self.add(Gauge('bomb_command_queue_depth', 'Commandes en attente du thread de jeu', self.queue_depth))
+        self.add(Gauge('bomb_outbound_queued_total', 'Envois mis en tampon faute de place dans le socket',
+                       lambda: server.send_stats.queued, kind='counter'))
+        self.add(Gauge('bomb_outbound_evicted_total', 'Joueurs déconnectés pour tampon de sortie plein',
+                       lambda: server.send_stats.evicted, kind='counter'))
+        self.add(Gauge('bomb_outbound_max_pending_bytes', 'Plus grand tampon de sortie observé',
+                       lambda: server.send_stats.max_pending))
+        self.add(Gauge('bomb_outbound_waiting_connections', 'Connexions dont le tampon de sortie attend le socket',
+                       self.waiting_connections))
+        self.add(Gauge('bomb_stream_subscribers', 'Dashboards abonnés au flux SSE',
+                       lambda: len(server.stream.subscribers)))
+        self.add(Gauge('bomb_connections_open', 'Connexions admises sur le port de jeu',
+                       lambda: len(server.admission.tickets)))
+        self.add(Gauge('bomb_connections_rejected_total', 'Connexions refusées (REJECT)',
+                       lambda: self.admission_counts('rejected'), ('reason',), kind='counter'))
+        self.add(Gauge('bomb_connections_evicted_total', 'Connexions coupées par le contrôle d\'admission',
+                       lambda: self.admission_counts('evicted'), ('reason',), kind='counter'))
+        self.add(Gauge('bomb_messages_dropped_total', 'Messages ignorés (débit par connexion dépassé)',
+                       lambda: server.admission.dropped, kind='counter'))
+
+    def add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def count_message(self, msg_type):
+        self.messages.inc(msg_type if msg_type in MESSAGE_TYPES else 'other')
+
+    def instrument_scheduler(self, scheduler):
+        scheduler.drift.histogram = self.timer_drift
+        scheduler.queue_delay.histogram = self.command_wait
+        scheduler.run_time = self.command_run
+
+    def count_players(self):
+        return sum(len(room.registry) for room in self.server.rooms.all())
+
+    def queue_depth(self):
+        return len(getattr(self.server.scheduler, 'ready', ()))
+
+    def admission_counts(self, kind):
+        # Copie sous verrou : les compteurs changent depuis d'autres threads
+        counts = self.server.admission.as_dict()[kind]
+        return {(reason,): count for reason, count in counts.items()}
+
+    def waiting_connections(self):
+        outbox = self.server.outbox
+        return len(outbox.selector.get_map()) - 1 if outbox is not None else 0
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        if self.label is not None:
+            lines = [line if line.startswith('#') else _with_label(line, self.label) for line in lines]
+        return ('\n'.join(lines) + '\n').encode()
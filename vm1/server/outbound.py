@@ -0,0 +1,215 @@
+"""Envoi non bloquant vers les joueurs en mode threaded.
+
+Chaque connexion garde un tampon de sortie borné. L'envoi tente d'abord
+un send() immédiat sans bloquer (MSG_DONTWAIT) ; ce qui reste est mis en
+file et un thread unique le vide quand le socket redevient inscriptible
+(selectors). Un client dont le tampon dépasse la limite est déconnecté :
+un joueur lent ne peut plus geler la partie ni le thread des timers.
+"""
+import collections
+import selectors
+import socket
+import threading
+
+from common.protocol import FrameDecoder
+
+# Sans MSG_DONTWAIT (Windows), le send() immédiat peut bloquer
+SEND_FLAGS = getattr(socket, 'MSG_DONTWAIT', 0)
+
+class SendStats:
+    """Compteurs d'envoi partagés par toutes les connexions d'un serveur"""
+
+    def __init__(self):
+        self.queued = 0    # Envois mis en file faute de place dans le socket
+        self.evicted = 0   # Clients déconnectés pour tampon plein
+        self.max_pending = 0
+
+    def record_pending(self, pending):
+        self.queued += 1
+        if pending > self.max_pending:
+            self.max_pending = pending
+
+    def as_dict(self):
+        return {
+            'queued': self.queued,
+            'evicted': self.evicted,
+            'max_pending_bytes': self.max_pending
+        }
+
+class Outbox:
+    """Thread unique qui vide les tampons de sortie en attente"""
+
+    def __init__(self, limit, stats, name='outbox'):
+        self.limit = limit
+        self.name = name
+        self.stats = stats
+        self.selector = selectors.DefaultSelector()
+        self.wake_r, self.wake_w = socket.socketpair()
+        self.wake_r.setblocking(False)
+        self.wake_w.setblocking(False)
+        self.selector.register(self.wake_r, selectors.EVENT_READ)
+        # Connexions à surveiller, ajoutées hors du thread du sélecteur
+        self.pending = []
+        # Connexions à désinscrire puis fermer (voir BufferedConnection.close)
+        self.closing = []
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, name=self.name, daemon=True)
+            self.thread.start()
+        return self
+
+    def watch(self, conn):
+        """Demander au thread de surveiller une connexion qui a des données en attente"""
+        with self.lock:
+            self.pending.append(conn)
+        self.wake()
+
+    def release(self, conn):
+        """Fermer une connexion peut-être inscrite : le thread la retire du sélecteur avant.
+
+        Fermé d'abord, le descripteur disparaîtrait d'epoll en laissant une
+        inscription périmée, que le prochain client au même numéro hériterait.
+        """
+        with self.lock:
+            self.closing.append(conn)
+        self.wake()
+
+    def wake(self):
+        try:
+            self.wake_w.send(b'\0')
+        except BlockingIOError:
+            pass  # Un réveil est déjà en attente
+
+    def run(self):
+        while True:
+            for key, mask in self.selector.select():
+                if key.fileobj is self.wake_r:
+                    try:
+                        while self.wake_r.recv(4096):
+                            pass
+                    except BlockingIOError:
+                        pass
+                    continue
+                if key.data.flush():
+                    self.selector.unregister(key.fileobj)
+
+            with self.lock:
+                pending, self.pending = self.pending, []
+                closing, self.closing = self.closing, []
+            for conn in pending:
+                if conn.closed or conn.sock.fileno() < 0:
+                    continue
+                try:
+                    self.selector.register(conn.sock, selectors.EVENT_WRITE, conn)
+                except KeyError:
+                    # Déjà surveillée, ou descripteur réutilisé après fermeture d'un autre client :
+                    # modify() garderait l'inscription epoll disparue, il faut réinscrire
+                    if self.selector.get_key(conn.sock).data is not conn:
+                        self.selector.unregister(conn.sock)
+                        self.selector.register(conn.sock, selectors.EVENT_WRITE, conn)
+            for conn in closing:
+                try:
+                    self.selector.unregister(conn.sock)
+                except KeyError:
+                    pass  # Tampon vidé entre-temps
+                conn.sock.close()
+
+class BufferedConnection:
+    """Socket d'un joueur en mode threaded avec tampon de sortie borné.
+
+    Même interface que AsyncClientConnection : sendall() ne bloque jamais,
+    et la connexion porte son décodeur de trames et son encodage négocié.
+    """
+
+    def __init__(self, sock, outbox):
+        self.sock = sock
+        self.outbox = outbox
+        self.decoder = FrameDecoder()
+        self.encoding = 'json'  # 'binary' si négocié au JOIN
+        self.deltas = False     # STATE_DELTA au lieu des GAME_STATE complets
+        self.buffer = collections.deque()
+        self.pending = 0
+        self.closed = False
+        self.watched = False  # Déjà confiée à l'Outbox (peut-être encore inscrite)
+        self.routed = False   # Transmise par un autre worker, qui a déjà routé son JOIN
+        self.lock = threading.Lock()
+
+    def recv(self, size):
+        return self.sock.recv(size)
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def sendall(self, data):
+        with self.lock:
+            if self.closed:
+                return
+            if not self.buffer:
+                try:
+                    sent = self.sock.send(data, SEND_FLAGS)
+                except BlockingIOError:
+                    sent = 0
+                except OSError:
+                    self.closed = True
+                    return
+                if sent == len(data):
+                    return
+                data = memoryview(data)[sent:]
+
+            self.buffer.append(data)
+            self.pending += len(data)
+            stats = self.outbox.stats
+            stats.record_pending(self.pending)
+            if self.pending > self.outbox.limit:
+                stats.evicted += 1
+                self.evict()
+                return
+            if len(self.buffer) == 1:
+                self.watched = True
+                self.outbox.watch(self)
+
+    def flush(self):
+        """Appelé par l'Outbox quand le socket est inscriptible ; True si le tampon est vide"""
+        with self.lock:
+            while self.buffer and not self.closed:
+                data = self.buffer[0]
+                try:
+                    sent = self.sock.send(data, SEND_FLAGS)
+                except BlockingIOError:
+                    return False
+                except OSError:
+                    self.closed = True
+                    break
+                self.pending -= sent
+                if sent < len(data):
+                    self.buffer[0] = memoryview(data)[sent:]
+                    return False
+                self.buffer.popleft()
+            return True
+
+    def evict(self):
+        """Couper la connexion : le thread de lecture voit la fin du flux et retire le joueur"""
+        self.closed = True
+        self.buffer.clear()
+        self.pending = 0
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def abort(self):
+        """Couper la connexion depuis un autre thread (contrôle d'admission)"""
+        with self.lock:
+            self.evict()
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            self.buffer.clear()
+        if self.watched:
+            self.outbox.release(self)
+        else:
+            self.sock.close()
@@ -0,0 +1,122 @@
+import random
+
+class PlayerRecord:
+    """Fiche compacte d'un joueur (__slots__ : pas de dict par instance)"""
+    __slots__ = ('conn', 'id', 'name', 'address', 'alive', 'slot', 'number', 'session', 'expiry')
+
+    def __init__(self, conn, player_id, name, address):
+        self.conn = conn
+        self.id = player_id
+        self.name = name
+        self.address = address
+        self.alive = False
+        self.slot = -1  # Position dans PlayerRegistry.alive (-1 si mort)
+        self.number = -1  # Petit entier propre à la salle (protocole binaire)
+        self.session = None  # Jeton de reprise (JOIN avec "session")
+        self.expiry = None  # Fin du délai de reprise si le joueur est déconnecté
+
+class PlayerRegistry:
+    """Index des joueurs d'une salle.
+
+    by_conn et by_id donnent la fiche en O(1) ; alive est une liste
+    indexable où le retrait se fait par échange avec le dernier
+    élément, ce qui rend le tirage aléatoire et le retrait en O(1).
+    Chaque joueur reçoit aussi un numéro, réutilisé après son départ :
+    les numéros restent petits et denses.
+    """
+
+    def __init__(self):
+        self.by_conn = {}    # {connexion: PlayerRecord}
+        self.by_id = {}      # {player_id: PlayerRecord}
+        self.by_number = {}  # {numéro: PlayerRecord}
+        self.alive = []      # PlayerRecord vivants
+        self.free_numbers = []
+
+    def __len__(self):
+        return len(self.by_conn)
+
+    def __contains__(self, conn):
+        return conn in self.by_conn
+
+    def get(self, conn):
+        return self.by_conn.get(conn)
+
+    def find(self, player_id):
+        return self.by_id.get(player_id)
+
+    def records(self):
+        return list(self.by_conn.values())
+
+    def connections(self):
+        return list(self.by_conn)
+
+    @property
+    def alive_count(self):
+        return len(self.alive)
+
+    def next_number(self):
+        """Numéro que recevra le prochain joueur ajouté"""
+        return self.free_numbers[-1] if self.free_numbers else len(self.by_number)
+
+    def highest_number(self):
+        """Borne des numéros en jeu : autant de numéros que de joueurs ou de places libérées"""
+        return len(self.by_number) + len(self.free_numbers) - 1
+
+    def add(self, record):
+        record.number = self.free_numbers.pop() if self.free_numbers else len(self.by_number)
+        self.by_number[record.number] = record
+        self.by_conn[record.conn] = record
+        self.by_id[record.id] = record
+        self.mark_alive(record)
+
+    def rebind(self, record, conn):
+        """Rattacher une fiche à une nouvelle connexion (reprise de session)"""
+        del self.by_conn[record.conn]
+        record.conn = conn
+        self.by_conn[conn] = record
+
+    def remove(self, conn):
+        record = self.by_conn.pop(conn, None)
+        if record is None:
+            return None
+        if self.by_id.get(record.id) is record:
+            del self.by_id[record.id]
+        del self.by_number[record.number]
+        self.free_numbers.append(record.number)
+        self.mark_dead(record)
+        return record
+
+    def mark_alive(self, record):
+        if record.slot < 0:
+            record.slot = len(self.alive)
+            self.alive.append(record)
+        record.alive = True
+
+    def mark_dead(self, record):
+        record.alive = False
+        slot = record.slot
+        if slot < 0:
+            return
+        last = self.alive.pop()
+        if last is not record:
+            self.alive[slot] = last
+            last.slot = slot
+        record.slot = -1
+
+    def revive_all(self):
+        for record in self.by_conn.values():
+            self.mark_alive(record)
+
+    def random_alive(self, rng=random):
+        return self.alive[rng.randrange(len(self.alive))]
+
+    def sample_alive(self, exclude, limit, rng=random):
+        """Jusqu'à `limit` fiches vivantes tirées au hasard, hors `exclude`"""
+        alive = self.alive
+        if len(alive) - 1 <= limit:
+            return [record for record in alive if record is not exclude]
+
+        # Tirage sans remise de limit + 1 positions : O(limit), pas O(joueurs)
+        picks = rng.sample(range(len(alive)), limit + 1)
+        records = [alive[i] for i in picks if alive[i] is not exclude]
+        return records[:limit]
@@ -0,0 +1,651 @@
+import threading
+import itertools
+import secrets
+import time
+
+from common import codec
+from common.protocol import encode_json
+from registry import PlayerRecord, PlayerRegistry
+
+class DetachedConnection:
+    """Connexion d'un joueur restauré qui n'est pas encore revenu : les envois sont perdus"""
+    encoding = 'json'
+    deltas = False
+
+    def sendall(self, data):
+        pass
+
+class GameRoom:
+    """Une partie indépendante : ses joueurs et sa bombe.
+
+    Aucun verrou : toutes les méthodes de jeu s'exécutent sur le thread du
+    planificateur (écrivain unique), qui reçoit les messages des joueurs
+    par server.scheduler.call_soon(). Les threads de lecture ne font que
+    décoder, et les envois ne bloquent jamais (tampon par connexion).
+    """
+
+    def __init__(self, server, room_id):
+        self.server = server
+        self.room_id = room_id
+        self.registry = PlayerRegistry()
+        self.current_holder = None  # PlayerRecord du porteur
+        self.bomb_deadline = 0  # Échéance de l'explosion (horloge monotone)
+        self.bomb_round = 0
+        self.explosion = None
+        self.game_started = False
+        self.closed = False
+        # Numéro du dernier changement d'état diffusé et du dernier état complet
+        self.state_seq = 0
+        self.keyframe_seq = 0
+        # JOIN réservés par RoomManager.assign() et pas encore traités :
+        # la salle ne peut pas être fermée tant qu'il en reste
+        self.pending_joins = 0
+        self.sessions = {}  # {jeton: PlayerRecord}
+
+    def add_event(self, event_type, message, **data):
+        self.server.add_event(event_type, message, self.room_id, **data)
+
+    def get_state(self):
+        """Retourner l'état de la partie (pour l'API).
+
+        Lu depuis le thread de l'API, sans synchroniser avec le thread de
+        jeu : les copies de listes sont atomiques sous le GIL, et l'appelant
+        versionne le résultat (voir BombGameServer.get_state_snapshot).
+        """
+        holder = self.current_holder
+        return {
+            'room': self.room_id,
+            'game_started': self.game_started,
+            'players': [
+                {
+                    'name': record.name,
+                    'id': record.id,
+                    'alive': record.alive,
+                    'connected': record.expiry is None,
+                    'has_bomb': record is holder
+                }
+                for record in self.registry.records()
+            ],
+            'current_holder': holder.name if holder else None,
+            'timer': round(self.remaining_time(), 1)
+        }
+
+    def get_summary(self):
+        return {
+            'room': self.room_id,
+            'game_started': self.game_started,
+            'players': len(self.registry),
+            'alive': self.registry.alive_count
+        }
+
+    def checkpoint(self):
+        """Relevé de l'état de la salle pour un instantané (thread de jeu, voir checkpoint.py)"""
+        holder = self.current_holder
+        return (self.room_id, self.game_started, self.bomb_round, self.state_seq,
+                self.remaining_time(), holder.number if holder is not None else -1,
+                [(record.number, record.alive, record.id, record.name, record.session)
+                 for record in self.registry.records()])
+
+    def restore(self, started, bomb_round, seq, remaining, holder, players):
+        """Reprendre un relevé de checkpoint() après un redémarrage.
+
+        Les joueurs sont détachés comme après une déconnexion : chacun a
+        session_grace secondes pour revenir avec son jeton. La bombe
+        repart avec le temps qui lui restait au moment du relevé.
+        """
+        scheduler = self.server.scheduler
+        by_number = {}
+        for number, alive, player_id, name, session in players:
+            conn = DetachedConnection()
+            record = by_number[number] = PlayerRecord(conn, player_id, name, None)
+            self.registry.add(record)
+            if not alive:
+                self.registry.mark_dead(record)
+            if session is not None:
+                record.session = session
+                self.sessions[session] = record
+            record.expiry = scheduler.call_later(self.server.session_grace, self.expire_session, record, conn)
+
+        self.game_started = started
+        self.bomb_round = bomb_round
+        self.state_seq = self.keyframe_seq = seq
+        self.current_holder = by_number.get(holder)
+        if self.current_holder is not None:
+            self.bomb_deadline = scheduler.time() + remaining
+            self.explosion = scheduler.call_at(self.bomb_deadline, self.on_bomb_deadline, bomb_round)
+        elif started:
+            # Relevé pris pendant la pause entre deux parties
+            scheduler.call_later(self.server.restart_delay, self.restart_game)
+
+    def add_player(self, client_socket, address, message):
+        """Ajouter un joueur (JOIN réservé au préalable par RoomManager.assign)"""
+        # Avant tout : la réservation doit être levée même si la suite échoue
+        self.server.rooms.settle(self)
+        player_id = message['player_id']
+        player_name = message['player_name']
+
+        if self.server.metrics is not None:
+            self.server.metrics.count_message('JOIN')
+        resumed = self.sessions.get(message.get('session'))
+        if resumed is not None:
+            self.resume_player(resumed, client_socket, address, message)
+            return
+        stale = self.registry.find(player_id)
+        if stale is not None and stale.expiry is None:
+            # Identifiant déjà en jeu sur une connexion active : le premier garde sa place
+            self.server.reject(client_socket, 'duplicate')
+            return
+        if self.exceeds_binary(message):
+            self.server.reject(client_socket, 'full')
+            return
+        record = PlayerRecord(client_socket, player_id, player_name, address)
+        self.registry.add(record)
+        if stale is not None:
+            # Même joueur revenu sans son jeton : sa place gardée est libérée
+            stale.expiry.cancel()
+            stale.expiry = None
+            self.drop_player(stale.conn)
+        if 'session' in message:
+            # Le joueur sait reprendre sa place : lui remettre un jeton (avant un
+            # éventuel WELCOME, tant que le protocole est encore en lignes JSON)
+            self.open_session(record)
+        if message.get('encoding') == 'binary':
+            self.welcome_binary(record)
+        if message.get('deltas'):
+            # Le joueur part d'un état complet, puis ne reçoit que les changements
+            client_socket.deltas = True
+            self.send_keyframe(client_socket)
+
+        self.server.log(f"[{self.room_id}] {player_name} ({player_id}) a rejoint la partie")
+        self.add_event('join', f"{player_name} a rejoint la partie", player=player_name)
+        self.broadcast(None, lambda: codec.encode_player_joined(record.number, player_id, player_name))
+        self.broadcast_delta('joined', record)
+
+        # Démarrer la partie si assez de joueurs
+        if self.registry.alive_count >= self.server.min_players and not self.game_started:
+            self.start_game()
+
+    def open_session(self, record):
+        if record.session is None:
+            record.session = secrets.token_urlsafe(12)
+            self.sessions[record.session] = record
+            self.server.rooms.bind_session(record.session, self)
+        self.server.send_to_player(record.conn, {
+            'type': 'SESSION',
+            'token': record.session,
+            'room': self.room_id,
+            'grace': self.server.session_grace
+        })
+
+    def resume_player(self, record, conn, address, message):
+        """Rendre sa place à un joueur revenu avec son jeton : même état, même numéro"""
+        if message.get('encoding') == 'binary' and self.registry.highest_number() > codec.MAX_NUMBER:
+            # Place gardée jusqu'à la fin du délai : il peut revenir en JSON
+            self.server.reject(conn, 'full')
+            return
+        if record.expiry is not None:
+            record.expiry.cancel()
+            record.expiry = None
+        # Si l'ancienne connexion n'a pas encore été vue fermée, elle sort du
+        # registre ; son départ sera ignoré par remove_player
+        self.registry.rebind(record, conn)
+        record.address = address
+        self.open_session(record)
+        if message.get('encoding') == 'binary':
+            self.welcome_binary(record)
+        conn.deltas = bool(message.get('deltas'))
+        # État complet dans tous les cas : le joueur a pu manquer des changements
+        self.send_keyframe(conn)
+        if record is self.current_holder:
+            self.send_bomb(record, self.remaining_time())
+
+        self.server.log(f"[{self.room_id}] {record.name} a repris sa place ({address})")
+        self.add_event('resume', f"{record.name} est de retour", player=record.name)
+
+    def exceeds_binary(self, message):
+        """Le JOIN ferait circuler en binaire un numéro au-delà de codec.MAX_NUMBER.
+
+        Le bit de poids fort d'un numéro porte l'état vivant/mort : un
+        joueur binaire doit pouvoir désigner tous les autres, et aucun
+        joueur ne peut arriver après le dernier numéro dans une salle où
+        il y a déjà des joueurs binaires.
+        """
+        number = self.registry.next_number()
+        if message.get('encoding') == 'binary':
+            return max(number, self.registry.highest_number()) > codec.MAX_NUMBER
+        return number > codec.MAX_NUMBER and any(
+            conn.encoding == 'binary' for conn in self.registry.connections())
+
+    def welcome_binary(self, record):
+        """Accepter le protocole binaire : table des numéros en JSON, puis trames binaires"""
+        self.server.send_to_player(record.conn, {
+            'type': 'WELCOME',
+            'encoding': 'binary',
+            'number': record.number,
+            'players': [[other.number, other.id, other.name] for other in self.registry.records()]
+        })
+        record.conn.encoding = 'binary'
+
+    @staticmethod
+    def decode_binary(frame):
+        """Traduire une trame binaire d'un joueur en message.
+
+        Appelé par le thread de lecture : la cible reste un numéro, traduit
+        par handle_message sur le thread de jeu.
+        """
+        msg_type, number = codec.decode_client(frame)
+        if msg_type == codec.RESYNC:
+            return {'type': 'RESYNC'}
+        if msg_type == codec.PING:
+            return {'type': 'PING'}
+        return {'type': 'PASS_BOMB', 'number': number}
+
+    def handle_message(self, sender_socket, message, received=None):
+        """Message d'un joueur ; received : instant de réception (time.monotonic)"""
+        msg_type = message['type']
+        if self.server.metrics is not None:
+            self.server.metrics.count_message(msg_type)
+
+        if msg_type == 'PASS_BOMB':
+            if 'number' in message:
+                target = self.registry.by_number.get(message['number'])
+                if target is None:
+                    return
+                target_id = target.id
+            else:
+                target_id = message['to']
+            self.pass_bomb(sender_socket, target_id, received)
+        elif msg_type == 'RESYNC':
+            # Le joueur a détecté un trou dans la séquence des deltas
+            self.send_keyframe(sender_socket)
+
+    def start_game(self):
+        if self.game_started:
+            return
+
+        self.game_started = True
+        self.server.log(f"\n=== [{self.room_id}] DÉBUT DE LA PARTIE ===\n")
+        self.add_event('game_start', 'DÉBUT DE LA PARTIE !')
+
+        # Donner la bombe au premier joueur
+        self.current_holder = self.choose_holder()
+        timer = self.arm_bomb()
+
+        holder = self.current_holder
+        self.server.log(f"[{self.room_id}] {holder.name} a reçu la bombe ! (timer: {timer:.1f}s)")
+        self.add_event('bomb_received', f"{holder.name} a reçu la bombe ! (timer: {timer:.1f}s)",
+                       holder=holder.name, timer=round(timer, 1))
+
+        self.send_bomb(holder, timer)
+
+        self.broadcast_game_state()
+
+    def pass_bomb(self, from_socket, target_id, received=None):
+        from_info = self.current_holder
+        if from_info is None or from_info.conn is not from_socket:
+            return  # Seul le porteur peut passer la bombe
+
+        # Trouver le joueur cible (index par identifiant)
+        to_info = self.registry.find(target_id)
+        if to_info is None or not to_info.alive:
+            return
+
+        timer = self.remaining_time()
+
+        self.server.log(f"[{self.room_id}] {from_info.name} passe la bombe à {to_info.name} (timer: {timer:.1f}s)")
+        self.add_event('bomb_passed', f"{from_info.name} → {to_info.name} (timer: {timer:.1f}s)",
+                       holder=to_info.name, timer=round(timer, 1))
+
+        # L'échéance ne change pas : la bombe continue son compte à rebours
+        self.current_holder = to_info
+
+        self.send_bomb(to_info, timer, from_info)
+        metrics = self.server.metrics
+        if metrics is not None and received is not None:
+            metrics.handoff.observe(time.monotonic() - received)
+
+        self.broadcast_delta('holder', to_info)
+
+    def choose_holder(self):
+        """Tirer le prochain porteur (générateur server.rng : reproductible avec GAME_SEED)"""
+        return self.registry.random_alive(self.server.rng)
+
+    def draw_timer(self):
+        return self.server.rng.uniform(self.server.min_timer, self.server.max_timer)
+
+    def arm_bomb(self):
+        """Tirer un nouveau timer et planifier l'explosion à son échéance"""
+        scheduler = self.server.scheduler
+        timer = self.draw_timer()
+        self.bomb_deadline = scheduler.time() + timer
+        self.bomb_round += 1
+
+        if self.explosion is not None:
+            self.explosion.cancel()
+        self.explosion = scheduler.call_at(self.bomb_deadline, self.on_bomb_deadline, self.bomb_round)
+        return timer
+
+    def remaining_time(self):
+        if not self.game_started or self.current_holder is None:
+            return 0
+        return max(0.0, self.bomb_deadline - self.server.scheduler.time())
+
+    def on_bomb_deadline(self, bomb_round):
+        # Ignorer une échéance devenue obsolète (nouveau tirage entre-temps)
+        if bomb_round != self.bomb_round or not self.game_started or not self.current_holder:
+            return
+        self.explosion = None
+        self.explode_bomb()
+
+    def explode_bomb(self):
+        if not self.current_holder:
+            return
+
+        victim_info = self.current_holder
+        self.server.log(f"\n[{self.room_id}] BOOOM ! {victim_info.name} a explosé !\n")
+        self.add_event('explosion', f"BOOOM ! {victim_info.name} a explosé !", victim=victim_info.name)
+
+        # Marquer le joueur comme mort
+        self.registry.mark_dead(victim_info)
+
+        # Notifier tous les joueurs
+        alive = self.registry.alive
+        self.broadcast({
+            'type': 'EXPLODE',
+            'victim': victim_info.name,
+            'survivors': [record.name for record in alive]
+        }, lambda: codec.encode_explode(victim_info.number, [record.number for record in alive]))
+        self.broadcast_delta('died', victim_info)
+
+        # Vérifier s'il y a un gagnant
+        if self.registry.alive_count == 1:
+            winner_info = self.registry.alive[0]
+            self.server.log(f"\n[{self.room_id}] {winner_info.name} a gagné la partie ! 🏆\n")
+            self.add_event('winner', f"{winner_info.name} a gagné la partie !", winner=winner_info.name)
+
+            self.broadcast({
+                'type': 'WINNER',
+                'winner': winner_info.name
+            }, lambda: codec.encode_winner(winner_info.number))
+
+            self.reset_game()
+        elif self.registry.alive_count > 0:
+            # Continuer avec un nouveau porteur
+            self.current_holder = self.choose_holder()
+            timer = self.arm_bomb()
+
+            holder = self.current_holder
+            self.server.log(f"[{self.room_id}] {holder.name} a maintenant la bombe ! (timer: {timer:.1f}s)")
+            self.add_event('bomb_received', f"{holder.name} a maintenant la bombe ! (timer: {timer:.1f}s)",
+                           holder=holder.name, timer=round(timer, 1))
+
+            self.send_bomb(holder, timer)
+
+            self.broadcast_delta('holder', holder)
+
+    def send_bomb(self, holder, timer, sender=None):
+        # Échantillon aléatoire borné : le joueur tire de toute façon une cible au hasard
+        targets = self.registry.sample_alive(holder, self.server.max_targets, self.server.rng)
+        if holder.conn.encoding == 'binary':
+            data = codec.encode_receive_bomb(timer, [record.number for record in targets],
+                                             sender.number if sender else None)
+        else:
+            message = {
+                'type': 'RECEIVE_BOMB',
+                'timer': timer,
+                'available_targets': [record.id for record in targets]
+            }
+            if sender is not None:
+                message['from'] = sender.name
+            data = encode_json(message)
+        holder.conn.sendall(data)
+
+    def keyframe(self):
+        """État complet (GAME_STATE) au numéro de séquence courant, et son encodeur binaire"""
+        seq = self.state_seq
+        records = self.registry.records()
+        holder = self.current_holder
+        timer = round(self.remaining_time(), 1)
+        state = {
+            'type': 'GAME_STATE',
+            'seq': seq,
+            'players': [{'name': record.name, 'alive': record.alive}
+                       for record in records],
+            'current_holder': holder.name if holder else None,
+            'timer': timer
+        }
+        return state, lambda: codec.encode_game_state(
+            seq, [(record.number, record.alive) for record in records],
+            holder.number if holder else None, timer)
+
+    def send_keyframe(self, conn):
+        state, encode_binary = self.keyframe()
+        conn.sendall(encode_binary() if conn.encoding == 'binary' else encode_json(state))
+
+    def broadcast_game_state(self):
+        self.server.mark_dirty()
+        self.keyframe_seq = self.state_seq
+        self.broadcast(*self.keyframe())
+
+    def broadcast_delta(self, kind, record=None):
+        """Diffuser un changement d'état numéroté.
+
+        Les joueurs qui ont demandé les deltas au JOIN reçoivent un
+        STATE_DELTA (quelques octets, quel que soit le nombre de joueurs) ;
+        les autres reçoivent l'état complet comme avant. Un état complet
+        part pour tous tous les keyframe_interval changements.
+        """
+        self.state_seq += 1
+        if self.state_seq - self.keyframe_seq >= self.server.keyframe_interval:
+            self.broadcast_game_state()
+            return
+
+        self.server.mark_dirty()
+        seq = self.state_seq
+        timer = round(self.remaining_time(), 1)
+        number = record.number if record is not None else None
+        delta = {'type': 'STATE_DELTA', 'seq': seq, 'kind': kind, 'timer': timer}
+        if record is not None:
+            delta['player'] = record.name
+        keyframe = []
+
+        def encode(encoding, deltas):
+            if deltas:
+                if encoding == 'binary':
+                    return codec.encode_delta(seq, kind, number, timer)
+                return encode_json(delta)
+            if not keyframe:
+                keyframe.extend(self.keyframe())
+            state, encode_binary = keyframe
+            return encode_binary() if encoding == 'binary' else encode_json(state)
+
+        self.fan_out(encode)
+
+    def broadcast(self, message, encode_binary=None):
+        """Diffuser un message, sérialisé au plus une fois par encodage.
+
+        encode_binary produit la trame binaire équivalente ; il n'est appelé
+        que si un joueur de la salle a négocié ce protocole. message=None
+        réserve la diffusion aux clients binaires (trames de service).
+        """
+        def encode(encoding, deltas):
+            if encoding == 'binary':
+                return encode_binary()
+            return encode_json(message) if message is not None else b''
+
+        self.fan_out(encode)
+
+    def fan_out(self, encode):
+        """Envoyer à chaque joueur, encode(encodage, deltas) n'étant appelé qu'une fois par variante.
+
+        Chaque envoi va dans le tampon de la connexion : les clients trop
+        lents sont déconnectés par leur propre connexion.
+        """
+        metrics = self.server.metrics
+        start = time.monotonic() if metrics is not None else 0
+        encoded = {}
+        sent = 0
+        for conn in self.registry.connections():
+            variant = (conn.encoding, conn.deltas)
+            data = encoded.get(variant)
+            if data is None:
+                data = encoded[variant] = encode(*variant)
+            if data:
+                conn.sendall(data)
+                sent += 1
+        if metrics is not None:
+            metrics.broadcast.observe(time.monotonic() - start)
+            metrics.frames_sent.inc(amount=sent)
+
+    def remove_player(self, sock):
+        record = self.registry.get(sock)
+        if record is None:
+            return
+        grace = self.server.session_grace
+        if record.session is not None and grace > 0:
+            # Place gardée (vivant ou non, bombe comprise) le temps d'une reconnexion
+            record.expiry = self.server.scheduler.call_later(grace, self.expire_session, record, sock)
+            self.server.log(f"[{self.room_id}] {record.name} déconnecté, place gardée {grace:.0f}s")
+            self.add_event('disconnect', f"{record.name} s'est déconnecté", player=record.name)
+            return
+        self.drop_player(sock)
+
+    def expire_session(self, record, sock):
+        if record.conn is sock and record.expiry is not None:
+            record.expiry = None
+            self.drop_player(sock)
+
+    def drop_player(self, sock):
+        player_info = self.registry.remove(sock)
+        if player_info is not None:
+            if player_info.session is not None:
+                del self.sessions[player_info.session]
+                self.server.rooms.forget_session(player_info.session)
+            # Le delta part avant la trame de service : le numéro est encore connu des clients
+            self.broadcast_delta('left', player_info)
+            self.broadcast(None, lambda: codec.encode_player_left(player_info.number))
+            self.server.log(f"[{self.room_id}] {player_info.name} a quitté la partie")
+            self.add_event('leave', f"{player_info.name} a quitté la partie", player=player_info.name)
+
+            if player_info is self.current_holder:
+                self.current_holder = None
+                if self.registry.alive_count > 0:
+                    self.current_holder = holder = self.choose_holder()
+                    timer = self.arm_bomb()
+                    self.add_event('bomb_received', f"{holder.name} a maintenant la bombe ! (timer: {timer:.1f}s)",
+                                   holder=holder.name, timer=round(timer, 1))
+                    self.send_bomb(holder, timer)
+                self.broadcast_delta('holder', self.current_holder)
+
+            if not len(self.registry):
+                self.server.rooms.discard(self)
+
+    def reset_game(self):
+        # Pause avant de recommencer : planifiée, pour ne jamais bloquer
+        # le thread des timers (ni la boucle en mode asyncio)
+        self.current_holder = None
+        self.broadcast_delta('holder')
+        self.server.scheduler.call_later(self.server.restart_delay, self.restart_game)
+
+    def restart_game(self):
+        if self.closed:
+            return
+        self.game_started = False
+        self.current_holder = None
+
+        # Réinitialiser tous les joueurs
+        self.registry.revive_all()
+
+        if self.registry.alive_count >= self.server.min_players:
+            self.server.log(f"\n[{self.room_id}] Nouvelle partie !\n")
+            self.add_event('game_start', 'Nouvelle partie !')
+            self.start_game()
+        else:
+            self.broadcast_game_state()
+
+class RoomManager:
+    """Répartition des joueurs entre salles (explicite ou matchmaking)"""
+
+    def __init__(self, server):
+        self.server = server
+        self.rooms = {}  # {room_id: GameRoom}
+        self.sessions = {}  # {jeton de session: GameRoom}
+        self.lock = threading.Lock()
+        self.counter = itertools.count(1)
+
+    def assign(self, room_id=None, session=None):
+        """Trouver (ou créer) la salle d'un joueur qui rejoint"""
+        with self.lock:
+            room = self.sessions.get(session)
+            if room is not None:
+                # Reprise de session : retour dans la salle d'origine
+                room.pending_joins += 1
+                return room
+            if room_id is not None:
+                room = self.rooms.get(room_id)
+                if room is None:
+                    room = self.rooms[room_id] = GameRoom(self.server, room_id)
+                room.pending_joins += 1
+                return room
+
+            capacity = self.server.room_capacity
+            # Priorité aux salles en attente, puis aux parties en cours non pleines
+            candidates = sorted(self.rooms.values(), key=lambda r: r.game_started)
+            for room in candidates:
+                if not capacity or len(room.registry) + room.pending_joins < capacity:
+                    room.pending_joins += 1
+                    return room
+
+            # Un joueur peut avoir demandé "room-N" par son nom (ex. reconnexion
+            # après un redémarrage sans instantané) : ne jamais la remplacer
+            room_id = f"{self.server.worker_prefix}room-{next(self.counter)}"
+            while room_id in self.rooms:
+                room_id = f"{self.server.worker_prefix}room-{next(self.counter)}"
+            room = self.rooms[room_id] = GameRoom(self.server, room_id)
+            room.pending_joins += 1
+            return room
+
+    def restore(self, room_id, snapshot):
+        """Recréer une salle depuis un instantané (thread de jeu, avant toute connexion)"""
+        room = GameRoom(self.server, room_id)
+        room.restore(*snapshot)
+        with self.lock:
+            self.rooms[room_id] = room
+            for token in room.sessions:
+                self.sessions[token] = room
+            # Les salles créées ensuite par le matchmaking ne reprennent pas ce nom
+            prefix = f"{self.server.worker_prefix}room-"
+            if room_id.startswith(prefix) and room_id[len(prefix):].isdigit():
+                self.counter = itertools.count(max(next(self.counter), int(room_id[len(prefix):]) + 1))
+        return room
+
+    def bind_session(self, token, room):
+        with self.lock:
+            self.sessions[token] = room
+
+    def forget_session(self, token):
+        with self.lock:
+            self.sessions.pop(token, None)
+
+    def settle(self, room):
+        """Le JOIN réservé par assign() est traité (thread de jeu)"""
+        with self.lock:
+            room.pending_joins -= 1
+
+    def discard(self, room):
+        """Fermer une salle vide (thread de jeu)"""
+        with self.lock:
+            if len(room.registry) or room.pending_joins or self.rooms.get(room.room_id) is not room:
+                return
+            room.closed = True
+            if room.explosion is not None:
+                room.explosion.cancel()
+            del self.rooms[room.room_id]
+
+    def get(self, room_id):
+        with self.lock:
+            return self.rooms.get(room_id)
+
+    def all(self):
+        with self.lock:
+            return list(self.rooms.values())
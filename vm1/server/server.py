@@ -2,375 +2,712 @@ import socket
 import json
 import threading
 import time
-import random
 import os
-from http.server import HTTPServer, BaseHTTPRequestHandler
+import sys
+import asyncio
+import queue
+import random
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# common/ est copié à côté du script dans l'image, et se trouve dans vm1/ dans le dépôt
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.protocol import FrameDecoder, FrameError, encode_json, decode_json
+from common.scheduler import TimerScheduler, LoopScheduler
+from common.system import raise_nofile_limit
+from rooms import RoomManager
+from stream import EventStream
+from events import EventLog, Journal
+from metrics import ServerMetrics, merge_metrics
+from checkpoint import Checkpointer
+from admission import Admission
+from cluster import ClusterNode, open_backend, default_node_id
+from outbound import Outbox, BufferedConnection, SendStats
+from workers import WorkerGroup, HandedOff
+
+def check_join(message):
+    """Refuser un JOIN incomplet avant de réserver une salle (FrameError)"""
+    for field in ('player_id', 'player_name'):
+        if not isinstance(message.get(field), str) or not message[field]:
+            raise FrameError(f"JOIN invalide: {field} manquant")
+    for field in ('room', 'session'):
+        if message.get(field) is not None and not isinstance(message[field], str):
+            raise FrameError(f"JOIN invalide: {field} doit être une chaîne")
 
 class BombGameServer:
-    def __init__(self):
+    def __init__(self, worker_id=0, workers=1, group=None):
         self.host = '0.0.0.0'
         self.port = int(os.getenv('SERVER_PORT', 5000))
-        self.api_port = int(os.getenv('API_PORT', 8080))
-        self.players = {}  # {connection: player_info}
-        self.alive_players = []
-        self.current_holder = None
-        self.bomb_timer = 0
+        # Chaque worker expose sa propre API (API_PORT + numéro du worker)
+        self.api_port = int(os.getenv('API_PORT', 8080)) + worker_id
+        self.worker_id = worker_id
+        self.workers = workers
+        self.worker_prefix = f"w{worker_id}-" if workers > 1 else ''
+        # Workers d'un même port : chaque JOIN va au worker de sa salle (voir workers.py)
+        self.group = group
+        self.scheduler = None
         self.min_timer = int(os.getenv('MIN_TIMER', 3))
         self.max_timer = int(os.getenv('MAX_TIMER', 10))
         self.min_players = int(os.getenv('MIN_PLAYERS', 2))
-        self.game_started = False
-        self.lock = threading.Lock()
-        self.events = []  # Historique des événements
-        self.max_events = 50
+        # 0 = salles sans limite : tous les joueurs sans salle vont dans la même partie
+        self.room_capacity = int(os.getenv('ROOM_CAPACITY', 0))
+        # Nombre maximum de cibles proposées au porteur (tirées au hasard)
+        self.max_targets = int(os.getenv('MAX_TARGETS', 32))
+        # Un état complet est diffusé tous les N deltas (rattrapage des clients désynchronisés)
+        self.keyframe_interval = int(os.getenv('KEYFRAME_INTERVAL', 100))
+        # Tirages du jeu (porteur, timer, cibles) : GAME_SEED les rend reproductibles
+        seed = os.getenv('GAME_SEED')
+        self.rng = random.Random(int(seed) + worker_id if seed else None)
+        # 'threaded' : un thread par joueur / 'asyncio' : boucle d'événements unique
+        self.mode = os.getenv('SERVER_MODE', 'threaded')
+        self.backlog = int(os.getenv('LISTEN_BACKLOG', socket.SOMAXCONN))
+        # Tampon de sortie maximal par joueur avant déconnexion (octets)
+        self.outbound_limit = int(os.getenv('OUTBOUND_LIMIT', 256 * 1024))
+        self.send_stats = SendStats()
+        # Contrôle d'admission du port de jeu (voir admission.py)
+        self.admission = Admission(
+            max_connections=int(os.getenv('MAX_CONNECTIONS', 10000)),
+            join_timeout=float(os.getenv('JOIN_TIMEOUT', 10)),
+            idle_timeout=float(os.getenv('IDLE_TIMEOUT', 120)),
+            rate=float(os.getenv('MESSAGE_RATE', 50)),
+            burst=int(os.getenv('MESSAGE_BURST', 100)),
+            retry=float(os.getenv('REJECT_RETRY', 5)))
+        self.outbox = None
+        self.restart_delay = 5
+        # Délai pendant lequel un joueur déconnecté garde sa place (reprise par jeton)
+        self.session_grace = float(os.getenv('SESSION_GRACE', 15))
+        self.rooms = RoomManager(self)
+        # Messages du thread de jeu, affichés par un thread dédié
+        self.console = None
+        self.loop = None
+        # Historique des événements (tampon circulaire) et journal optionnel sur disque
+        self.events = EventLog(int(os.getenv('EVENT_CAPACITY', 1000)), self.open_journal())
+        # Instantanés des parties en cours, repris au redémarrage (voir checkpoint.py)
+        self.checkpoints = self.open_checkpoints()
+        # Version de l'état visible par l'API et instantanés JSON déjà sérialisés
+        self.state_version = 0
+        self.version_lock = threading.Lock()
+        self.snapshots = {}  # {salle demandée: (version, etag, corps)}
+        self.boot_id = format(int(time.time()), 'x')
+        # Métriques Prometheus (GET /metrics) ; METRICS=0 pour les désactiver
+        self.metrics = ServerMetrics(self) if os.getenv('METRICS', '1') == '1' else None
+        # Flux SSE du dashboard (événements poussés + ticks du compte à rebours)
+        self.stream = EventStream(self, float(os.getenv('STREAM_TICK', 0.5)))
+        # Annuaire des salles partagé entre nœuds (voir cluster.py)
+        backend = os.getenv('CLUSTER_BACKEND', 'memory')
+        if group is not None:
+            # Les workers forment un cluster local, dont l'annuaire est commun
+            directory, node_id, node_host = group.directory, f"w{worker_id}", '127.0.0.1'
+        else:
+            directory = open_backend(backend, os.getenv('CLUSTER_DB'))
+            node_id, node_host = default_node_id(), os.getenv('NODE_HOST', socket.gethostname())
+        self.cluster = ClusterNode(
+            self, directory, node_id, node_host,
+            heartbeat=float(os.getenv('CLUSTER_HEARTBEAT', 1.0)),
+            ttl=float(os.getenv('CLUSTER_TTL', 5.0)))
+        if backend != 'memory':
+            # Identifiants de salle uniques dans tout le cluster
+            self.worker_prefix = f"{self.cluster.node_id}-"
+            if self.mode == 'asyncio':
+                # Le routage d'un JOIN attend le verrou de l'annuaire : il ne doit
+                # bloquer que le thread de ce joueur, pas la boucle de tous
+                print("CLUSTER_BACKEND : mode threaded")
+                self.mode = 'threaded'
+        
+    def add_event(self, event_type, message, room_id=None, **data):
+        """Ajouter un événement à l'historique et le pousser aux dashboards abonnés"""
+        event = {
+            'type': event_type,
+            'message': message,
+            'room': room_id,
+            'timestamp': time.time()
+        }
+        event.update(data)
+        self.events.append(event)
+        if self.metrics is not None:
+            self.metrics.events.inc(event_type)
+        self.mark_dirty()
+        self.stream.publish('event', event)
+    
+    def open_journal(self):
+        """Journal des événements si EVENT_JOURNAL est défini (un fichier par worker)"""
+        path = os.getenv('EVENT_JOURNAL')
+        if not path:
+            return None
+        if self.workers > 1:
+            root, ext = os.path.splitext(path)
+            path = f"{root}-w{self.worker_id}{ext}"
+        return Journal(path,
+                       max_bytes=int(os.getenv('JOURNAL_MAX_BYTES', 16 * 1024 * 1024)),
+                       sync_interval=float(os.getenv('JOURNAL_SYNC', 1.0)))
+    
+    def open_checkpoints(self):
+        """Instantanés si CHECKPOINT est défini (un fichier par worker)"""
+        path = os.getenv('CHECKPOINT')
+        if not path:
+            return None
+        if self.workers > 1:
+            root, ext = os.path.splitext(path)
+            path = f"{root}-w{self.worker_id}{ext}"
+        return Checkpointer(self, path, float(os.getenv('CHECKPOINT_INTERVAL', 1.0)))
+    
+    def start_checkpoints(self):
+        """Reprise du dernier instantané puis relevés périodiques (planificateur prêt)"""
+        if self.checkpoints is not None:
+            self.checkpoints.start(restore=os.getenv('CHECKPOINT_RESTORE', '1') == '1')
+    
+    def log(self, message):
+        """Afficher un message sans que le thread de jeu attende la console"""
+        if self.console is None:
+            self.console = queue.SimpleQueue()
+            threading.Thread(target=self.print_console, name='console', daemon=True).start()
+        self.console.put(message)
+    
+    def print_console(self):
+        while True:
+            print(self.console.get(), flush=True)
+    
+    def mark_dirty(self):
+        """Signaler un changement d'état : le prochain GET reconstruira l'instantané"""
+        with self.version_lock:
+            self.state_version += 1
+    
+    def get_state_snapshot(self, room_id=None):
+        """Retourner (etag, corps JSON) de l'état, sérialisé une seule fois par version"""
+        target = room_id if room_id is not None else self.busiest_remote_room()
+        owner = self.cluster.remote_owner(target) if target else None
+        if owner is not None:
+            # Salle hébergée par un autre nœud : état relayé depuis son API, sans cache
+            try:
+                return self.cluster.fetch_state(owner, target)
+            except OSError as e:
+                print(f"Nœud {owner['node']} injoignable: {e}")
+        version = self.state_version
+        cached = self.snapshots.get(room_id)
+        if cached is not None and cached[0] == version:
+            return cached[1], cached[2]
         
-    def add_event(self, event_type, message):
-        """Ajouter un événement à l'historique"""
-        with self.lock:
-            self.events.insert(0, {
-                'type': event_type,
-                'message': message,
-                'timestamp': time.time()
-            })
-            if len(self.events) > self.max_events:
-                self.events.pop()
-    
-    def get_game_state(self):
-        """Retourner l'état actuel du jeu (pour l'API)"""
-        with self.lock:
-            return {
-                'game_started': self.game_started,
-                'players': [
-                    {
-                        'name': info['name'],
-                        'id': info['id'],
-                        'alive': info['alive'],
-                        'has_bomb': sock == self.current_holder
-                    }
-                    for sock, info in self.players.items()
-                ],
-                'current_holder': self.players[self.current_holder]['name'] if self.current_holder else None,
-                'timer': round(self.bomb_timer, 1) if self.game_started else 0,
-                'events': self.events[:10]  # Les 10 derniers événements
-            }
+        # Lecture sans le verrou de jeu : si l'état change pendant la construction,
+        # l'instantané garde l'ancienne version et sera reconstruit au GET suivant
+        state = self.get_game_state(room_id)
+        state['version'] = version
+        # Le corps est resservi tant que la version ne change pas : "timer" date de
+        # generated_at, que le client compare à X-Server-Time (heure de la réponse)
+        state['generated_at'] = round(time.time(), 3)
+        body = json.dumps(state).encode()
+        etag = f'"{self.boot_id}-{version}"'
+        
+        if len(self.snapshots) > 64:
+            self.snapshots.clear()
+        self.snapshots[room_id] = (version, etag, body)
+        return etag, body
+    
+    def busiest_remote_room(self):
+        """Salle par défaut de l'API si la plus peuplée est sur un autre nœud (ou worker)"""
+        if not self.cluster.remote:
+            return None
+        busiest = max(self.all_room_summaries(), key=lambda summary: summary['players'])
+        return busiest['room'] if busiest['node'] != self.cluster.node_id else None
+    
+    def render_metrics(self, local=False):
+        """Texte de /metrics ; avec plusieurs workers, ceux de tous les workers"""
+        body = self.metrics.render()
+        if self.group is None or local:
+            return body
+        bodies = [body]
+        for peer in self.cluster.peers.values():
+            try:
+                bodies.append(self.cluster.fetch_metrics(peer))
+            except OSError as e:
+                print(f"Worker {peer['worker']} injoignable: {e}")
+        return merge_metrics(bodies)
+    
+    def get_events(self, query):
+        """Page de /api/events : événements postérieurs au curseur 'since'"""
+        try:
+            cursor = max(0, int(query.get('since', ['0'])[0]))
+            limit = min(1000, max(1, int(query.get('limit', ['100'])[0])))
+        except ValueError:
+            cursor, limit = 0, 100
+        reset = cursor > self.events.last_id
+        if reset:
+            # Numérotation repartie de zéro (redémarrage sans journal) : tout relire
+            cursor = 0
+        events, missed = self.events.since(cursor, limit)
+        return {
+            'events': events,
+            'next': events[-1]['id'] if events else cursor,
+            'last_id': self.events.last_id,
+            'missed': missed,
+            'reset': reset
+        }
+    
+    def get_game_state(self, room_id=None):
+        """Retourner l'état d'une salle (par défaut la plus peuplée) pour l'API"""
+        rooms = self.rooms.all()
+        room = self.rooms.get(room_id) if room_id else None
+        if room is None and room_id is None and rooms:
+            room = max(rooms, key=lambda r: len(r.registry))
+        
+        if room is not None:
+            state = room.get_state()
+        else:
+            state = {'room': room_id, 'game_started': False, 'players': [],
+                     'current_holder': None, 'timer': 0}
+        
+        # Salles de ce nœud puis celles des autres nœuds du cluster
+        state['rooms'] = self.all_room_summaries(rooms)
+        state['worker'] = self.worker_id
+        state['node'] = self.cluster.node_id
+        state['events'] = self.events.recent(10)  # Les 10 derniers événements
+        return state
+    
+    def all_room_summaries(self, rooms=None):
+        local = [dict(room.get_summary(), node=self.cluster.node_id) for room in (rooms or self.rooms.all())]
+        return local + self.cluster.remote_rooms()
     
     def start(self):
         # Démarrer le serveur API HTTP dans un thread séparé
         api_thread = threading.Thread(target=self.start_api_server, daemon=True)
         api_thread.start()
+        self.stream.start()
+        if self.events.journal is not None:
+            self.events.journal.start()
+        self.cluster.start()
+        self.admission.start()
+        
+        raise_nofile_limit()
         
-        # Démarrer le serveur de jeu principal
+        if self.mode == 'asyncio':
+            asyncio.run(self.serve_event_loop())
+        else:
+            self.serve_threaded()
+    
+    def serve_threaded(self):
+        """Mode historique : un thread par connexion"""
         server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if self.workers > 1:
+            # Plusieurs processus écoutent le même port, le noyau répartit les connexions
+            server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
         server_socket.bind((self.host, self.port))
-        server_socket.listen(10)
+        server_socket.listen(self.backlog)
         
-        print(f"Serveur de jeu démarré sur {self.host}:{self.port}")
+        print(f"Serveur de jeu démarré sur {self.host}:{self.port} (mode threaded, worker {self.worker_id})")
         print(f"API HTTP démarrée sur {self.host}:{self.api_port}")
         print(f"En attente de {self.min_players} joueurs minimum...")
         
         self.add_event('info', f'Serveur démarré - En attente de {self.min_players} joueurs')
         
-        # Thread pour gérer le timer de la bombe
-        timer_thread = threading.Thread(target=self.bomb_timer_thread, daemon=True)
-        timer_thread.start()
+        # Thread unique qui dort jusqu'à la prochaine échéance de bombe
+        self.scheduler = TimerScheduler('bomb-timer')
+        if self.metrics is not None:
+            self.metrics.instrument_scheduler(self.scheduler)
+        self.scheduler.start()
+        self.start_checkpoints()
+        # Thread unique qui vide les tampons de sortie des joueurs lents
+        self.outbox = Outbox(self.outbound_limit, self.send_stats).start()
+        if self.group is not None:
+            self.group.start(self)
         
         while True:
             try:
                 client_socket, address = server_socket.accept()
                 print(f"Nouvelle connexion: {address}")
-                
-                client_thread = threading.Thread(
-                    target=self.handle_client,
-                    args=(client_socket, address),
-                    daemon=True
-                )
-                client_thread.start()
+                if self.metrics is not None:
+                    self.metrics.connections.inc()
+                self.accept_connection(client_socket, address)
                 
             except Exception as e:
                 print(f"Erreur serveur: {e}")
     
+    def accept_connection(self, client_socket, address, received=None):
+        """Admettre un joueur et lancer son thread de lecture (mode threaded).
+        
+        received : octets déjà lus par le worker qui a transmis la connexion.
+        """
+        conn = BufferedConnection(client_socket, self.outbox)
+        conn.routed = received is not None
+        if not self.admission.admit(conn):
+            # Serveur plein : refus immédiat, sans thread de lecture
+            self.reject(conn, 'full', self.admission.retry)
+            conn.close()
+            return
+        
+        client_thread = threading.Thread(
+            target=self.handle_client,
+            args=(conn, address, received),
+            daemon=True
+        )
+        client_thread.start()
+    
+    def adopt(self, client_socket, received):
+        """Connexion transmise par un autre worker (thread de réception, voir workers.py)"""
+        if self.mode == 'asyncio':
+            asyncio.run_coroutine_threadsafe(self.loop.connect_accepted_socket(
+                lambda: AsyncClientConnection(self, received), client_socket), self.loop)
+        else:
+            client_socket.setblocking(True)
+            self.accept_connection(client_socket, client_socket.getpeername(), received)
+    
+    async def serve_event_loop(self):
+        """Mode boucle d'événements : toutes les connexions dans un seul thread"""
+        self.loop = asyncio.get_running_loop()
+        self.scheduler = LoopScheduler(self.loop)
+        if self.metrics is not None:
+            self.metrics.instrument_scheduler(self.scheduler)
+        self.start_checkpoints()
+        server = await self.loop.create_server(
+            lambda: AsyncClientConnection(self),
+            self.host, self.port,
+            backlog=self.backlog,
+            reuse_address=True,
+            reuse_port=self.workers > 1
+        )
+        if self.group is not None:
+            self.group.start(self)
+        
+        print(f"Serveur de jeu démarré sur {self.host}:{self.port} (mode asyncio, backlog {self.backlog}, worker {self.worker_id})")
+        print(f"API HTTP démarrée sur {self.host}:{self.api_port}")
+        print(f"En attente de {self.min_players} joueurs minimum...")
+        
+        self.add_event('info', f'Serveur démarré - En attente de {self.min_players} joueurs')
+        
+        async with server:
+            await server.serve_forever()
+    
     def start_api_server(self):
         """Démarrer le serveur HTTP pour l'API"""
         game_server = self
         
         class APIHandler(BaseHTTPRequestHandler):
+            # HTTP/1.1 : connexions persistantes (chaque réponse porte son Content-Length)
+            protocol_version = 'HTTP/1.1'
+            # Une connexion inactive libère son thread au bout de ce délai
+            timeout = 30
+            # En-têtes et corps sont écrits séparément : sans TCP_NODELAY, Nagle et
+            # l'ACK retardé ajoutent ~40 ms à chaque réponse sur une connexion réutilisée
+            disable_nagle_algorithm = True
+            
             def do_GET(self):
-                if self.path == '/api/state':
-                    # Retourner l'état du jeu en JSON
-                    self.send_response(200)
-                    self.send_header('Content-type', 'application/json')
-                    self.send_header('Access-Control-Allow-Origin', '*')
-                    self.send_header('Access-Control-Allow-Methods', 'GET, OPTIONS')
-                    self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-                    self.end_headers()
+                url = urlsplit(self.path)
+                query = parse_qs(url.query)
+                
+                if url.path == '/api/state':
+                    # Retourner l'état du jeu en JSON (304 si inchangé depuis le dernier GET)
+                    etag, body = game_server.get_state_snapshot(query.get('room', [None])[0])
+                    server_time = f'{time.time():.3f}'
+                    if etag in self.headers.get('If-None-Match', ''):
+                        self.send_response(304)
+                        self.send_header('ETag', etag)
+                        self.send_header('X-Server-Time', server_time)
+                        self.send_header('Access-Control-Allow-Origin', '*')
+                        self.send_header('Access-Control-Expose-Headers', 'ETag, X-Server-Time')
+                        self.end_headers()
+                        return
                     
-                    state = game_server.get_game_state()
-                    self.wfile.write(json.dumps(state).encode())
-                elif self.path == '/health':
-                    # Endpoint de santé
+                    self.send_json(body, {
+                        'ETag': etag,
+                        'X-Server-Time': server_time,
+                        'Cache-Control': 'no-cache',
+                        'Access-Control-Allow-Methods': 'GET, OPTIONS',
+                        'Access-Control-Allow-Headers': 'Content-Type, If-None-Match',
+                        'Access-Control-Expose-Headers': 'ETag, X-Server-Time'
+                    })
+                elif url.path == '/api/stream':
+                    self.stream_events(query.get('room', [None])[0])
+                elif url.path == '/api/events':
+                    self.send_json(json.dumps(game_server.get_events(query)).encode(),
+                                   {'Cache-Control': 'no-cache'})
+                elif url.path == '/api/rooms':
+                    # Résumé de toutes les salles du cluster
+                    self.send_json(json.dumps({
+                        'worker': game_server.worker_id,
+                        'node': game_server.cluster.node_id,
+                        'nodes': sorted([game_server.cluster.node_id, *game_server.cluster.peers]),
+                        'rooms': game_server.all_room_summaries()
+                    }).encode())
+                elif url.path == '/metrics' and game_server.metrics is not None:
+                    body = game_server.render_metrics(local='local' in query)
                     self.send_response(200)
-                    self.send_header('Content-type', 'application/json')
-                    self.send_header('Access-Control-Allow-Origin', '*')
+                    self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                    self.send_header('Content-Length', str(len(body)))
                     self.end_headers()
-                    self.wfile.write(json.dumps({'status': 'ok'}).encode())
+                    self.wfile.write(body)
+                elif url.path == '/health':
+                    # Endpoint de santé
+                    health = {'status': 'ok', 'outbound': game_server.send_stats.as_dict(),
+                              'admission': game_server.admission.as_dict()}
+                    if game_server.scheduler is not None:
+                        health['timer_drift'] = game_server.scheduler.drift.as_dict()
+                        health['command_delay'] = game_server.scheduler.queue_delay.as_dict()
+                    if game_server.checkpoints is not None:
+                        health['checkpoint'] = game_server.checkpoints.as_dict()
+                    self.send_json(json.dumps(health).encode())
                 else:
                     self.send_response(404)
+                    self.send_header('Content-Length', '0')
                     self.end_headers()
             
+            def send_json(self, body, headers=None):
+                self.send_response(200)
+                self.send_header('Content-type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('Access-Control-Allow-Origin', '*')
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def stream_events(self, room_id):
+                """Flux Server-Sent Events : état initial, puis événements et ticks"""
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Cache-Control', 'no-cache')
+                self.send_header('X-Accel-Buffering', 'no')  # Pas de tampon côté nginx
+                self.send_header('Access-Control-Allow-Origin', '*')
+                # Corps sans longueur : délimité par la fermeture de la connexion
+                self.send_header('Connection', 'close')
+                self.end_headers()
+                self.close_connection = True
+                
+                subscriber = game_server.stream.subscribe(room_id)
+                try:
+                    self.wfile.write(b'retry: 2000\n\n')
+                    while not subscriber.closed:
+                        frame = subscriber.next_frame(timeout=15)
+                        if subscriber.closed:
+                            break
+                        # Commentaire SSE en l'absence de message : garde la connexion ouverte
+                        self.wfile.write(frame if frame is not None else b': keep-alive\n\n')
+                        self.wfile.flush()
+                except OSError:
+                    # Client parti, ou qui ne lit plus depuis `timeout` secondes (TimeoutError)
+                    pass
+                finally:
+                    game_server.stream.unsubscribe(subscriber)
+            
             def do_OPTIONS(self):
                 # Gérer les requêtes OPTIONS pour CORS
                 self.send_response(200)
                 self.send_header('Access-Control-Allow-Origin', '*')
                 self.send_header('Access-Control-Allow-Methods', 'GET, OPTIONS')
-                self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+                self.send_header('Access-Control-Allow-Headers', 'Content-Type, If-None-Match')
+                self.send_header('Content-Length', '0')
                 self.end_headers()
             
             def log_message(self, format, *args):
                 # Désactiver les logs HTTP pour ne pas polluer la console
                 pass
         
-        api_server = HTTPServer(('0.0.0.0', self.api_port), APIHandler)
+        # Un thread par requête : un flux SSE ouvert ne bloque pas les autres
+        api_server = ThreadingHTTPServer(('0.0.0.0', self.api_port), APIHandler)
         print(f"Serveur API prêt sur le port {self.api_port}")
         api_server.serve_forever()
     
-    def handle_client(self, client_socket, address):
+    def handle_client(self, client_socket, address, received=None):
+        decoder = client_socket.decoder
+        room = None
         try:
-            # Recevoir le message de JOIN
-            data = client_socket.recv(4096).decode('utf-8')
-            if not data:
-                return
-            
-            message = json.loads(data)
-            
-            if message['type'] == 'JOIN':
-                player_id = message['player_id']
-                player_name = message['player_name']
-                
-                with self.lock:
-                    self.players[client_socket] = {
-                        'id': player_id,
-                        'name': player_name,
-                        'address': address,
-                        'alive': True
-                    }
-                    self.alive_players.append(client_socket)
-                
-                print(f"{player_name} ({player_id}) a rejoint la partie")
-                self.add_event('join', f"{player_name} a rejoint la partie")
-                self.broadcast_game_state()
-                
-                # Démarrer la partie si assez de joueurs
-                if len(self.alive_players) >= self.min_players and not self.game_started:
-                    self.start_game()
-                
-                # Boucle pour recevoir les messages du joueur
-                while True:
-                    data = client_socket.recv(4096).decode('utf-8')
-                    if not data:
-                        break
-                    
-                    msg = json.loads(data)
-                    self.handle_message(client_socket, msg)
+            data = received or client_socket.recv(4096)
+            while data:
+                decoder.feed(data)
+                for frame in decoder.frames():
+                    room = self.process_frame(client_socket, address, frame, room)
+                data = client_socket.recv(4096)
                     
+        except HandedOff:
+            pass
         except Exception as e:
             print(f"Erreur client {address}: {e}")
         finally:
-            self.remove_player(client_socket)
+            self.admission.release(client_socket)
+            self.remove_player(client_socket, room)
             client_socket.close()
     
-    def handle_message(self, sender_socket, message):
-        msg_type = message['type']
+    def process_frame(self, conn, address, frame, room):
+        """Décoder une trame reçue et confier le message au thread de jeu.
+
+        Retourne la salle du joueur une fois le JOIN accepté.
+        """
+        if not self.admission.allow(conn):
+            # Débit dépassé : message ignoré sans être décodé
+            return room
+        if conn.decoder.framing == 'length':
+            message = room.decode_binary(frame)
+        else:
+            message = decode_json(frame)
         
-        if msg_type == 'PASS_BOMB':
-            target_id = message['to']
-            self.pass_bomb(sender_socket, target_id)
+        if message['type'] == 'PING':
+            # Signe de vie (voir IDLE_TIMEOUT) : rien à faire sur le thread de jeu
+            return room
+        if room is None:
+            # Le premier message doit être un JOIN
+            if message['type'] != 'JOIN':
+                raise FrameError(f"JOIN attendu, reçu {message['type']}")
+            check_join(message)
+            if self.group is not None:
+                if not conn.routed:
+                    self.route_to_worker(conn, message, frame)
+            else:
+                owner = self.cluster.route(message.get('room'))
+                if owner is not None:
+                    # Salle hébergée par un autre nœud : le joueur s'y reconnecte
+                    self.send_to_player(conn, {
+                        'type': 'REDIRECT',
+                        'room': message.get('room'),
+                        'host': owner['host'],
+                        'port': owner['port']
+                    })
+                    return None
+            room = self.register_player(conn, address, message)
+            self.admission.joined(conn)
+            if message.get('encoding') == 'binary':
+                # Protocole négocié : les trames suivantes sont préfixées par leur longueur
+                conn.decoder.framing = 'length'
+            return room
+        
+        self.scheduler.call_soon(room.handle_message, conn, message, time.monotonic())
+        return room
     
-    def start_game(self):
-        with self.lock:
-            if self.game_started:
-                return
-            
-            self.game_started = True
-            print("\n=== DÉBUT DE LA PARTIE ===\n")
-            self.add_event('game_start', 'DÉBUT DE LA PARTIE !')
-            
-            # Donner la bombe au premier joueur
-            self.current_holder = random.choice(self.alive_players)
-            self.bomb_timer = random.uniform(self.min_timer, self.max_timer)
-            
-            holder_info = self.players[self.current_holder]
-            print(f"{holder_info['name']} a reçu la bombe ! (timer: {self.bomb_timer:.1f}s)")
-            self.add_event('bomb_received', f"{holder_info['name']} a reçu la bombe ! (timer: {self.bomb_timer:.1f}s)")
-            
-            self.send_to_player(self.current_holder, {
-                'type': 'RECEIVE_BOMB',
-                'timer': self.bomb_timer,
-                'available_targets': self.get_available_targets(self.current_holder)
-            })
-            
-            self.broadcast_game_state()
+    def route_to_worker(self, conn, message, frame):
+        """Confier la connexion au worker de la salle demandée (HandedOff) s'il n'est pas celui-ci"""
+        worker = self.group.owner(self, message)
+        if worker == self.worker_id:
+            return
+        # Plus d'expulsion par ce worker : son shutdown() couperait aussi le joueur chez l'autre
+        self.admission.release(conn)
+        if not self.group.hand_off(conn, worker, frame):
+            # Le worker propriétaire ne suit plus : le joueur réessaiera plus tard
+            self.reject(conn, 'full', self.admission.retry)
+        raise HandedOff(worker)
     
-    def pass_bomb(self, from_socket, target_id):
-        with self.lock:
-            if from_socket != self.current_holder:
-                return  # Seul le porteur peut passer la bombe
-            
-            # Trouver le socket du joueur cible
-            target_socket = None
-            for sock, info in self.players.items():
-                if info['id'] == target_id and info['alive']:
-                    target_socket = sock
-                    break
-            
-            if not target_socket:
-                return
-            
-            from_info = self.players[from_socket]
-            to_info = self.players[target_socket]
-            
-            print(f"{from_info['name']} passe la bombe à {to_info['name']} (timer: {self.bomb_timer:.1f}s)")
-            self.add_event('bomb_passed', f"{from_info['name']} → {to_info['name']} (timer: {self.bomb_timer:.1f}s)")
-            
-            self.current_holder = target_socket
-            
-            self.send_to_player(target_socket, {
-                'type': 'RECEIVE_BOMB',
-                'timer': self.bomb_timer,
-                'from': from_info['name'],
-                'available_targets': self.get_available_targets(target_socket)
-            })
-            
-            self.broadcast_game_state()
+    def register_player(self, client_socket, address, message):
+        """Placer un joueur dans une salle après son JOIN (commun aux deux modes).
+
+        La salle est réservée tout de suite ; l'ajout lui-même passe par la
+        file du thread de jeu, avant les messages suivants du joueur.
+        """
+        room = self.rooms.assign(message.get('room'), message.get('session'))
+        self.scheduler.call_soon(room.add_player, client_socket, address, message)
+        return room
     
-    def bomb_timer_thread(self):
-        while True:
-            time.sleep(0.1)
-            
-            with self.lock:
-                if self.game_started and self.current_holder:
-                    self.bomb_timer -= 0.1
-                    
-                    if self.bomb_timer <= 0:
-                        self.explode_bomb()
+    def reject(self, conn, reason, retry=None):
+        """Refuser un client : REJECT (avec le délai conseillé avant de réessayer), puis fermeture"""
+        self.admission.reject(reason)
+        message = {'type': 'REJECT', 'reason': reason}
+        if retry is not None:
+            message['retry'] = retry
+        self.send_to_player(conn, message)
+        conn.abort()
     
-    def explode_bomb(self):
-        if not self.current_holder:
-            return
-        
-        victim_info = self.players[self.current_holder]
-        print(f"\nBOOOM ! {victim_info['name']} a explosé !\n")
-        self.add_event('explosion', f"BOOOM ! {victim_info['name']} a explosé !")
-        
-        # Marquer le joueur comme mort
-        victim_info['alive'] = False
-        self.alive_players.remove(self.current_holder)
-        
-        # Notifier tous les joueurs
-        self.broadcast({
-            'type': 'EXPLODE',
-            'victim': victim_info['name'],
-            'survivors': [self.players[s]['name'] for s in self.alive_players]
-        })
-        
-        # Vérifier s'il y a un gagnant
-        if len(self.alive_players) == 1:
-            winner_info = self.players[self.alive_players[0]]
-            print(f"\n{winner_info['name']} a gagné la partie ! 🏆\n")
-            self.add_event('winner', f"{winner_info['name']} a gagné la partie !")
-            
-            self.broadcast({
-                'type': 'WINNER',
-                'winner': winner_info['name']
-            })
-            
-            self.reset_game()
-        elif len(self.alive_players) > 0:
-            # Continuer avec un nouveau porteur
-            self.current_holder = random.choice(self.alive_players)
-            self.bomb_timer = random.uniform(self.min_timer, self.max_timer)
-            
-            holder_info = self.players[self.current_holder]
-            print(f"{holder_info['name']} a maintenant la bombe ! (timer: {self.bomb_timer:.1f}s)")
-            self.add_event('bomb_received', f"{holder_info['name']} a maintenant la bombe ! (timer: {self.bomb_timer:.1f}s)")
-            
-            self.send_to_player(self.current_holder, {
-                'type': 'RECEIVE_BOMB',
-                'timer': self.bomb_timer,
-                'available_targets': self.get_available_targets(self.current_holder)
-            })
-            
-            self.broadcast_game_state()
-    
-    def get_available_targets(self, current_socket):
-        targets = []
-        for sock, info in self.players.items():
-            if sock != current_socket and info['alive']:
-                targets.append(info['id'])
-        return targets
-    
-    def broadcast_game_state(self):
-        state = {
-            'type': 'GAME_STATE',
-            'players': [{'name': info['name'], 'alive': info['alive']} 
-                       for info in self.players.values()],
-            'current_holder': self.players[self.current_holder]['name'] if self.current_holder else None,
-            'timer': round(self.bomb_timer, 1) if self.game_started else 0
-        }
-        self.broadcast(state)
+    def send_to_player(self, conn, message):
+        # sendall ne bloque jamais : tampon de sortie par connexion
+        conn.sendall(encode_json(message))
     
-    def broadcast(self, message):
-        dead_sockets = []
-        for sock in list(self.players.keys()):
-            try:
-                self.send_to_player(sock, message)
-            except:
-                dead_sockets.append(sock)
-        
-        for sock in dead_sockets:
-            self.remove_player(sock)
+    def remove_player(self, sock, room):
+        if room is not None:
+            self.scheduler.call_soon(room.remove_player, sock)
+
+class AsyncClientConnection(asyncio.Protocol):
+    """Connexion d'un joueur en mode asyncio (même protocole JSON par lignes)"""
+    
+    def __init__(self, game_server, received=None):
+        self.game_server = game_server
+        self.transport = None
+        self.address = None
+        self.decoder = FrameDecoder()
+        self.encoding = 'json'  # 'binary' si négocié au JOIN
+        self.deltas = False     # STATE_DELTA au lieu des GAME_STATE complets
+        self.room = None
+        # Octets déjà lus par le worker qui a transmis la connexion (voir workers.py)
+        self.received = received
+        self.routed = received is not None
+    
+    def connection_made(self, transport):
+        self.transport = transport
+        self.address = transport.get_extra_info('peername')
+        if self.game_server.metrics is not None:
+            self.game_server.metrics.connections.inc()
+        admission = self.game_server.admission
+        if not admission.admit(self):
+            self.game_server.reject(self, 'full', admission.retry)
+        elif self.received:
+            # Avant toute lecture du socket : le JOIN transmis passe en premier
+            self.data_received(self.received)
     
-    def send_to_player(self, sock, message):
+    def data_received(self, data):
         try:
-            sock.sendall((json.dumps(message) + '\n').encode('utf-8'))
-        except:
-            pass
+            self.decoder.feed(data)
+            for frame in self.decoder.frames():
+                self.room = self.game_server.process_frame(self, self.address, frame, self.room)
+        except HandedOff:
+            self.transport.abort()
+        except Exception as e:
+            print(f"Erreur client {self.address}: {e}")
+            self.transport.close()
     
-    def remove_player(self, sock):
-        with self.lock:
-            if sock in self.players:
-                player_info = self.players[sock]
-                print(f"{player_info['name']} a quitté la partie")
-                self.add_event('leave', f"{player_info['name']} a quitté la partie")
-                
-                if sock in self.alive_players:
-                    self.alive_players.remove(sock)
-                
-                if sock == self.current_holder:
-                    self.current_holder = None
-                    if len(self.alive_players) > 0:
-                        self.current_holder = random.choice(self.alive_players)
-                        self.bomb_timer = random.uniform(self.min_timer, self.max_timer)
-                
-                del self.players[sock]
-    
-    def reset_game(self):
-        time.sleep(5)  # Pause avant de recommencer
-        with self.lock:
-            self.game_started = False
-            self.current_holder = None
-            self.bomb_timer = 0
-            
-            # Réinitialiser tous les joueurs
-            for info in self.players.values():
-                info['alive'] = True
-            
-            self.alive_players = list(self.players.keys())
-            
-            if len(self.alive_players) >= self.min_players:
-                print("\nNouvelle partie !\n")
-                self.add_event('game_start', 'Nouvelle partie !')
-                self.start_game()
+    def connection_lost(self, exc):
+        self.game_server.admission.release(self)
+        self.game_server.remove_player(self, self.room)
+    
+    def sendall(self, data):
+        # Écriture non bloquante : la boucle vide le tampon d'envoi
+        if self.transport.is_closing():
+            return
+        stats = self.game_server.send_stats
+        pending = self.transport.get_write_buffer_size()
+        if pending:
+            stats.record_pending(pending + len(data))
+            if pending + len(data) > self.game_server.outbound_limit:
+                # Client trop lent : le couper plutôt que laisser le tampon grossir
+                stats.evicted += 1
+                self.transport.abort()
+                return
+        self.transport.write(data)
+    
+    def close(self):
+        self.transport.close()
+    
+    def fileno(self):
+        return self.transport.get_extra_info('socket').fileno()
+    
+    def abort(self):
+        # Appelable depuis n'importe quel thread (contrôle d'admission)
+        self.game_server.loop.call_soon_threadsafe(self.transport.abort)
+
+def run_worker(worker_id, workers, group):
+    server = BombGameServer(worker_id, workers, group)
+    server.start()
+
+def start_workers(workers):
+    """Lancer un processus par worker, tous sur le même port (SO_REUSEPORT).
+    
+    Le noyau choisit le worker de chaque connexion ; le JOIN est ensuite
+    confié au worker de sa salle (voir workers.py).
+    """
+    group = WorkerGroup(workers, int(os.getenv('ROOM_CAPACITY', 0)))
+    processes = [
+        group.context.Process(target=run_worker, args=(worker_id, workers, group), name=f"worker-{worker_id}")
+        for worker_id in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
 
 if __name__ == '__main__':
-    server = BombGameServer()
-    server.start()
\ No newline at end of file
+    workers = int(os.getenv('WORKERS', 1))
+    if workers > 1 and not hasattr(socket, 'SO_REUSEPORT'):
+        print("SO_REUSEPORT indisponible : un seul worker")
+        workers = 1
+    if workers > 1 and os.getenv('CLUSTER_BACKEND', 'memory') != 'memory':
+        # Un REDIRECT vise host:port, que les workers d'un nœud se partagent
+        print("CLUSTER_BACKEND : un seul worker par nœud")
+        workers = 1
+    
+    if workers > 1:
+        start_workers(workers)
+    else:
+        server = BombGameServer()
+        server.start()
\ No newline at end of file
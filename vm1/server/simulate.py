@@ -0,0 +1,357 @@
+"""Simulation déterministe des parties, sans socket ni temps réel.
+
+Les salles (GameRoom) tournent telles quelles sur un VirtualScheduler :
+l'horloge saute d'échéance en échéance et tous les tirages du jeu
+passent par un random.Random initialisé avec la graine. Deux modes :
+
+- synthétique : --rooms salles de --players bots, qui repassent la bombe
+  après un temps de réaction tiré au hasard ;
+- rejeu d'un journal d'événements (EVENT_JOURNAL) : arrivées, passes et
+  départs sont rejoués à leurs instants, avec les porteurs et timers
+  enregistrés. Les écarts avec l'enregistrement sont comptés, et le
+  premier est affiché : de quoi reproduire un incident hors production.
+
+Chaque événement produit alimente une empreinte : même graine et mêmes
+entrées donnent la même empreinte (--check le vérifie en lançant deux
+fois). --strict contrôle les invariants du jeu après chaque action.
+
+    python server/simulate.py --rooms 100 --players 8 --duration 3600 [--seed 1] [--check] [--strict]
+    python server/simulate.py --journal /data/events.jsonl
+"""
+import argparse
+import collections
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common import codec
+from common.protocol import encode_json
+from common.scheduler import VirtualScheduler
+from events import replay
+from rooms import RoomManager
+
+RECEIVE_BOMB = b'{"type": "RECEIVE_BOMB"'
+
+class InvariantError(Exception):
+    pass
+
+class SimulatedServer:
+    """Ce que GameRoom attend d'un BombGameServer, sur horloge virtuelle"""
+
+    def __init__(self, seed, min_timer=3, max_timer=10, min_players=2, room_capacity=0):
+        self.scheduler = VirtualScheduler()
+        self.rng = random.Random(seed)
+        self.min_timer = min_timer
+        self.max_timer = max_timer
+        self.min_players = min_players
+        self.room_capacity = room_capacity
+        self.max_targets = 32
+        self.keyframe_interval = 100
+        self.restart_delay = 5
+        self.session_grace = 0
+        self.worker_prefix = ''
+        self.metrics = None
+        self.rooms = RoomManager(self)
+        self.counts = collections.Counter()
+        self.digest = hashlib.blake2b(digest_size=16)
+        self.outcomes = None  # {salle: [(type, joueur)]} si on compare à un enregistrement
+
+    def add_event(self, event_type, message, room_id=None, **data):
+        self.counts[event_type] += 1
+        self.digest.update(repr((self.scheduler.now, event_type, room_id, data)).encode())
+        if self.outcomes is not None and event_type in OUTCOMES:
+            self.outcomes[room_id].append((event_type, data[OUTCOMES[event_type]]))
+
+    def log(self, message):
+        pass
+
+    def mark_dirty(self):
+        pass
+
+    def send_to_player(self, conn, message):
+        conn.sendall(encode_json(message))
+
+# Issues décidées par le serveur, comparées à l'enregistrement en rejeu
+OUTCOMES = {'bomb_received': 'holder', 'explosion': 'victim', 'winner': 'winner'}
+
+class Bot:
+    """Connexion d'un joueur simulé : repasse la bombe dès qu'il la reçoit.
+
+    En binaire (défaut), les trames sont lues comme le ferait un joueur
+    sans passer par JSON : c'est le chemin le moins coûteux à simuler.
+    """
+    encoding = 'json'  # 'binary' après le WELCOME, si demandé au JOIN
+    deltas = True
+
+    def __init__(self, simulation, room, reaction):
+        self.simulation = simulation
+        self.room = room
+        self.reaction = reaction  # (min, max) en secondes, None : passif (rejeu)
+
+    def sendall(self, data):
+        if self.reaction is None:
+            return
+        if self.encoding == 'binary':
+            # Trame préfixée par sa longueur (4 octets), puis le type
+            if data[4] != codec.RECEIVE_BOMB:
+                return
+            message = {'type': 'PASS_BOMB', 'number': 0}
+            targets, key = codec.decode_receive_bomb(data[4:])[2], 'number'
+        elif data.startswith(RECEIVE_BOMB):
+            message = {'type': 'PASS_BOMB', 'to': None}
+            targets, key = json.loads(data)['available_targets'], 'to'
+        else:
+            return
+        if targets:
+            rng = self.simulation.rng
+            message[key] = rng.choice(targets)
+            self.simulation.server.scheduler.call_later(rng.uniform(*self.reaction), self.pass_bomb, message)
+
+    def pass_bomb(self, message):
+        # Refusé par la salle si la bombe a explosé entre-temps
+        self.room.handle_message(self, message)
+
+class Simulation:
+    def __init__(self, seed=0, reaction=(0.2, 1.5), strict=False, encoding='binary', **settings):
+        self.server = SimulatedServer(seed, **settings)
+        self.encoding = encoding
+        # Tirages des bots séparés de ceux du jeu : changer la charge ne change pas le jeu
+        self.rng = random.Random(f'{seed}-bots')
+        self.reaction = reaction
+        self.strict = strict
+        self.actions = 0
+        self.elapsed = 0.0
+
+    def join(self, room_id, player_id, name=None):
+        room = self.server.rooms.assign(room_id)
+        conn = Bot(self, room, self.reaction)
+        room.add_player(conn, None, {'player_id': player_id, 'player_name': name or player_id,
+                                     'encoding': self.encoding, 'deltas': True})
+        return room
+
+    def run(self, until=None):
+        scheduler = self.server.scheduler
+        start = time.perf_counter()
+        if self.strict:
+            # Une action à la fois pour contrôler l'état entre deux
+            while scheduler.run(until, limit=1):
+                self.actions += 1
+                self.check()
+        else:
+            self.actions += scheduler.run(until)
+        self.elapsed += time.perf_counter() - start
+
+    def check(self):
+        for room in self.server.rooms.all():
+            check_room(room, self.server.scheduler.now)
+
+    def report(self):
+        counts = self.server.counts
+        passes = counts['bomb_passed']
+        return {
+            'virtual_seconds': round(self.server.scheduler.now, 3),
+            'elapsed': round(self.elapsed, 3),
+            'actions': self.actions,
+            'passes': passes,
+            'explosions': counts['explosion'],
+            'games': counts['winner'],
+            'passes_per_minute': round(passes / self.elapsed * 60) if self.elapsed else 0,
+            'us_per_action': round(self.elapsed / self.actions * 1e6, 2) if self.actions else 0,
+            'digest': self.server.digest.hexdigest()
+        }
+
+def check_room(room, now):
+    """Lever InvariantError si l'état de la salle est incohérent"""
+    registry = room.registry
+
+    def fail(reason):
+        raise InvariantError(f"[{room.room_id}] t={now:.3f} : {reason}")
+
+    for slot, record in enumerate(registry.alive):
+        if record.slot != slot or not record.alive:
+            fail(f"{record.name} mal placé dans la liste des vivants")
+    if sum(record.alive for record in registry.records()) != registry.alive_count:
+        fail("nombre de vivants incohérent")
+    for record in registry.records():
+        if registry.by_number.get(record.number) is not record:
+            fail(f"numéro {record.number} de {record.name} mal indexé")
+    holder = room.current_holder
+    if holder is not None:
+        if not room.game_started:
+            fail("porteur hors partie")
+        if not holder.alive or registry.get(holder.conn) is not holder:
+            fail(f"porteur {holder.name} mort ou absent")
+        if room.explosion is None or room.explosion.cancelled or room.bomb_deadline < now:
+            fail("bombe sans explosion planifiée")
+
+def synthetic(args):
+    simulation = Simulation(args.seed, (args.reaction_min, args.reaction_max), args.strict, args.encoding,
+                            min_timer=args.min_timer, max_timer=args.max_timer, min_players=args.min_players)
+    for index in range(args.rooms):
+        for player in range(args.players):
+            simulation.join(f'room-{index + 1}', f'bot-{index + 1}-{player}')
+    simulation.run(args.duration)
+    return simulation
+
+class Replay:
+    """Rejeu d'un journal : entrées aux instants enregistrés, porteurs et timers imposés"""
+
+    def __init__(self, events, seed=0, strict=False, **settings):
+        self.simulation = Simulation(seed, None, strict, **settings)
+        self.server = self.simulation.server
+        self.server.outcomes = collections.defaultdict(list)
+        self.recorded = collections.defaultdict(list)  # {salle: [(type, joueur)]}
+        self.decisions = collections.defaultdict(collections.deque)  # {salle: (porteur, timer)}
+        self.divergences = []
+        self.inputs = 0
+        self.end = 0.0  # Instant du dernier événement : le jeu continuerait sans fin au-delà
+        self.schedule(events)
+
+    def schedule(self, events):
+        events = [event for event in events if event.get('room') is not None]
+        if not events:
+            return
+        start = events[0]['timestamp']
+        holders = {}  # Porteur enregistré, par salle
+        pending = {}  # Dernière remise de bombe de chaque salle, en attente de son explosion
+        call_at = self.server.scheduler.call_at
+        for event in events:
+            room_id, kind = event['room'], event['type']
+            at = event['timestamp'] - start
+            if kind in OUTCOMES:
+                self.recorded[room_id].append((kind, event[OUTCOMES[kind]]))
+            if kind == 'join':
+                call_at(at, self.join, room_id, event['player'])
+            elif kind == 'leave':
+                call_at(at, self.leave, room_id, event['player'])
+            elif kind == 'bomb_passed':
+                call_at(at, self.pass_bomb, room_id, holders.get(room_id), event['holder'])
+            elif kind == 'bomb_received':
+                # Timer arrondi au dixième dans l'événement : l'explosion qui suit,
+                # si elle est enregistrée, est replacée à son instant exact (les
+                # événements sont datés sur le thread de jeu, dans l'ordre où il
+                # les a traités : passes et explosions restent dans le même ordre)
+                decision = [event['holder'], event['timer'], None]
+                self.decisions[room_id].append(decision)
+                pending[room_id] = decision
+            elif kind == 'explosion' and room_id in pending:
+                pending.pop(room_id)[2] = at
+            if kind in ('bomb_received', 'bomb_passed'):
+                holders[room_id] = event['holder']
+            elif kind in ('explosion', 'winner'):
+                holders[room_id] = None
+            self.inputs += kind in ('join', 'leave', 'bomb_passed')
+        self.end = at
+
+    def diverge(self, room_id, reason):
+        self.divergences.append((self.server.scheduler.now, room_id, reason))
+
+    def join(self, room_id, name):
+        room = self.server.rooms.assign(room_id)
+        if 'choose_holder' not in vars(room):
+            # Décisions du jeu imposées par l'enregistrement (avant un éventuel début de partie)
+            room.choose_holder = lambda room=room: self.choose_holder(room)
+            room.draw_timer = lambda room=room: room.replay_timer
+        room.add_player(Bot(self.simulation, room, None), None,
+                        {'player_id': name, 'player_name': name, 'deltas': True})
+
+    def choose_holder(self, room):
+        """Porteur enregistré (ou tirage au hasard si l'enregistrement ne colle plus)"""
+        decisions = self.decisions[room.room_id]
+        if decisions:
+            name, timer, explosion = decisions.popleft()
+            holder = find(room.registry.alive, name)
+            if holder is not None:
+                room.replay_timer = timer if explosion is None else max(0.0, explosion - self.server.scheduler.now)
+                return holder
+            self.diverge(room.room_id, f"porteur enregistré {name} absent ou mort")
+        else:
+            self.diverge(room.room_id, "remise de bombe absente de l'enregistrement")
+        room.replay_timer = self.server.rng.uniform(self.server.min_timer, self.server.max_timer)
+        return room.registry.random_alive(self.server.rng)
+
+    def leave(self, room_id, name):
+        room = self.server.rooms.get(room_id)
+        record = find(room.registry.records(), name) if room is not None else None
+        if record is None:
+            self.diverge(room_id, f"départ de {name} absent de la salle")
+            return
+        room.drop_player(record.conn)
+
+    def pass_bomb(self, room_id, sender, target):
+        room = self.server.rooms.get(room_id)
+        holder = room.current_holder if room is not None else None
+        if holder is None or holder.name != sender:
+            self.diverge(room_id, f"passe {sender} → {target} alors que le porteur est "
+                                  f"{holder.name if holder else 'personne'}")
+            return
+        record = find(room.registry.alive, target)
+        if record is None:
+            self.diverge(room_id, f"passe vers {target}, absent ou mort")
+            return
+        room.handle_message(holder.conn, {'type': 'PASS_BOMB', 'to': record.id})
+
+    def compare(self):
+        """Premier écart (salle, rang, enregistré, simulé) entre les issues, ou None"""
+        for room_id in sorted(self.recorded.keys() | self.server.outcomes.keys()):
+            recorded, simulated = self.recorded[room_id], self.server.outcomes[room_id]
+            for index in range(max(len(recorded), len(simulated))):
+                expected = recorded[index] if index < len(recorded) else None
+                actual = simulated[index] if index < len(simulated) else None
+                if expected != actual:
+                    return room_id, index, expected, actual
+        return None
+
+def find(records, name):
+    for record in records:
+        if record.name == name:
+            return record
+    return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--journal', help='rejouer ce journal d\'événements (rotations comprises)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--rooms', type=int, default=100)
+    parser.add_argument('--players', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=3600, help='secondes virtuelles')
+    parser.add_argument('--encoding', choices=('binary', 'json'), default='binary', help='protocole des bots')
+    parser.add_argument('--reaction-min', type=float, default=0.2)
+    parser.add_argument('--reaction-max', type=float, default=1.5)
+    parser.add_argument('--min-timer', type=float, default=int(os.getenv('MIN_TIMER', 3)))
+    parser.add_argument('--max-timer', type=float, default=int(os.getenv('MAX_TIMER', 10)))
+    parser.add_argument('--min-players', type=int, default=int(os.getenv('MIN_PLAYERS', 2)))
+    parser.add_argument('--strict', action='store_true', help='contrôler les invariants après chaque action')
+    parser.add_argument('--check', action='store_true', help='lancer deux fois et comparer les empreintes')
+    args = parser.parse_args()
+
+    def run():
+        if args.journal:
+            replayed = Replay(replay(args.journal), args.seed, args.strict, min_timer=args.min_timer,
+                              max_timer=args.max_timer, min_players=args.min_players)
+            replayed.simulation.run(replayed.end)
+            report = replayed.simulation.report()
+            report.update(inputs=replayed.inputs, divergences=len(replayed.divergences),
+                          first_divergence=replayed.divergences[0] if replayed.divergences else None,
+                          first_outcome_mismatch=replayed.compare())
+            return report
+        return synthetic(args).report()
+
+    try:
+        report = run()
+        if args.check:
+            again = run()
+            report['deterministic'] = again['digest'] == report['digest']
+    except InvariantError as e:
+        print(f"Invariant violé {e}")
+        sys.exit(1)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if report.get('deterministic') is False or report.get('divergences'):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
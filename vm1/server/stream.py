@@ -0,0 +1,121 @@
+"""Flux Server-Sent Events pour le dashboard.
+
+Chaque message est encodé une seule fois puis déposé dans la file
+bornée de chaque abonné : un dashboard lent est déconnecté au lieu de
+ralentir les autres (il se reconnecte et repart d'un état complet).
+Les événements de jeu partent immédiatement ; un thread unique envoie,
+à chaque tick, le compte à rebours des salles et l'instantané d'état
+s'il a changé. Sans abonné, ce thread dort sans se réveiller.
+"""
+import json
+import queue
+import threading
+import time
+
+def encode_sse(kind, data):
+    """Trame SSE : 'data' est du JSON sur une seule ligne (dict ou octets déjà sérialisés)"""
+    if not isinstance(data, bytes):
+        data = json.dumps(data).encode()
+    return b'event: ' + kind.encode() + b'\ndata: ' + data + b'\n\n'
+
+class Subscriber:
+    """Un dashboard abonné : sa file de trames et la salle qu'il affiche"""
+
+    def __init__(self, room_id, queue_size):
+        self.room_id = room_id
+        self.queue = queue.Queue(queue_size)
+        self.closed = False
+        self.sent_version = None  # Version du dernier instantané envoyé
+
+    def push(self, frame):
+        """Déposer une trame ; retourne False si l'abonné ne suit plus"""
+        try:
+            self.queue.put_nowait(frame)
+            return True
+        except queue.Full:
+            return False
+
+    def next_frame(self, timeout):
+        """Prochaine trame, None après timeout (keep-alive) ou si l'abonné est évincé"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+class EventStream:
+    """Diffusion (fan-out) des événements et ticks vers tous les abonnés"""
+
+    def __init__(self, server, tick_interval=0.5, queue_size=256):
+        self.server = server
+        self.tick_interval = tick_interval
+        self.queue_size = queue_size
+        self.subscribers = []
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = None
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run_ticks, name='sse-ticks', daemon=True)
+            self.thread.start()
+        return self
+
+    def subscribe(self, room_id=None):
+        subscriber = Subscriber(room_id, self.queue_size)
+        # Premier message : l'état complet, les suivants sont incrémentaux
+        etag, body = self.server.get_state_snapshot(room_id)
+        subscriber.sent_version = etag
+        subscriber.push(encode_sse('state', body))
+        with self.lock:
+            self.subscribers.append(subscriber)
+        self.wakeup.set()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        subscriber.closed = True
+        with self.lock:
+            if subscriber in self.subscribers:
+                self.subscribers.remove(subscriber)
+            if not self.subscribers:
+                self.wakeup.clear()
+
+    def publish(self, kind, data):
+        if not self.subscribers:
+            return
+        self.deliver(encode_sse(kind, data), self.snapshot_subscribers())
+
+    def snapshot_subscribers(self):
+        with self.lock:
+            return list(self.subscribers)
+
+    def deliver(self, frame, subscribers):
+        for subscriber in subscribers:
+            if not subscriber.push(frame):
+                # File pleine : évincer plutôt que bloquer la diffusion
+                self.unsubscribe(subscriber)
+
+    def run_ticks(self):
+        while True:
+            self.wakeup.wait()
+            time.sleep(self.tick_interval)
+            subscribers = self.snapshot_subscribers()
+            if subscribers:
+                self.tick(subscribers)
+
+    def tick(self, subscribers):
+        # Instantané sérialisé une fois par salle demandée, seulement s'il a changé
+        by_room = {}
+        for subscriber in subscribers:
+            by_room.setdefault(subscriber.room_id, []).append(subscriber)
+        for room_id, group in by_room.items():
+            etag, body = self.server.get_state_snapshot(room_id)
+            stale = [s for s in group if s.sent_version != etag]
+            if stale:
+                for subscriber in stale:
+                    subscriber.sent_version = etag
+                self.deliver(encode_sse('state', body), stale)
+
+        timers = {room.room_id: round(room.remaining_time(), 1)
+                  for room in self.server.rooms.all() if room.game_started}
+        if timers:
+            self.deliver(encode_sse('tick', {'timers': timers}), subscribers)
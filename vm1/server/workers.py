@@ -0,0 +1,99 @@
+"""Plusieurs processus (WORKERS) derrière un même port de jeu.
+
+Le noyau répartit les connexions entre les workers (SO_REUSEPORT) d'après
+l'adresse du client, sans rien savoir des salles. Chaque JOIN est donc
+confié au worker propriétaire de sa salle avant d'être traité :
+
+- salle nommée : le premier worker qui la réserve dans l'annuaire
+  commun (voir cluster.py) ; une salle "wN-room-K" du matchmaking
+  appartient au worker N (reprise de session) ;
+- sans salle (matchmaking) : les JOIN de tous les workers sont numérotés
+  par un compteur partagé et confiés par groupes de ROOM_CAPACITY au
+  même worker, pour qu'une salle se remplisse au même endroit
+  (ROOM_CAPACITY=0 : une seule partie, sur le worker 0).
+
+Le socket du joueur passe au propriétaire par un socket Unix
+(SCM_RIGHTS), avec les octets déjà lus : le client ne voit rien.
+L'annuaire (un MemoryBackend servi par un processus gestionnaire) sert
+aussi à l'API de chaque worker pour lister les salles de tous et relayer
+l'état ou les métriques des autres.
+"""
+import multiprocessing
+import socket
+import threading
+from multiprocessing.managers import BaseManager
+
+from common.protocol import MAX_FRAME_SIZE, FrameError
+from cluster import MemoryBackend
+
+# JOIN et octets reçus à sa suite, transmis avec le socket
+MAX_HANDOFF = 2 * MAX_FRAME_SIZE
+
+class HandedOff(Exception):
+    """Connexion confiée à un autre worker : le lecteur s'arrête sans la couper"""
+
+class DirectoryManager(BaseManager):
+    """Processus qui héberge l'annuaire commun aux workers"""
+
+DirectoryManager.register('MemoryBackend', MemoryBackend)
+
+class WorkerGroup:
+    """Annuaire, compteur du matchmaking et canaux de transmission, créés avant le fork"""
+
+    def __init__(self, workers, room_capacity):
+        self.context = multiprocessing.get_context('fork')
+        self.workers = workers
+        self.room_capacity = room_capacity
+        self.manager = DirectoryManager(ctx=self.context)
+        self.manager.start()
+        self.directory = self.manager.MemoryBackend()
+        self.joins = self.context.Value('Q', 0)  # JOIN sans salle reçus par l'ensemble des workers
+        # Un canal par worker : (réception, envoi) ; les autres y déposent ses connexions
+        self.channels = [socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET) for _ in range(workers)]
+        for _, sender in self.channels:
+            # Canal plein : le joueur est refusé ("full") plutôt que de bloquer son worker
+            sender.setblocking(False)
+        self.server = None
+
+    def start(self, server):
+        """Recevoir les connexions confiées à ce worker (planificateur et boucle prêts)"""
+        self.server = server
+        threading.Thread(target=self.receive, name='handoff', daemon=True).start()
+
+    def owner(self, server, message):
+        """Numéro du worker qui doit traiter ce JOIN"""
+        room_id = message.get('room')
+        if room_id is None:
+            if not self.room_capacity:
+                return 0
+            with self.joins.get_lock():
+                ticket = self.joins.value
+                self.joins.value += 1
+            return ticket // self.room_capacity % self.workers
+        prefix, _, rest = room_id.partition('-')
+        if rest and prefix[:1] == 'w' and prefix[1:].isdigit() and int(prefix[1:]) < self.workers:
+            return int(prefix[1:])
+        peer = server.cluster.route(room_id)
+        return server.worker_id if peer is None else peer['worker']
+
+    def hand_off(self, conn, worker, frame):
+        """Transmettre le socket et le JOIN (déjà découpé) ; False si le canal est plein"""
+        data = frame + b'\n' + conn.decoder.remaining()
+        if len(data) > MAX_HANDOFF:
+            raise FrameError(f"{len(data)} octets reçus avant le JOIN")
+        try:
+            socket.send_fds(self.channels[worker][1], [data], [conn.fileno()])
+        except OSError:
+            return False
+        return True
+
+    def receive(self):
+        channel = self.channels[self.server.worker_id][0]
+        while True:
+            data, fds, _, _ = socket.recv_fds(channel, MAX_HANDOFF, 1)
+            if not fds:
+                continue
+            try:
+                self.server.adopt(socket.socket(fileno=fds[0]), data)
+            except OSError as e:
+                print(f"Connexion transmise perdue: {e}")